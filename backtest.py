@@ -0,0 +1,151 @@
+"""
+シグナル列 (Synergy_Buy/Synergy_Sell など) の損益検証
+バーごとの Python ループは使わず、ポジション・約定・手数料・スリッページ・資産曲線を
+NumPy の配列演算だけで計算する (10万本規模でもパラメータ探索の中で回せる速さ)。
+
+ルール:
+    買いシグナルで買い持ち(+1)、売りシグナルで手仕舞い(0) または allow_short=True なら売り持ち(-1)
+    同じバーに買いと売りが両方出た場合はポジションを変えない
+    fill='close'     : シグナルが出たバーの終値で約定
+    fill='next_open' : 次のバーの始値で約定
+    手数料とスリッページはポジション変化量 1 あたりの比率 (0.0005 = 0.05%)
+"""
+import numpy as np
+
+
+def positions_from_signals(buy, sell, allow_short=False):
+    """シグナル配列から、各バーの終値時点で保有しているポジション (-1/0/1) を作る"""
+    buy = np.asarray(buy) > 0
+    sell = np.asarray(sell) > 0
+    target = np.where(buy & ~sell, 1.0, np.where(sell & ~buy, -1.0 if allow_short else 0.0, np.nan))
+
+    # 直前の有効な値で前方埋め (NumPy のみ)
+    valid = ~np.isnan(target)
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(target)), -1))
+    return np.where(last >= 0, target[np.maximum(last, 0)], 0.0)
+
+
+def _holding_steps(position, close, open_=None, fill='close'):
+    """
+    バーを保有区間に分け、区間ごとの保有ポジションと(コスト控除前)の値動きを返す
+    fill='close'     : 前の終値→終値 の1区間
+    fill='next_open' : 前の終値→始値 (2本前の判断で保有) と 始値→終値 (1本前の判断で保有) の2区間
+    戻り値: (held, moves, trades)。held と moves は (バー数, 区間数)、trades は約定したバーのポジション変化量
+    """
+    n = len(close)
+    held = np.zeros(n)
+    held[1:] = position[:-1]
+    if fill == 'close':
+        moves = np.zeros(n)
+        moves[1:] = close[1:] / close[:-1] - 1.0
+        trades = np.abs(np.diff(position, prepend=0.0))
+        return held[:, None], np.nan_to_num(moves)[:, None], trades
+    if fill == 'next_open':
+        if open_ is None:
+            raise ValueError("fill='next_open' には始値 (open_) が必要です")
+        held_overnight = np.zeros(n)
+        held_overnight[2:] = position[:-2]
+        overnight, intraday = np.zeros(n), np.zeros(n)
+        overnight[1:] = open_[1:] / close[:-1] - 1.0
+        intraday[1:] = close[1:] / open_[1:] - 1.0
+        trades = np.zeros(n)
+        trades[1:] = np.abs(np.diff(position, prepend=0.0))[:-1]
+        return (np.column_stack([held_overnight, held]),
+                np.nan_to_num(np.column_stack([overnight, intraday])), trades)
+    raise ValueError(f"未対応の約定方法です: {fill}")
+
+
+def _trade_returns(held, moves, cost=0.0, closing=None):
+    """
+    同じ向きのポジションを持ち続けた区間 = 1トレードとして、トレードごとのリターンを返す
+    held, moves は _holding_steps() の保有ポジションと値動き。建てと手仕舞い (期間内に手仕舞ったものだけ) の
+    コスト (ポジション 1 あたり cost) をトレードの中で差し引く (資産曲線と同じ扱い)
+    closing は最後の区間の後に約定したポジション (fill='close' で最終バーに手仕舞った場合など)。
+    最後まで持ち続けたトレードもこれと違えば手仕舞ったものとしてコストを引く
+    """
+    held, moves = held.ravel(), moves.ravel()  # 区間を時間順に1列に並べる
+    n = len(held)
+    in_trade = held != 0
+    if not in_trade.any():
+        return np.empty(0)
+    prev = np.concatenate(([0.0], held[:-1]))
+    changes = np.flatnonzero(held != prev)
+    starts = changes[in_trade[changes]]
+    # 区間の終わり = 次に保有が変わる位置 (手仕舞い・ドテン)。最後まで持ち続けたものは n
+    ends = np.append(changes, n)[np.searchsorted(changes, starts, side='right')]
+    # 各トレード区間の log(1+r) を合計 → トレードのリターン
+    cumulative = np.concatenate(([0.0], np.cumsum(np.where(in_trade, np.log1p(held * moves), 0.0))))
+    size = np.abs(held[starts])
+    exits = ends < n
+    if closing is not None and closing != held[-1]:
+        exits[-1] = True  # 最終バーで手仕舞い・ドテンしたトレード
+    exit_cost = np.where(exits, 1.0 - size * cost, 1.0)
+    return np.exp(cumulative[ends] - cumulative[starts]) * (1.0 - size * cost) * exit_cost - 1.0
+
+
+def backtest_arrays(close, buy, sell, open_=None, fee=0.0005, slippage=0.0005,
+                    allow_short=False, fill='close', periods_per_year=252):
+    """
+    配列だけで検証し、(統計 dict, 明細 dict) を返す
+    明細は position / returns / equity (初期値1) の配列
+    """
+    close = np.asarray(close, dtype=np.float64)
+    open_ = None if open_ is None else np.asarray(open_, dtype=np.float64)
+    position = positions_from_signals(buy, sell, allow_short)
+    held, moves, trades = _holding_steps(position, close, open_, fill)
+    # 1本の中の区間は複利で合成し、約定したバーはコスト分だけ資産を目減りさせる
+    returns = np.prod(1.0 + held * moves, axis=1) * (1.0 - trades * (fee + slippage)) - 1.0
+    equity = np.cumprod(1.0 + returns)
+
+    n = len(close)
+    std = returns.std() if n else 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0 if n else np.empty(0)
+    # fill='close' では最終バーのポジション変化も期間内に約定して資産曲線でコストを引いている
+    # (next_open では次のバーの始値なので期間外)
+    closing = position[-1] if fill == 'close' and n else None
+    trade_returns = _trade_returns(held, moves, fee + slippage, closing)
+    stats = {
+        'total_return': float(equity[-1] - 1.0) if n else 0.0,
+        'sharpe': float(returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else np.nan,
+        'max_drawdown': float(drawdown.min()) if n else 0.0,
+        'win_rate': float((trade_returns > 0).mean()) if len(trade_returns) else np.nan,
+        'trades': int(len(trade_returns)),
+        # 年換算の売買回転 (ポジション変化量の合計 / 年数)
+        'turnover': float(trades.sum() / n * periods_per_year) if n else 0.0,
+        'exposure': float(np.mean(position != 0)) if n else 0.0,
+    }
+    return stats, {'position': position, 'returns': returns, 'equity': equity}
+
+
+def infer_periods_per_year(index):
+    """DatetimeIndex の期間と本数から、1年あたりのバー数を推定する"""
+    if len(index) < 2:
+        return 252
+    years = (index[-1] - index[0]).total_seconds() / (365.25 * 24 * 3600)
+    return len(index) / years if years > 0 else 252
+
+
+def backtest(df, buy_col='Synergy_Buy', sell_col='Synergy_Sell', fee=0.0005, slippage=0.0005,
+             allow_short=False, fill='close', periods_per_year=None):
+    """
+    戦略適用済みの df を検証し、(統計 dict, 明細 DataFrame) を返す
+    periods_per_year を省略するとインデックスの日時から推定する
+    """
+    import pandas as pd
+
+    if periods_per_year is None:
+        periods_per_year = infer_periods_per_year(pd.DatetimeIndex(df.index))
+    stats, detail = backtest_arrays(
+        df['Close'].to_numpy(dtype=np.float64), df[buy_col].to_numpy(), df[sell_col].to_numpy(),
+        open_=df['Open'].to_numpy(dtype=np.float64) if 'Open' in df.columns else None,
+        fee=fee, slippage=slippage, allow_short=allow_short, fill=fill, periods_per_year=periods_per_year,
+    )
+    return stats, pd.DataFrame(detail, index=df.index)
+
+
+def format_stats(stats):
+    """統計 dict を GUI/コンソール表示用の文字列にする"""
+    return (f"総リターン: {stats['total_return']:.2%}  シャープレシオ: {stats['sharpe']:.2f}  "
+            f"最大ドローダウン: {stats['max_drawdown']:.2%}\n"
+            f"勝率: {stats['win_rate']:.2%} ({stats['trades']} トレード)  "
+            f"回転率(年): {stats['turnover']:.1f}  保有率: {stats['exposure']:.2%}")
@@ -0,0 +1,455 @@
+"""
+売買戦略まわりの性能計測スクリプト
+使い方: python benchmarks.py or
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+# ======================
+# 計測用データ
+# ======================
+def make_intraday_ohlcv(days=250, interval='1m', session_minutes=390, seed=0):
+    """取引時間 (9:30 から session_minutes 分) だけの疑似 OHLCV を生成"""
+    step = pd.Timedelta(interval.replace('m', 'min'))
+    bars_per_day = max(int(pd.Timedelta(minutes=session_minutes) / step), 1)
+    dates = pd.bdate_range('2023-01-02', periods=days, tz='America/New_York')
+    offsets = pd.timedelta_range(start='9h30min', periods=bars_per_day, freq=step)
+    index = pd.DatetimeIndex(dates.repeat(bars_per_day)) + np.tile(offsets, days)
+    index.name = 'Datetime'
+
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.05, len(index)))
+    spread = np.abs(rng.normal(0, 0.05, len(index)))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.02, len(index)),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(100, 10000, len(index)),
+    }, index=index)
+
+
+def make_daily_ohlcv(years=10, seed=0):
+    """営業日ベースの疑似日足 OHLCV を生成"""
+    index = pd.bdate_range('2014-01-01', periods=252 * years, name='Date')
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    spread = close * np.abs(rng.normal(0, 0.01, len(index)))
+    return pd.DataFrame({
+        'Open': close + rng.normal(0, 0.5, len(index)),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1000, 100000, len(index)),
+    }, index=index)
+
+
+def _legacy_opening_range_break_strategy(df, opening_minutes=30):
+    """比較用: groupby('Date').apply + merge による旧実装"""
+    df = df.copy()
+    if 'Datetime' not in df.columns:
+        df['Datetime'] = df.index
+
+    df['Date'] = df['Datetime'].dt.date
+
+    def calc_or(sub_df):
+        start_dt = sub_df['Datetime'].min()
+        end_dt = start_dt + pd.Timedelta(minutes=opening_minutes)
+        sub_open = sub_df[(sub_df['Datetime'] >= start_dt) & (sub_df['Datetime'] < end_dt)]
+        return pd.Series([sub_open['High'].max(), sub_open['Low'].min()], index=['OR_High', 'OR_Low'])
+
+    or_df = df.groupby('Date')[['Datetime', 'High', 'Low']].apply(calc_or).reset_index()
+    df_merged = pd.merge(df.reset_index(drop=True), or_df, on='Date', how='left')
+    df_merged.set_index('Datetime', inplace=True)
+    df_merged.sort_index(inplace=True)
+    df_merged['OR_Buy'] = np.where(df_merged['Close'] > df_merged['OR_High'], 1, 0)
+    df_merged['OR_Sell'] = np.where(df_merged['Close'] < df_merged['OR_Low'], 1, 0)
+    return df_merged
+
+
+# 比較用: インプレース化する前の yfinace.py の戦略関数そのまま (各関数が df.copy() を返す)
+def _copying_breakout_strategy(df, n=20):
+    """
+    ブレイクアウト戦略
+    過去n期間の高値を上抜け → Breakout_Buy=1
+    過去n期間の安値を下抜け → Breakout_Sell=1
+    """
+    df = df.copy()
+    df['Highest'] = df['High'].rolling(n).max().shift(1)
+    df['Lowest']  = df['Low'].rolling(n).min().shift(1)
+
+    # alignで行を厳密に合わせてから演算
+    close_aligned, high_aligned = df['Close'].align(df['Highest'], axis=0, copy=False)
+    df['Breakout_Buy'] = np.where(close_aligned > high_aligned, 1, 0)
+
+    close_aligned2, low_aligned = df['Close'].align(df['Lowest'], axis=0, copy=False)
+    df['Breakout_Sell'] = np.where(close_aligned2 < low_aligned, 1, 0)
+
+    return df
+
+
+def _copying_moving_average_crossover_strategy(df, short_window=5, long_window=25):
+    """
+    移動平均線のゴールデンクロス/デッドクロス戦略
+    短期MAが長期MAを上抜け → MA_Buy=1
+    短期MAが長期MAを下抜け → MA_Sell=1
+    """
+    df = df.copy()
+    df['MA_short'] = df['Close'].rolling(short_window).mean()
+    df['MA_long']  = df['Close'].rolling(long_window).mean()
+
+    # クロス判定用に前日値を用意
+    df['prev_short'] = df['MA_short'].shift(1)
+    df['prev_long']  = df['MA_long'].shift(1)
+
+    df['MA_Buy'] = 0
+    df['MA_Sell'] = 0
+
+    buy_cond = (df['prev_short'] <= df['prev_long']) & (df['MA_short'] > df['MA_long'])
+    sell_cond = (df['prev_short'] >= df['prev_long']) & (df['MA_short'] < df['MA_long'])
+
+    df.loc[buy_cond, 'MA_Buy'] = 1
+    df.loc[sell_cond, 'MA_Sell'] = 1
+
+    df.drop(['prev_short','prev_long'], axis=1, inplace=True)
+    return df
+
+
+def _copying_opening_range_break_strategy(df, opening_minutes=30):
+    """
+    オープニングレンジ・ブレイク戦略 (intraday用)
+    日ごとに、最初の X分間の高値/安値を超えたら OR_Buy/OR_Sell
+    groupby/merge を使わず、セッション開始時刻のブロードキャストと
+    日ごとの reduceat で1パスで計算する (df は時系列順が前提)
+    """
+    df = df.copy()
+    # Datetime 列があればそれを、なければインデックスを時刻として使う
+    if 'Datetime' in df.columns:
+        dt = pd.DatetimeIndex(df.pop('Datetime'))
+    else:
+        dt = pd.DatetimeIndex(df.index)
+    ts = dt.values
+    # 日付 (ローカル日付の0時) が変わる位置 = セッション開始
+    day = dt.normalize().values
+    new_session = np.empty(len(df), dtype=bool)
+    new_session[:1] = True
+    new_session[1:] = day[1:] != day[:-1]
+    starts = np.flatnonzero(new_session)
+    session_id = np.cumsum(new_session) - 1
+
+    # セッション開始時刻を各行へブロードキャストし、最初の X分間だけを残す
+    in_window = (ts - ts[starts][session_id]) < np.timedelta64(opening_minutes, 'm')
+
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    or_high = np.fmax.reduceat(np.where(in_window, high, -np.inf), starts) if len(starts) else high[:0]
+    or_low = np.fmin.reduceat(np.where(in_window, low, np.inf), starts) if len(starts) else low[:0]
+    # 全て欠損のセッションは NaN に戻す
+    or_high[np.isinf(or_high)] = np.nan
+    or_low[np.isinf(or_low)] = np.nan
+
+    df['OR_High'] = or_high[session_id]
+    df['OR_Low'] = or_low[session_id]
+    df.index = dt.rename('Datetime')
+
+    close = df['Close'].to_numpy(dtype=np.float64)
+    df['OR_Buy'] = np.where(close > df['OR_High'].to_numpy(), 1, 0)
+    df['OR_Sell'] = np.where(close < df['OR_Low'].to_numpy(), 1, 0)
+
+    return df
+
+
+def _copying_combine_signals(df):
+    """
+    3つの戦略（ブレイクアウト, オープニングレンジ, MAクロス）シグナルを融合
+    OR条件で Synergy_Buy, Synergy_Sell を出す
+    """
+    df = df.copy()
+    buy_cols  = ['Breakout_Buy','MA_Buy','OR_Buy']
+    sell_cols = ['Breakout_Sell','MA_Sell','OR_Sell']
+
+    for col in buy_cols + sell_cols:
+        if col not in df.columns:
+            df[col] = 0
+
+    df['Synergy_Buy'] = np.where(df[buy_cols].sum(axis=1) > 0, 1, 0)
+    df['Synergy_Sell'] = np.where(df[sell_cols].sum(axis=1) > 0, 1, 0)
+    return df
+
+
+def _peak_memory(func):
+    """func 実行中のピークメモリ (bytes) と戻り値を返す"""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, result
+
+
+def _best_of(func, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+# ======================
+# 各ベンチマーク
+# ======================
+def bench_opening_range(args):
+    from strategies import opening_range_break_strategy
+
+    cols = ['OR_High', 'OR_Low', 'OR_Buy', 'OR_Sell']
+    for interval in ['1m', '5m', '1h']:
+        df = make_intraday_ohlcv(days=args.days, interval=interval)
+        t_old, old = _best_of(lambda: _legacy_opening_range_break_strategy(df), args.repeat)
+        t_new, new = _best_of(lambda: opening_range_break_strategy(df), args.repeat)
+        same = old[cols].reset_index(drop=True).equals(new[cols].reset_index(drop=True))
+        print(f"{interval:>3}: {len(df):>7} 行  旧 {t_old * 1000:9.1f} ms  新 {t_new * 1000:8.1f} ms  "
+              f"x{t_old / t_new:6.1f}  一致={same}")
+
+
+def bench_pipeline_memory(args):
+    from strategies import apply_strategies
+
+    def copy_chain(df):
+        # 旧 run_strategy と同じ: 旧実装の各戦略が df.copy() を返す
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # 旧実装の align(copy=False) の非推奨警告
+            df = _copying_breakout_strategy(df, n=20)
+        df = _copying_moving_average_crossover_strategy(df, short_window=5, long_window=25)
+        df['MA_75'] = df['Close'].rolling(75).mean()
+        df = _copying_opening_range_break_strategy(df, opening_minutes=30)
+        return _copying_combine_signals(df)
+
+    datasets = [
+        ('10年 日足', make_daily_ohlcv(years=10)),
+        ('60日 1分足', make_intraday_ohlcv(days=60, interval='1m')),
+    ]
+    for label, base in datasets:
+        peak_old, old = _peak_memory(lambda: copy_chain(base.copy()))
+        peak_new, new = _peak_memory(lambda: apply_strategies(base.copy()))
+        same = all(np.array_equal(old[col].to_numpy(dtype=np.float64), new[col].to_numpy(dtype=np.float64),
+                                  equal_nan=True) for col in new.columns)
+        print(f"{label}: {len(base):>6} 行  コピー連鎖 {peak_old / 2**20:7.2f} MiB  "
+              f"インプレース {peak_new / 2**20:7.2f} MiB  一致={same}")
+
+
+def bench_backtest(args):
+    from backtest import backtest
+    from strategies import apply_strategies
+
+    df = apply_strategies(make_intraday_ohlcv(days=args.days, interval='1m'))
+    t, (stats, _) = _best_of(lambda: backtest(df), args.repeat)
+    print(f"1分足 {len(df)} 本: {t * 1000:.1f} ms  (トレード {stats['trades']} 回)")
+
+
+def bench_render(args):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from chart_view import CandleChart
+    from strategies import apply_strategies
+
+    def render(df):
+        chart = CandleChart()
+        FigureCanvasAgg(chart.fig)
+        chart.set_data(df, lines={'MA_75': (df['MA_75'], 'red')}, buy=df['Synergy_Buy'], sell=df['Synergy_Sell'])
+        chart.fig.canvas.draw()
+        return chart
+
+    for days in [5, 60, 250]:
+        df = apply_strategies(make_intraday_ohlcv(days=days, interval='1m'))
+        t, chart = _best_of(lambda: render(df), args.repeat)
+        zoom_t, _ = _best_of(lambda: (chart.zoom(len(df) / 2, 0.5), chart.fig.canvas.draw()), args.repeat)
+        print(f"1分足 {len(df):>6} 本: 描画 {t * 1000:7.1f} ms  拡大して再集約 {zoom_t * 1000:7.1f} ms  "
+              f"(ローソク足 {len(chart.bodies.get_paths())} 本)")
+
+
+def bench_chart_refresh(args):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from chart_view import CandleChart
+
+    frames = [make_daily_ohlcv(years=1, seed=i).iloc[-126:] for i in range(args.refreshes)]
+
+    def ma_lines(df):
+        close = df['Close']
+        return {f'{n}MA': (close.rolling(n).mean(), color)
+                for n, color in [(5, 'blue'), (25, 'green'), (50, 'red'), (100, 'purple')]}
+
+    def legacy(df):
+        # 旧 get_finace.plot_stock と同じ: クリックごとに新しい Figure を作り、閉じない
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(df.index, df['Close'], color='black')
+        for values, color in ma_lines(df).values():
+            ax.plot(df.index, values, color=color)
+        colors = ['red' if c < o else 'green' for o, c in zip(df['Open'], df['Close'])]
+        ax.bar(df.index, df['Close'] - df['Open'], bottom=df['Open'], width=0.8, color=colors)
+        FigureCanvasAgg(fig).draw()
+
+    chart = CandleChart(figsize=(10, 6), volume=False, legend=True)
+    chart.attach(FigureCanvasAgg(chart.fig))
+
+    def persistent(df):
+        chart.set_data(df, lines=ma_lines(df), title='bench')
+        return chart.refresh()
+
+    plt.rcParams['figure.max_open_warning'] = 0
+    for label, func in [('毎回作り直し', legacy), ('使い回し', persistent)]:
+        # 時間 (tracemalloc なし) とメモリ (tracemalloc あり) は別々に測る
+        times = []
+        for df in frames[:20]:
+            t0 = time.perf_counter()
+            func(df)
+            times.append(time.perf_counter() - t0)
+        plt.close('all')
+
+        tracemalloc.start()
+        memory = []
+        for df in frames:
+            func(df)
+            memory.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        plt.close('all')
+        print(f"{label:<8}: 再描画 中央値 {np.median(times) * 1000:6.1f} ms  "
+              f"メモリ 10回目 {memory[9] / 2**20:6.1f} MiB → {len(frames)}回目 {memory[-1] / 2**20:6.1f} MiB")
+
+    # 軸の範囲が変わらない更新 (同じ銘柄の再取得など) は blit で描く
+    df = frames[-1]
+    persistent(df)
+    times = []
+    for _ in range(args.refreshes):
+        t0 = time.perf_counter()
+        blitted = persistent(df)
+        times.append(time.perf_counter() - t0)
+    print(f"blit 再描画 (範囲が同じ): 中央値 {np.median(times) * 1000:6.1f} ms  blit={blitted}")
+
+
+def bench_cold_start(args):
+    """新しいインタープリタで読み込み/起動したときの時間と、読み込まれた GUI・描画モジュール"""
+    check = ("import sys; print(','.join(m for m in ('tkinter', 'matplotlib', 'mplfinance', 'pandas') "
+             "if m in sys.modules))")
+    cases = [
+        ('import yfinace (GUI)', ['-c', f'import yfinace; {check}']),
+        ('import strategy_cli', ['-c', f'import strategy_cli; {check}']),
+        ('strategy_cli.py --help', ['strategy_cli.py', '--help']),
+        ('CLI パイプライン相当の import', ['-c', f'import strategy_cli, strategies, backtest, market_data; {check}']),
+    ]
+    for label, command in cases:
+        times, loaded, error = [], '', None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = subprocess.run([sys.executable] + command, capture_output=True, text=True)
+            times.append(time.perf_counter() - t0)
+            if result.returncode != 0:
+                error = result.stderr.strip().splitlines()[-1]
+                break
+            loaded = (result.stdout.strip() or 'なし') if command[0] == '-c' else '-'
+        if error:
+            print(f"{label:<28}: 実行できません ({error})")
+        else:
+            print(f"{label:<28}: {min(times) * 1000:7.1f} ms  読み込み済み: {loaded}")
+
+
+def bench_pdf_text(args):
+    """PDF テキスト抽出のページ/秒 (旧実装の逐次 += 連結 / プロセス並列 / キャッシュ済み)"""
+    import glob
+    import tempfile
+
+    try:
+        import fitz
+    except ImportError:
+        print("PyMuPDF (fitz) がインストールされていないため計測できません")
+        return
+    from pdf_text import extract_texts
+
+    paths = sorted(glob.glob(os.path.join(args.folder, '*.pdf')))[:args.limit]
+    if not paths:
+        print(f"{args.folder} に PDF がありません")
+        return
+
+    def legacy():
+        pages = 0
+        for path in paths:
+            text = ""
+            with fitz.open(path) as doc:
+                for page in doc:
+                    text += page.get_text()
+                    pages += 1
+        return pages
+
+    t0 = time.perf_counter()
+    pages = legacy()
+    base = time.perf_counter() - t0
+    print(f"{len(paths)} ファイル / {pages} ページ")
+    print(f"旧実装 (逐次, +=)      : {base:6.2f} 秒  {pages / base:8.0f} ページ/秒")
+    for workers in (1, args.workers):
+        t0 = time.perf_counter()
+        extract_texts(paths, cache_dir=None, workers=workers)
+        elapsed = time.perf_counter() - t0
+        print(f"extract_texts {workers:2d} プロセス: {elapsed:6.2f} 秒  {pages / elapsed:8.0f} ページ/秒")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        extract_texts(paths, cache_dir=cache_dir, workers=args.workers)
+        t0 = time.perf_counter()
+        stats = {}
+        extract_texts(paths, cache_dir=cache_dir, workers=args.workers, stats=stats)
+        elapsed = time.perf_counter() - t0
+        print(f"キャッシュ済み (再実行)  : {elapsed:6.2f} 秒  抽出 {stats['extracted']} 件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="売買戦略の性能計測")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('or', help="オープニングレンジ戦略の旧実装との比較")
+    p.add_argument('--days', type=int, default=250)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_opening_range)
+
+    p = sub.add_parser('memory', help="戦略パイプラインのピークメモリ (コピー連鎖 vs インプレース)")
+    p.set_defaults(func=bench_pipeline_memory)
+
+    p = sub.add_parser('backtest', help="Synergy シグナルの検証速度")
+    p.add_argument('--days', type=int, default=300)
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_backtest)
+
+    p = sub.add_parser('render', help="間引きチャートの描画時間 (元の本数を変えて比較)")
+    p.add_argument('--repeat', type=int, default=3)
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser('chart', help="チャート再描画のメモリと時間 (毎回作り直し vs 使い回し)")
+    p.add_argument('--refreshes', type=int, default=100)
+    p.set_defaults(func=bench_chart_refresh)
+
+    p = sub.add_parser('coldstart', help="GUI モジュールと CLI の起動時間")
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_cold_start)
+
+    p = sub.add_parser('pdftext', help="PDF テキスト抽出のページ/秒 (逐次 vs プロセス並列 vs キャッシュ)")
+    p.add_argument('--folder', default='pdf_files')
+    p.add_argument('--limit', type=int, default=None, help="先頭から何ファイル使うか")
+    p.add_argument('--workers', type=int, default=os.cpu_count())
+    p.set_defaults(func=bench_pdf_text)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
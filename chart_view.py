@@ -0,0 +1,297 @@
+"""
+ローソク足チャートの間引き描画 (level of detail)
+1分足を数か月分など、キャンバスの幅より本数が多いときは、表示範囲のバーを
+「キャンバス幅に収まる本数」のまとまりに集約してから描く。
+    始値 = 先頭の始値 / 高値 = 最大 / 安値 = 最小 / 終値 = 末尾の終値 / 出来高 = 合計
+売買マーカーはまとまりごとに最初の1つだけ残す。
+拡大・縮小 (x 軸の範囲変更) のたびに表示範囲だけを集約し直すので、
+元の本数に関係なく描画するローソク足の数はほぼ一定になる。
+
+x 座標は元データのバー番号 (0, 1, 2, ...) で、休場時間の隙間は詰めて表示する。
+
+Figure とアーティスト (ローソク足・線・マーカー) は1度だけ作り、データの差し替えは
+set_data / set_segments / set_verts で中身だけ入れ替える。キャンバスに attach すると
+データ部分は animated (背景と分けて描く) になり、軸の範囲・目盛り・タイトルが前回と同じなら
+背景を貼り直してデータ部分だけ描き直す (blit)。
+
+使い方:
+    chart = CandleChart()
+    canvas = FigureCanvasTkAgg(chart.fig, master=root)
+    chart.attach(canvas)
+    chart.set_data(df, lines={'MA_5': (ma_5, 'green')}, buy=df['Synergy_Buy'], sell=df['Synergy_Sell'])
+    chart.refresh()
+"""
+import numpy as np
+import pandas as pd
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+# mplfinance の 'yahoo' スタイルに合わせた色
+UP_COLOR = '#00b060'
+DOWN_COLOR = '#fe3032'
+PIXELS_PER_BAR = 3  # 1本のローソク足に割り当てる最小の横幅 (ピクセル)
+
+
+# ======================
+# 間引き (集約)
+# ======================
+def bucket_starts(lo, hi, max_bars, total):
+    """
+    バー番号 [lo, hi) を max_bars 個以下のまとまりに分け、(各まとまりの先頭, 末尾の次) を返す
+    まとまりの境界は大きさの倍数にそろえるので、横にずらしても形が変わらない
+    """
+    size = max(int(np.ceil((hi - lo) / max_bars)), 1)
+    starts = np.arange(lo - lo % size, hi, size)
+    return starts, min(starts[-1] + size, total) if len(starts) else lo
+
+
+def decimate_ohlcv(open_, high, low, close, volume, starts, stop):
+    """各まとまりの OHLCV を求める (NaN は無視)"""
+    offsets = starts - starts[0]
+    window = slice(starts[0], stop)
+    ends = np.append(starts[1:], stop)
+    return (open_[starts],
+            np.fmax.reduceat(high[window], offsets),
+            np.fmin.reduceat(low[window], offsets),
+            close[ends - 1],
+            np.add.reduceat(np.nan_to_num(volume[window]), offsets))
+
+
+def decimate_markers(mask, price, starts, stop):
+    """各まとまりで最初にシグナルが出たバーだけを残し、(バー番号, 価格) を返す"""
+    positions = np.flatnonzero(mask[starts[0]:stop]) + starts[0]
+    buckets = np.searchsorted(starts, positions, side='right') - 1
+    _, first = np.unique(buckets, return_index=True)
+    positions = positions[first]
+    return positions, price[positions]
+
+
+# ======================
+# チャート
+# ======================
+class CandleChart:
+    """ローソク足 + 出来高 + 任意の線 + 売買マーカーを間引いて描くチャート"""
+
+    def __init__(self, figsize=(10, 6), max_bars=None, pixels_per_bar=PIXELS_PER_BAR, volume=True, legend=False):
+        self.max_bars = max_bars
+        self.pixels_per_bar = pixels_per_bar
+        self.legend = legend
+        self.fig = Figure(figsize=figsize)
+        if volume:
+            grid = self.fig.add_gridspec(2, 1, height_ratios=[3, 1], hspace=0.05)
+            self.ax = self.fig.add_subplot(grid[0])
+            self.ax_volume = self.fig.add_subplot(grid[1], sharex=self.ax)
+            self.ax.tick_params(labelbottom=False)
+            self.ax_volume.set_ylabel('Volume')
+        else:
+            self.ax = self.fig.add_subplot()
+            self.ax_volume = None
+        self.axes = [ax for ax in (self.ax, self.ax_volume) if ax is not None]
+        for ax in self.axes:
+            ax.grid(True, alpha=0.3)
+
+        self.wicks = LineCollection([], linewidths=0.8)
+        self.bodies = PolyCollection([], linewidths=0)
+        self.ax.add_collection(self.wicks)
+        self.ax.add_collection(self.bodies)
+        self.volume_bars = None
+        if self.ax_volume is not None:
+            self.volume_bars = PolyCollection([], linewidths=0)
+            self.ax_volume.add_collection(self.volume_bars)
+        self.lines = {}
+        self.buy_marker, = self.ax.plot([], [], linestyle='None', marker='^', color='lime', markersize=10)
+        self.sell_marker, = self.ax.plot([], [], linestyle='None', marker='v', color='fuchsia', markersize=10)
+
+        self.index = pd.DatetimeIndex([])
+        self.close = np.empty(0)
+        self.date_format = '%Y-%m-%d'
+        bottom = self.axes[-1]
+        bottom.xaxis.set_major_locator(MaxNLocator(nbins=6, integer=True))
+        bottom.tick_params(axis='x', labelrotation=15)
+        bottom.xaxis.set_major_formatter(FuncFormatter(self._format_date))
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.render())
+
+        # blit 用 (attach したときだけ使う)
+        self.canvas = None
+        self.background = None
+        self.drawn_state = None
+
+    # --- データ ---
+    def set_data(self, df, lines=None, buy=None, sell=None, title=''):
+        """
+        表示するデータを差し替え、全期間を表示する
+        lines: {ラベル: (値の配列/Series, 色)}  buy/sell: シグナル (0/1) の配列/Series
+        """
+        self.index = pd.DatetimeIndex(df.index)
+        self.open = df['Open'].to_numpy(dtype=np.float64)
+        self.high = df['High'].to_numpy(dtype=np.float64)
+        self.low = df['Low'].to_numpy(dtype=np.float64)
+        self.close = df['Close'].to_numpy(dtype=np.float64)
+        self.volume = df['Volume'].to_numpy(dtype=np.float64)
+        n = len(self.close)
+        self.buy = np.zeros(n, dtype=bool) if buy is None else np.asarray(buy) > 0
+        self.sell = np.zeros(n, dtype=bool) if sell is None else np.asarray(sell) > 0
+        intraday = n and (self.index.hour.any() or self.index.minute.any())
+        self.date_format = '%Y-%m-%d %H:%M' if intraday else '%Y-%m-%d'
+
+        lines = lines or {}
+        for label in list(self.lines):
+            if label not in lines:
+                self.lines.pop(label)[0].remove()
+        for label, (values, color) in lines.items():
+            if label not in self.lines:
+                line, = self.ax.plot([], [], color=color, linewidth=0.7, label=label, animated=self.canvas is not None)
+                self.lines[label] = (line, None)
+            self.lines[label] = (self.lines[label][0], np.asarray(values, dtype=np.float64))
+        legend = self.ax.get_legend()
+        shown = [text.get_text() for text in legend.get_texts()] if legend else []
+        if self.legend and shown != list(self.lines):
+            self.ax.legend(loc='upper left')
+
+        if self.ax.get_title() != title:
+            self.ax.set_title(title)
+        # 全期間を表示 (xlim_changed から render が呼ばれる)
+        self.ax.set_xlim(-0.5, max(n, 1) - 0.5)
+
+    def visible_range(self):
+        """表示中のバー番号の範囲 [lo, hi)"""
+        left, right = self.ax.get_xlim()
+        n = len(self.close)
+        lo = int(np.clip(np.floor(left + 0.5), 0, n))
+        hi = int(np.clip(np.ceil(right + 0.5), lo, n))
+        return lo, hi
+
+    def bar_budget(self):
+        """表示範囲に描くローソク足の最大本数 (既定は軸の横幅から決める)"""
+        if self.max_bars:
+            return self.max_bars
+        width = self.ax.get_window_extent().width
+        return max(int(width / self.pixels_per_bar), 10)
+
+    # --- 描画 ---
+    def render(self):
+        """表示範囲のバーを集約して各アーティストを更新する (x 軸の範囲が変わるたびに呼ばれる)"""
+        lo, hi = self.visible_range()
+        if hi <= lo:
+            # 表示するバーが無い (空のデータ・範囲外) ときも前のローソク足や線を残さない
+            self.wicks.set_segments([])
+            self.bodies.set_verts([])
+            if self.volume_bars is not None:
+                self.volume_bars.set_verts([])
+            for line, _ in self.lines.values():
+                line.set_data([], [])
+            self.buy_marker.set_data([], [])
+            self.sell_marker.set_data([], [])
+            return
+        starts, stop = bucket_starts(lo, hi, self.bar_budget(), len(self.close))
+        o, h, l, c, v = decimate_ohlcv(self.open, self.high, self.low, self.close, self.volume, starts, stop)
+        ends = np.append(starts[1:], stop)
+        centers = (starts + ends - 1) / 2.0
+        half = (ends - starts) * 0.4
+        colors = np.where(c >= o, UP_COLOR, DOWN_COLOR)
+
+        self.wicks.set_segments(np.stack([np.column_stack([centers, l]), np.column_stack([centers, h])], axis=1))
+        self.wicks.set_color(colors)
+        left, right = centers - half, centers + half
+        top, bottom = np.maximum(o, c), np.minimum(o, c)
+        self.bodies.set_verts(np.stack([np.column_stack([left, bottom]), np.column_stack([left, top]),
+                                        np.column_stack([right, top]), np.column_stack([right, bottom])], axis=1))
+        self.bodies.set_facecolor(colors)
+        if self.volume_bars is not None:
+            zeros = np.zeros_like(v)
+            self.volume_bars.set_verts(np.stack([np.column_stack([left, zeros]), np.column_stack([left, v]),
+                                                 np.column_stack([right, v]), np.column_stack([right, zeros])],
+                                                axis=1))
+            self.volume_bars.set_facecolor(colors)
+
+        # 線はまとまりの末尾の値を中央に置く
+        for line, values in self.lines.values():
+            line.set_data(centers, values[ends - 1])
+        self.buy_marker.set_data(*decimate_markers(self.buy, self.close, starts, stop))
+        self.sell_marker.set_data(*decimate_markers(self.sell, self.close, starts, stop))
+
+        # 縦軸は表示範囲の高値/安値に合わせる
+        y_min, y_max = np.nanmin(l), np.nanmax(h)
+        if np.isfinite(y_min) and np.isfinite(y_max):
+            pad = (y_max - y_min) * 0.05 or abs(y_max) * 0.01 or 1.0
+            self.ax.set_ylim(y_min - pad, y_max + pad)
+        if self.ax_volume is not None:
+            self.ax_volume.set_ylim(0, (v.max() if len(v) else 0) * 1.1 or 1.0)
+
+    def _format_date(self, x, pos=None):
+        i = int(round(x))
+        if 0 <= i < len(self.index):
+            return self.index[i].strftime(self.date_format)
+        return ''
+
+    # --- キャンバスへの表示 ---
+    def dynamic_artists(self):
+        """データを差し替えるたびに描き直すアーティスト"""
+        artists = [self.wicks, self.bodies, self.volume_bars, self.buy_marker, self.sell_marker]
+        artists += [line for line, _ in self.lines.values()]
+        return [artist for artist in artists if artist is not None]
+
+    def view_state(self):
+        """背景 (軸・目盛り・タイトル・凡例) の見た目を決める値。前回と同じなら blit できる"""
+        ends = (self.index[0], self.index[-1]) if len(self.index) else None
+        return ([ax.get_xlim() for ax in self.axes], [ax.get_ylim() for ax in self.axes],
+                self.ax.get_title(), list(self.lines), len(self.index), ends, self.fig.bbox.bounds)
+
+    def attach(self, canvas):
+        """キャンバスに結び付ける (データ部分を animated にし、ホイール操作を有効にする)"""
+        self.canvas = canvas
+        for artist in self.dynamic_artists():
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self._on_draw)
+        self.connect_scroll_zoom(canvas)
+
+    def _on_draw(self, event):
+        # 通常の描画 (animated 以外) が終わったら背景を保存し、データ部分を上に描く
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.drawn_state = self.view_state()
+        self._draw_dynamic()
+
+    def _draw_dynamic(self):
+        for artist in self.dynamic_artists():
+            artist.axes.draw_artist(artist)
+
+    def refresh(self):
+        """
+        set_data の後に呼ぶ。背景が前回と同じならデータ部分だけ描いて blit、
+        違えばキャンバス全体を描き直す (戻り値: blit したら True)
+        attach 前はキャンバスが無いので何もしない (False)
+        """
+        if self.canvas is None:
+            return False
+        if self.background is not None and self.view_state() == self.drawn_state:
+            self.canvas.restore_region(self.background)
+            self._draw_dynamic()
+            self.canvas.blit(self.fig.bbox)
+            return True
+        self.canvas.draw_idle()
+        return False
+
+    # --- 操作 ---
+    def zoom(self, center, factor):
+        """center (バー番号) を中心に表示範囲を factor 倍にする"""
+        left, right = self.ax.get_xlim()
+        n = max(len(self.close), 1)
+        width = min(max((right - left) * factor, 10), n)
+        left = min(max(center - (center - left) * width / (right - left), -0.5), n - 0.5 - width)
+        self.ax.set_xlim(left, left + width)
+
+    def connect_scroll_zoom(self, canvas, step=0.8):
+        """マウスホイールで拡大・縮小し、ダブルクリックで全期間に戻す"""
+        def on_scroll(event):
+            if event.inaxes in self.axes and event.xdata is not None:
+                self.zoom(event.xdata, step if event.button == 'up' else 1 / step)
+                canvas.draw_idle()
+
+        def on_click(event):
+            if event.dblclick and event.inaxes in self.axes:
+                self.ax.set_xlim(-0.5, max(len(self.close), 1) - 0.5)
+                canvas.draw_idle()
+
+        canvas.mpl_connect('scroll_event', on_scroll)
+        canvas.mpl_connect('button_press_event', on_click)
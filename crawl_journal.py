@@ -0,0 +1,112 @@
+"""
+クロール状況の記録 (SQLite)
+URL ごとに 状態 (done / failed)・銘柄コード・株価・PDF の保存先・PDF の URL とハッシュを
+1件処理するたびに書き込む。途中で落ちても、次回は完了済みの URL を飛ばして
+未処理と失敗したものだけを処理し直せる。
+PDF は前回と同じ URL で、保存済みファイルのハッシュが記録と一致すればダウンロードしない。
+
+使い方:
+    journal = CrawlJournal('crawl_journal.sqlite')
+    todo = journal.pending(links)
+    ...
+    journal.record_done(url, row)
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from hashing import file_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url          TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    stock_code   TEXT,
+    price        TEXT,
+    pdf_path     TEXT,
+    pdf_url      TEXT,
+    content_hash TEXT,
+    failures     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    updated_at   REAL NOT NULL
+)
+"""
+
+
+class CrawlJournal:
+    """複数スレッドから共有できるクロール記録 (書き込みごとにコミット)"""
+
+    def __init__(self, path='crawl_journal.sqlite'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _upsert(self, url, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(fields)
+        placeholders = ', '.join('?' for _ in fields)
+        updates = ', '.join(f'{col} = excluded.{col}' for col in fields)
+        with self.lock:
+            self.conn.execute(f'INSERT INTO pages (url, {columns}) VALUES (?, {placeholders}) '
+                              f'ON CONFLICT(url) DO UPDATE SET {updates}', [url, *fields.values()])
+            self.conn.commit()
+
+    # --- 参照 ---
+    def pending(self, urls, refresh=False):
+        """処理が必要な URL (未処理・失敗)。refresh=True なら完了済みも含めて全部"""
+        if refresh:
+            return list(urls)
+        with self.lock:
+            done = {url for url, in self.conn.execute("SELECT url FROM pages WHERE status = 'done'")}
+        return [url for url in urls if url not in done]
+
+    def rows(self, urls):
+        """完了済み URL の結果を urls の順に Excel 用の行として返す"""
+        with self.lock:
+            records = {url: (code, price, pdf_path) for url, code, price, pdf_path in self.conn.execute(
+                "SELECT url, stock_code, price, pdf_path FROM pages WHERE status = 'done'")}
+        rows = []
+        for url in urls:
+            if url in records:
+                code, price, pdf_path = records[url]
+                rows.append({'Stock Code': code, 'Price': price,
+                             'PDF': os.path.basename(pdf_path) if pdf_path else f'{code}.pdf'})
+        return rows
+
+    def counts(self):
+        """状態ごとの件数"""
+        with self.lock:
+            return dict(self.conn.execute('SELECT status, COUNT(*) FROM pages GROUP BY status'))
+
+    def pdf_unchanged(self, url, pdf_url, path):
+        """前回と同じ PDF の URL で、保存済みファイルのハッシュが記録と一致すれば True"""
+        with self.lock:
+            record = self.conn.execute('SELECT pdf_url, content_hash FROM pages WHERE url = ?', (url,)).fetchone()
+        if not record or record[0] != pdf_url or not record[1] or not os.path.exists(path):
+            return False
+        return file_hash(path) == record[1]
+
+    # --- 記録 ---
+    def record_done(self, url, row):
+        self._upsert(url, status='done', stock_code=row['Stock Code'], price=row['Price'], error=None)
+
+    def record_failure(self, url, error):
+        with self.lock:
+            self.conn.execute('INSERT INTO pages (url, status, failures, error, updated_at) VALUES (?, ?, 1, ?, ?) '
+                              'ON CONFLICT(url) DO UPDATE SET status = excluded.status, '
+                              'failures = failures + 1, error = excluded.error, updated_at = excluded.updated_at',
+                              (url, 'failed', str(error), time.time()))
+            self.conn.commit()
+
+    def record_pdf(self, url, pdf_url, path, content_hash=None):
+        """保存した PDF の URL・保存先・ハッシュ (省略時はファイルから計算) を記録"""
+        self._upsert(url, status='pending', pdf_url=pdf_url, pdf_path=path,
+                     content_hash=content_hash or file_hash(path))
@@ -0,0 +1,191 @@
+"""
+収集済みタイトルの重複判定ストア (SQLite + 任意で Bloom フィルター)
+タイトルは正規化してから 64bit のハッシュにし、SQLite の INTEGER PRIMARY KEY (= B-tree の索引) に
+記録日時と一緒に保存する。起動時に全件を読み込まないので、履歴がどれだけ増えても起動時間とメモリは一定。
+add_many() は1回の巡回分をまとめて1トランザクションで書き込む。
+ttl (秒) を指定すると、それより古いタイトルは忘れる (同じタイトルが再び新着として扱われる)。
+bloom_bits を指定すると固定サイズの Bloom フィルターを前段に置き、未収集のタイトルは SQLite を引かずに判定する
+(フィルターも SQLite に保存するので起動時の読み込みは一定サイズ)。
+期限切れで消したタイトルのビットはフィルターに残す (SQLite を引く回数が少し増えるだけで判定は正しい)。
+立っているビットの割合が BLOOM_REBUILD_FILL を超えたときだけ、1日1回までを限度に全件から作り直す。
+
+使い方:
+    store = DedupStore('collected_titles.sqlite', ttl=90 * 24 * 3600, bloom_bits=1 << 20)
+    new_titles = store.add_many(titles)  # まだ記録されていなかったものだけ (記録もする)
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    hash    INTEGER PRIMARY KEY,
+    title   TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_at_index ON seen (seen_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+BLOOM_HASHES = 7
+# Bloom フィルターを作り直す目安 (立っているビットの割合) と最短の間隔 (秒)
+BLOOM_REBUILD_FILL = 0.5
+BLOOM_REBUILD_INTERVAL = 24 * 3600
+# SQLite のパラメーター数の上限より小さく
+BATCH = 500
+
+
+def title_key(title):
+    """タイトルの正規化 (NFKC + 前後の空白除去) 後の SHA-256 の先頭 64bit (符号付き整数)"""
+    digest = hashlib.sha256(unicodedata.normalize('NFKC', title).strip().encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+class BloomFilter:
+    """ビット数固定の Bloom フィルター (64bit のキーから二重ハッシュで位置を決める)"""
+
+    def __init__(self, bits, hashes=BLOOM_HASHES, data=None):
+        self.bits = bits
+        self.hashes = hashes
+        self.data = bytearray(data) if data is not None else bytearray((bits + 7) // 8)
+
+    def _positions(self, key):
+        key &= (1 << 64) - 1
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.data[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.data[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def fill_ratio(self):
+        """立っているビットの割合"""
+        return int.from_bytes(self.data, 'big').bit_count() / self.bits
+
+
+class DedupStore:
+    """複数スレッドから共有できる重複判定ストア"""
+
+    def __init__(self, path='collected_titles.sqlite', ttl=None, bloom_bits=None):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.bloom = None
+        self.bloom_rebuilt_at = 0.0
+        if bloom_bits:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'bloom'").fetchone()
+            if row and len(row[0]) == (bloom_bits + 7) // 8:
+                self.bloom = BloomFilter(bloom_bits, data=row[0])
+                rebuilt = self.conn.execute("SELECT value FROM meta WHERE key = 'bloom_rebuilt_at'").fetchone()
+                self.bloom_rebuilt_at = float(rebuilt[0]) if rebuilt else 0.0
+            else:
+                self.bloom = BloomFilter(bloom_bits)
+                self._rebuild_bloom()
+        self.expire()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def __contains__(self, title):
+        key = title_key(title)
+        if self.bloom is not None and key not in self.bloom:
+            return False  # Bloom フィルターに無ければ確実に未収集
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM seen WHERE hash = ?', (key,)).fetchone() is not None
+
+    def _existing(self, keys):
+        """keys のうち記録済みのもの (lock を取った状態で呼ぶ)"""
+        if self.bloom is not None:
+            keys = [key for key in keys if key in self.bloom]
+        existing = set()
+        for i in range(0, len(keys), BATCH):
+            chunk = keys[i:i + BATCH]
+            existing.update(key for key, in self.conn.execute(
+                f"SELECT hash FROM seen WHERE hash IN ({','.join('?' * len(chunk))})", chunk))
+        return existing
+
+    def add_many(self, titles, now=None):
+        """
+        titles のうち未収集のものを記録し、そのタイトルを (入力の順・重複なしで) 返す
+        1回の呼び出しを1トランザクションで書き込む
+        """
+        now = time.time() if now is None else now
+        keyed = {}
+        for title in titles:
+            keyed.setdefault(title_key(title), title)
+        with self.lock:
+            existing = self._existing(list(keyed))
+            new = [(key, title) for key, title in keyed.items() if key not in existing]
+            if new:
+                with self.conn:
+                    self.conn.executemany('INSERT OR IGNORE INTO seen (hash, title, seen_at) VALUES (?, ?, ?)',
+                                          [(key, title, now) for key, title in new])
+                    if self.bloom is not None:
+                        for key, _ in new:
+                            self.bloom.add(key)
+                        self._save_bloom()
+        return [title for _, title in new]
+
+    def expire(self, now=None):
+        """
+        ttl より古い記録を消す。戻り値: 消した件数
+        Bloom フィルターは消した分のビットを残したままにし、埋まり過ぎたときだけ (1日1回まで) 作り直す
+        """
+        if not self.ttl:
+            return 0
+        now = time.time() if now is None else now
+        with self.lock:
+            with self.conn:
+                removed = self.conn.execute('DELETE FROM seen WHERE seen_at < ?', (now - self.ttl,)).rowcount
+            if (removed and self.bloom is not None and now - self.bloom_rebuilt_at >= BLOOM_REBUILD_INTERVAL
+                    and self.bloom.fill_ratio() > BLOOM_REBUILD_FILL):
+                self.bloom = BloomFilter(self.bloom.bits)
+                self._rebuild_bloom(now)
+        return removed
+
+    def _rebuild_bloom(self, now=None):
+        """記録済みの全キーから Bloom フィルターを作り直して保存する (lock を取った状態か初期化中に呼ぶ)"""
+        for key, in self.conn.execute('SELECT hash FROM seen'):
+            self.bloom.add(key)
+        self.bloom_rebuilt_at = time.time() if now is None else now
+        with self.conn:
+            self._save_bloom()
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bloom_rebuilt_at', ?)",
+                              (self.bloom_rebuilt_at,))
+
+    def _save_bloom(self):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bloom', ?)", (bytes(self.bloom.data),))
+
+    def import_lines(self, path):
+        """
+        旧形式 (1行1タイトルのテキストファイル) の履歴を取り込む (同じファイルは1回だけ)
+        戻り値: 取り込んだ件数
+        """
+        marker = f'imported:{os.path.abspath(path)}'
+        with self.lock:
+            done = self.conn.execute('SELECT 1 FROM meta WHERE key = ?', (marker,)).fetchone()
+        if done or not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            titles = [line.strip() for line in f if line.strip()]
+        imported = len(self.add_many(titles))
+        with self.lock:
+            with self.conn:
+                self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (marker, imported))
+        return imported
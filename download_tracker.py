@@ -0,0 +1,87 @@
+"""
+ブラウザのダウンロード完了検知
+クリック前にフォルダの中身を控えておき、その後に現れたファイルのうち
+書き込み中 (.crdownload など) が無くなった時点で完了とみなして、すぐにパスを返す。
+watchdog があればフォルダの変更通知 (Linux は inotify、Windows は ReadDirectoryChangesW) で起こされ、
+なければ短い間隔でフォルダを確認する。
+
+使い方:
+    with DownloadTracker(download_dir) as tracker:
+        link.click()
+        path = tracker.wait(timeout=30, expected='140120241210536577.pdf')
+"""
+import os
+import threading
+import time
+
+# 書き込み中のファイルに付く拡張子 (Chrome / Edge / Firefox)
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp', '.part')
+
+
+def _observer(directory, on_change):
+    """watchdog でフォルダを監視する Observer (watchdog が無ければ None)"""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            on_change()
+
+    observer = Observer()
+    observer.schedule(Handler(), directory, recursive=False)
+    observer.start()
+    return observer
+
+
+class DownloadTracker:
+    """1回のダウンロード (with ブロック内で開始したもの) の完了を待つ"""
+
+    def __init__(self, directory, suffix='.pdf', poll_interval=0.2):
+        self.directory = directory
+        self.suffix = suffix
+        self.poll_interval = poll_interval
+        self.before = set()
+        self.changed = threading.Event()
+        self.observer = None
+
+    def __enter__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.before = set(os.listdir(self.directory))
+        self.observer = _observer(self.directory, self.changed.set)
+        return self
+
+    def __exit__(self, *exc):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def completed(self, expected=None):
+        """開始後に現れ、書き込みが終わったファイルのパス (まだなら None)"""
+        names = os.listdir(self.directory)
+        if any(name.endswith(PARTIAL_SUFFIXES) and name not in self.before for name in names):
+            return None
+        new = [name for name in names if name not in self.before and name.endswith(self.suffix)]
+        if expected is not None:
+            new = [name for name in new if name == expected] or new
+        if not new:
+            return None
+        return max((os.path.join(self.directory, name) for name in new), key=os.path.getmtime)
+
+    def wait(self, timeout=30, expected=None):
+        """
+        完了したファイルのパスを返す (timeout 秒以内に完了しなければ None)
+        expected (サーバー側のファイル名) が分かっていれば、そのファイルを優先する
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.changed.clear()
+            path = self.completed(expected)
+            if path or time.monotonic() >= deadline:
+                return path
+            # 変更通知が来るか、通知が無い環境では poll_interval ごとに確認し直す
+            wait = self.poll_interval if self.observer is None else max(self.poll_interval * 5, 1.0)
+            self.changed.wait(min(wait, max(deadline - time.monotonic(), 0)))
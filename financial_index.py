@@ -0,0 +1,367 @@
+"""
+決算短信の主要数値の抽出と検索用インデックス
+pdf_files の決算短信 (PyMuPDF で抽出したテキスト) の1ページ目のサマリー表から
+売上高・営業利益・経常利益・純利益 (と前年同期比)・1株当たり利益・総資産・業績予想 を取り出し、
+銘柄コード × 期 ごとの列形式 (列ごとの NumPy 配列) で保存する。
+あわせて全文の文字 2-gram の転置インデックスを作るので、条件検索もキーワード検索も PDF を開かずに済む。
+
+使い方:
+    python financial_index.py build --folder pdf_files
+    python financial_index.py query "operating_profit_yoy > 20"
+    python financial_index.py search 生成AI
+
+    index = FinancialIndex.load('financial_index')
+    index.query('operating_profit_yoy > 20')  # → DataFrame (銘柄コード・期 が索引)
+    index.search('データセンター')             # → [(銘柄コード, 出現数)]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = 'financial_index'
+
+# ======================
+# サマリー表の解析
+# ======================
+# 表の見出し → 列名。左から順に照合し、前年同期比 (%) と組になる項目は2セル、それ以外は1セル
+METRIC_PATTERNS = [
+    ('ratio', r'(?:自己資本|総資産|売上高)\S*?利益率'),
+    ('bps', r'1株当たり(?:純資産|親会社所有者帰属持分)'),
+    ('eps_diluted', r'(?:潜在株式調整後|希薄化後)1株当たり(?:当期|四半期|中間)?純?利益'),
+    ('eps', r'1株当たり(?:当期|四半期|中間)?純?利益'),
+    ('comprehensive', r'(?:当期|四半期|中間)?包括利益(?:合計額)?'),
+    ('net_profit_owners', r'帰属する(?:当期|四半期|中間)純?利益'),
+    ('revenue', r'売上高|売上収益|営業収益|営業総収入|営業収入|経常収益'),
+    ('ebitda', r'EBITDA'),
+    ('operating_profit', r'営業利益'),
+    ('ordinary_profit', r'経常利益'),
+    ('pretax_profit', r'税引前(?:当期|四半期|中間)?利益'),
+    ('net_profit', r'(?:当期|四半期|中間)純?利益'),
+    ('equity_ratio', r'自己資本比率|帰属持分比率'),
+    ('total_assets', r'総資産|資産合計'),
+    ('net_assets', r'純資産|資本合計'),
+    ('owners_equity', r'帰属する持分'),
+    ('cash_flow', r'活動による(?:キャッシュ・フロー)?'),
+    ('cash', r'現金及び現金同等物(?:期末残高)?'),
+    ('dividend', r'第\d四半期末|期末|合計|配当金総額|配当性向|配当率'),
+]
+METRIC_RE = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in METRIC_PATTERNS))
+WITH_YOY = {'revenue', 'ebitda', 'operating_profit', 'ordinary_profit', 'pretax_profit', 'net_profit',
+            'net_profit_owners', 'comprehensive'}
+MONEY = WITH_YOY | {'total_assets', 'net_assets', 'owners_equity', 'cash_flow', 'cash'}
+
+# 行の見出し (期 / 業績予想の 通期・第2四半期 など)。和暦 (令和) の年は 6年 のように2桁以下
+PERIOD = r'\d{1,4}年\d{1,2}月期(?:第\d四半期|中間期)?(?:\(予想\))?'
+ROW_LABEL_RE = re.compile(rf'{PERIOD}|通期|第\d四半期\(?累計\)?|中間期|上期|下期')
+FORECAST_HEADING_RE = re.compile(r'(\d{1,4}年\d{1,2}月期)の(?:連結|個別)?業績予想')
+CODE_RE = re.compile(r'コード番号\s*([0-9][0-9A-Z]{3})')
+# サマリーのここから先 (個別業績・添付資料) は読まない
+SUMMARY_END_RE = re.compile(r'^\(\d\)個別|添付資料|^\(参考\)個別')
+NUMBER_RE = re.compile(r'^[△▲\-−+]?[\d,]+(?:\.\d+)?$|^[-―–]$')
+
+# 保存する列 (順番は表示順)
+METRIC_COLUMNS = ['revenue', 'revenue_yoy', 'operating_profit', 'operating_profit_yoy',
+                  'ordinary_profit', 'ordinary_profit_yoy', 'pretax_profit', 'pretax_profit_yoy',
+                  'net_profit', 'net_profit_yoy', 'eps', 'total_assets', 'net_assets', 'equity_ratio']
+FORECAST_COLUMNS = ['forecast_revenue', 'forecast_revenue_yoy', 'forecast_operating_profit',
+                    'forecast_operating_profit_yoy', 'forecast_ordinary_profit', 'forecast_ordinary_profit_yoy',
+                    'forecast_net_profit', 'forecast_net_profit_yoy', 'forecast_eps']
+TEXT_COLUMNS = ['code', 'period', 'forecast_period', 'source']
+
+
+def to_number(cell):
+    """'4,410' → 4410.0 / '△3.2' → -3.2 / '-' → nan"""
+    cell = cell.replace(',', '').replace('△', '-').replace('▲', '-').replace('−', '-')
+    try:
+        return float(cell)
+    except ValueError:
+        return np.nan
+
+
+def normalize_period(label):
+    """和暦 (令和) の '6年11月期第3四半期' を '2024年11月期第3四半期' にする"""
+    year, _, rest = label.partition('年')
+    return f'{int(year) + 2018}年{rest}' if len(year) <= 2 else label
+
+
+def cells(lines):
+    """行を空白で区切ったセルの列 (PDF によって1セル1行のものと1行に複数セルのものがある)"""
+    for line in lines:
+        yield from line.split()
+
+
+def parse_tables(lines):
+    """
+    1セル1行のテキストから表を読み取る
+    戻り値: [(列名のリスト, 単位の倍率, [(行見出し, [数値, ...])])]
+    見出しの無い行 (数値の続き) は直前の表の行として扱う
+    """
+    tables, pending, row = [], [], None
+    for line in cells(lines):
+        if NUMBER_RE.match(line):
+            if row is None:
+                text = ''.join(pending)
+                labels = list(ROW_LABEL_RE.finditer(text))
+                if not labels:
+                    pending = []
+                    continue  # 行見出しの無い数値 (ページ番号など)
+                # 列見出しは 直前の行見出し と この行の行見出し の間
+                start = labels[-2].end() if len(labels) > 1 else 0
+                header = text[start:labels[-1].start()]
+                # 注記の文や前の表の番号 ((2) など) より後だけを見る
+                header = re.split(r'。|\(\d\)', header)[-1]
+                columns = [match.lastgroup for match in METRIC_RE.finditer(header)]
+                if columns:
+                    scale = 0.001 if '千円' in header else 1.0
+                    tables.append((columns, scale, []))
+                row = (labels[-1].group(), [])
+                if tables:
+                    tables[-1][2].append(row)
+                pending = []
+            row[1].append(to_number(line))
+        else:
+            row = None
+            pending.append(line)
+    return tables
+
+
+def rows_to_records(tables):
+    """表の行を 行見出し → {列名: 値} にまとめる (セル数が列と合わない行は使わない)"""
+    records = {}
+    for columns, scale, rows in tables:
+        names = []
+        for column in columns:
+            names.append(column)
+            if column in WITH_YOY:
+                names.append(column + '_yoy')
+        for label, cells in rows:
+            if len(cells) != len(names):
+                continue
+            record = records.setdefault(label, {})
+            for name, value in zip(names, cells):
+                record.setdefault(name, value * scale if name in MONEY else value)
+    for record in records.values():
+        # 親会社株主 (所有者) に帰属する利益があればそれを純利益とする
+        for suffix in ('', '_yoy'):
+            if 'net_profit_owners' + suffix in record:
+                record['net_profit' + suffix] = record['net_profit_owners' + suffix]
+    return records
+
+
+def extract_metrics(text):
+    """
+    決算短信のテキストから主要数値を取り出す
+    戻り値: {'code', 'period', 列名: 値, ...} (サマリー表が見つからなければ None)
+    """
+    text = unicodedata.normalize('NFKC', text)
+    lines = []
+    for raw in text.splitlines():
+        line = ' '.join(raw.split())
+        # '2025 年2 月期' '1 株当たり' '△ 7.4' のように数字の前後に入った空白を詰める
+        line = re.sub(r'(?<=\d) (?=[^\x00-\x7f])|(?<=[△▲]) ', '', line)
+        if SUMMARY_END_RE.search(line):
+            break
+        if line:
+            lines.append(line)
+    records = rows_to_records(parse_tables(lines))
+    summary = '\n'.join(lines)
+
+    # 当期 = 売上高か営業利益がある最初の期
+    periods = [label for label, record in records.items()
+               if re.fullmatch(PERIOD, label) and '予想' not in label
+               and ('revenue' in record or 'operating_profit' in record)]
+    if not periods:
+        return None
+    result = {'period': normalize_period(periods[0]), **{col: records[periods[0]].get(col, np.nan) for col in METRIC_COLUMNS}}
+
+    forecast = records.get('通期', {})
+    heading = FORECAST_HEADING_RE.search(summary)
+    result['forecast_period'] = normalize_period(heading.group(1)) if heading and forecast else ''
+    for col in FORECAST_COLUMNS:
+        result[col] = forecast.get(col[len('forecast_'):], np.nan)
+
+    code = CODE_RE.search(summary)
+    result['code'] = code.group(1) if code else ''
+    return result
+
+
+# ======================
+# 全文インデックス (文字 2-gram)
+# ======================
+def normalize_for_search(text):
+    """NFKC + 空白・改行を除いたもの (2-gram の元)"""
+    return ''.join(unicodedata.normalize('NFKC', text).split())
+
+
+def bigrams(text):
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def build_postings(texts):
+    """
+    文書ごとのテキストから転置インデックスを作る
+    戻り値: (2-gram の配列 (ソート済み), 各 2-gram の開始位置, 文書番号, 出現数)
+    """
+    postings = {}
+    for doc_id, text in enumerate(texts):
+        for term, count in Counter(bigrams(normalize_for_search(text))).items():
+            postings.setdefault(term, []).append((doc_id, count))
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+    pairs = np.array([pair for term in terms for pair in postings[term]], dtype=np.int32).reshape(-1, 2)
+    return np.array(terms, dtype='<U2'), offsets, pairs[:, 0].copy(), pairs[:, 1].copy()
+
+
+# ======================
+# インデックス
+# ======================
+class FinancialIndex:
+    """主要数値の列と全文の転置インデックス (どちらも NumPy 配列で保存・読み込み)"""
+
+    def __init__(self, columns, docs, terms, offsets, doc_ids, counts):
+        self.columns = columns  # 列名 → 配列 (1行 = 1文書)
+        self.docs = docs        # 文書番号 → 銘柄コード
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.counts = counts
+        self._frame = None
+
+    @classmethod
+    def build(cls, pdf_paths, cache_dir=None, workers=None):
+        """PDF (抽出済みテキストのキャッシュがあればそれ) からインデックスを作る"""
+        from pdf_text import DEFAULT_CACHE_DIR, extract_texts
+
+        pdf_paths = sorted(pdf_paths)
+        texts = extract_texts(pdf_paths, cache_dir or DEFAULT_CACHE_DIR, workers)
+        records, docs = [], []
+        for path in pdf_paths:
+            metrics = extract_metrics(texts[path])
+            stem = os.path.splitext(os.path.basename(path))[0]
+            code = (metrics or {}).get('code') or stem
+            docs.append(code)
+            if metrics:
+                metrics.update(code=code, source=os.path.basename(path))
+                records.append(metrics)
+        # 同じ銘柄・期が複数あればファイル名順で後のものを使う
+        records = list({(r['code'], r['period']): r for r in records}.values())
+        columns = {col: np.array([r[col] for r in records], dtype=str) for col in TEXT_COLUMNS}
+        columns.update({col: np.array([r[col] for r in records], dtype=np.float64)
+                        for col in METRIC_COLUMNS + FORECAST_COLUMNS})
+        return cls(columns, np.array(docs, dtype=str), *build_postings([texts[path] for path in pdf_paths]))
+
+    def save(self, index_dir=DEFAULT_INDEX_DIR):
+        os.makedirs(index_dir, exist_ok=True)
+        np.savez(os.path.join(index_dir, 'metrics.npz'), **self.columns)
+        np.savez(os.path.join(index_dir, 'fulltext.npz'), docs=self.docs, terms=self.terms,
+                 offsets=self.offsets, doc_ids=self.doc_ids, counts=self.counts)
+
+    @classmethod
+    def load(cls, index_dir=DEFAULT_INDEX_DIR):
+        with np.load(os.path.join(index_dir, 'metrics.npz')) as metrics:
+            columns = {name: metrics[name] for name in metrics.files}
+        with np.load(os.path.join(index_dir, 'fulltext.npz')) as fulltext:
+            return cls(columns, *(fulltext[name] for name in ('docs', 'terms', 'offsets', 'doc_ids', 'counts')))
+
+    # --- 数値の検索 ---
+    @property
+    def frame(self):
+        """主要数値の DataFrame (銘柄コード・期 が索引)"""
+        if self._frame is None:
+            import pandas as pd
+
+            self._frame = pd.DataFrame(self.columns).set_index(['code', 'period']).sort_index()
+        return self._frame
+
+    def query(self, expr):
+        """pandas の query 式で絞り込む (例: 'operating_profit_yoy > 20 and revenue > 10000')"""
+        return self.frame.query(expr)
+
+    def get(self, code):
+        """1銘柄分の全期"""
+        return self.frame.xs(code, level='code', drop_level=False)
+
+    # --- 全文検索 ---
+    def _postings(self, term):
+        i = np.searchsorted(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            return self.doc_ids[self.offsets[i]:self.offsets[i + 1]], self.counts[self.offsets[i]:self.offsets[i + 1]]
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    def search(self, keyword):
+        """
+        keyword の 2-gram をすべて含む文書の銘柄コードを 出現数 の多い順に返す
+        (2-gram の AND なので、まれに語順の違う文書も含まれる)
+        戻り値: [(銘柄コード, 出現数)]
+        """
+        keyword = normalize_for_search(keyword)
+        if len(keyword) == 1:
+            # 1文字なら、その文字で始まる 2-gram のどれかを含む文書
+            lo = np.searchsorted(self.terms, keyword)
+            hi = np.searchsorted(self.terms, keyword + '\U0010ffff')
+            docs = self.doc_ids[self.offsets[lo]:self.offsets[hi]]
+            scores = np.bincount(docs, weights=self.counts[self.offsets[lo]:self.offsets[hi]],
+                                 minlength=len(self.docs))
+        else:
+            scores = None
+            for term in set(bigrams(keyword)):
+                docs, counts = self._postings(term)
+                hits = np.zeros(len(self.docs))
+                hits[docs] = counts
+                # 出現数は 2-gram の中で最も少ないもの
+                scores = hits if scores is None else np.minimum(scores, hits)
+        if scores is None:
+            return []
+        order = np.argsort(-scores, kind='stable')
+        return [(str(self.docs[i]), int(scores[i])) for i in order if scores[i] > 0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="決算短信の主要数値と全文のインデックス")
+    parser.add_argument('--index', default=DEFAULT_INDEX_DIR, help="インデックスの保存先フォルダ")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help="PDF フォルダからインデックスを作る")
+    p.add_argument('--folder', default='pdf_files')
+    p.add_argument('--workers', type=int, default=None, help="テキスト抽出のプロセス数")
+    p = sub.add_parser('query', help="主要数値を条件で絞り込む")
+    p.add_argument('expr', help="例: \"operating_profit_yoy > 20\"")
+    p = sub.add_parser('search', help="キーワードを含む銘柄")
+    p.add_argument('keyword')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    start = time.perf_counter()
+    if args.command == 'build':
+        index = FinancialIndex.build(glob.glob(os.path.join(args.folder, '*.pdf')), workers=args.workers)
+        index.save(args.index)
+        found = len(index.columns['code'])
+        print(f"{len(index.docs)} 文書 (数値を取得 {found} 件), 2-gram {len(index.terms)} 種を "
+              f"{time.perf_counter() - start:.1f} 秒で {args.index} に保存しました。")
+        return
+
+    index = FinancialIndex.load(args.index)
+    loaded = time.perf_counter()
+    if args.command == 'query':
+        result = index.query(args.expr)
+        elapsed = time.perf_counter() - loaded
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(result[['revenue', 'revenue_yoy', 'operating_profit', 'operating_profit_yoy',
+                          'ordinary_profit', 'net_profit', 'forecast_operating_profit']])
+    else:
+        result = index.search(args.keyword)
+        elapsed = time.perf_counter() - loaded
+        for code, count in result:
+            print(f"{code}\t{count}")
+    print(f"{len(result)} 件 (読み込み {(loaded - start) * 1000:.1f} ms, 検索 {elapsed * 1000:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,52 +1,40 @@
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import pandas as pd
-import yfinance as yf
-import matplotlib.dates as mdates
 
-# 株価データを取得し、プロットする関数
+from chart_view import CandleChart
+from indicators import IndicatorCache
+from market_data import MarketDataCache
+
+# 取得済みの期間はローカルキャッシュから読む
+market_data = MarketDataCache()
+
+# 株価データを取得し、プロットする関数 (Figure とキャンバスは使い回し、中身だけ差し替える)
 def plot_stock():
     symbol = symbol_entry.get()
     if not symbol:
         return
 
     try:
-        # データ取得
-        data = yf.download(symbol, period="6mo")
-        data.index = pd.to_datetime(data.index)  # ★日付をdatetime型に変換
-        data['5MA'] = data['Close'].rolling(window=5).mean()
-        data['25MA'] = data['Close'].rolling(window=25).mean()
-        data['50MA'] = data['Close'].rolling(window=50).mean()
-        data['100MA'] = data['Close'].rolling(window=100).mean()
-
-        # プロット
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.plot(data.index, data['Close'], label='Close Price', color='black')  # ★ x軸にdata.indexを明示
-        ax.plot(data.index, data['5MA'], label='5-day MA', color='blue')
-        ax.plot(data.index, data['25MA'], label='25-day MA', color='green')
-        ax.plot(data.index, data['50MA'], label='50-day MA', color='red')
-        ax.plot(data.index, data['100MA'], label='100-day MA', color='purple')
-
-        # ローソク足
-        colors = ['red' if close < open else 'green' for open, close in zip(data['Open'], data['Close'])]
-        ax.bar(data.index, data['Close'] - data['Open'], bottom=data['Open'], width=0.8, color=colors)  # ★ 幅を0.8に調整
+        # データ取得 (直近6か月、未取得の期間だけダウンロード)
+        start = pd.Timestamp.today().normalize() - pd.DateOffset(months=6)
+        data = market_data.get(symbol, start)
+        indicators = IndicatorCache.from_frame(data)
+        # 4本の移動平均 (IndicatorCache にメモ化される)
+        ma_5, ma_25, ma_50, ma_100 = indicators.sma_many('Close', [5, 25, 50, 100])
 
-        # X軸のフォーマットを修正
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
-        ax.xaxis.set_major_locator(mdates.AutoDateLocator())
-        fig.autofmt_xdate()  # ★ 日付を自動で調整
-
-        ax.set_title(f'{symbol} Stock Price')
-        ax.legend()
-        ax.grid(True)
-
-        # グラフを表示
-        canvas = FigureCanvasTkAgg(fig, master=root)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.grid(row=2, column=0, columnspan=2)
-        canvas.draw()
+        # 終値と移動平均 + ローソク足
+        lines = {
+            'Close Price': (indicators['Close'], 'black'),
+            '5-day MA': (ma_5, 'blue'),
+            '25-day MA': (ma_25, 'green'),
+            '50-day MA': (ma_50, 'red'),
+            '100-day MA': (ma_100, 'purple'),
+        }
+        chart.set_data(data, lines=lines, title=f'{symbol} Stock Price')
+        chart.refresh()
+        error_label.config(text="")
 
     except Exception as e:
         error_label.config(text=f"エラー: {str(e)}")
@@ -65,6 +53,12 @@ symbol_entry.grid(row=0, column=1, padx=10, pady=10)
 plot_button = ttk.Button(root, text="表示", command=plot_stock)
 plot_button.grid(row=1, column=0, columnspan=2, pady=10)
 
+# グラフ (1つだけ作って使い回す)
+chart = CandleChart(figsize=(10, 6), volume=False, legend=True)
+canvas = FigureCanvasTkAgg(chart.fig, master=root)
+chart.attach(canvas)
+canvas.get_tk_widget().grid(row=2, column=0, columnspan=2)
+
 # エラーメッセージ用ラベル
 error_label = tk.Label(root, text="", fg="red")
 error_label.grid(row=3, column=0, columnspan=2)
@@ -0,0 +1,13 @@
+"""
+ファイル内容のハッシュ (クロール記録・テキスト抽出キャッシュ・LLM 応答キャッシュのキー)
+"""
+import hashlib
+
+
+def file_hash(path, chunk_size=1 << 16):
+    """ファイルの SHA-256 (16進文字列)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
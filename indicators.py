@@ -0,0 +1,211 @@
+"""
+テクニカル指標ライブラリ
+SMA / EMA / rolling max・min / ATR / RSI / VWAP / ボリンジャーバンド を
+連続した float64 の NumPy 配列で計算する。
+
+IndicatorCache は 1つのデータセット (列名 → 配列) に対する計算結果を (指標, 列, 窓サイズ) ごとに
+メモ化する。SMA は pandas の rolling().mean() と同じ値 (クロス判定が元の実装と変わらない) を
+(列, 窓サイズ) ごとに1回だけ計算する。
+strategy_engine の戦略カーネル、yfinace.py / get_finace.py のチャートは同じ IndicatorCache を
+共有するので、1回の実行で同じ指標を2回計算しない。
+
+使い方:
+    indicators = IndicatorCache.from_frame(df)
+    ma_5, ma_25, ma_75 = indicators.sma_many('Close', [5, 25, 75])
+    upper, middle, lower = indicators.bollinger('Close', 20, 2.0)
+    indicators.series(ma_5, df.index)  # pandas.Series が必要なとき
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# ======================
+# 配列の指標関数
+# ======================
+def rolling_max(values, n):
+    """pandas の rolling(n).max() と同じ (先頭 n-1 本は NaN)"""
+    out = np.full(len(values), np.nan)
+    if 0 < n <= len(values):
+        out[n - 1:] = sliding_window_view(values, n).max(axis=1)
+    return out
+
+
+def rolling_min(values, n):
+    """pandas の rolling(n).min() と同じ (先頭 n-1 本は NaN)"""
+    out = np.full(len(values), np.nan)
+    if 0 < n <= len(values):
+        out[n - 1:] = sliding_window_view(values, n).min(axis=1)
+    return out
+
+
+def rolling_mean(values, n):
+    """
+    pandas の rolling(n).mean() (先頭 n-1 本と、窓に NaN を含むバーは NaN)
+    pandas の窓関数そのものを使う。累積和の差や窓ごとの合計では下位ビットがずれ、
+    移動平均がちょうど並ぶバーでクロスの判定が変わってしまうため
+    """
+    import pandas as pd
+
+    return pd.Series(values, dtype=np.float64).rolling(n).mean().to_numpy()
+
+
+def rolling_std(values, n):
+    """n 本の標準偏差 (母標準偏差 ddof=0、先頭 n-1 本は NaN)"""
+    out = np.full(len(values), np.nan)
+    if 0 < n <= len(values):
+        out[n - 1:] = sliding_window_view(values, n).std(axis=1)
+    return out
+
+
+def ewm_mean(values, alpha):
+    """pandas の ewm(alpha=alpha, adjust=False).mean() と同じ指数平滑"""
+    import pandas as pd
+
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def ema(values, n):
+    """n 本の指数移動平均 (span=n)"""
+    return ewm_mean(values, 2.0 / (n + 1))
+
+
+def true_range(high, low, close):
+    """真の値幅 (先頭バーは高値 - 安値)"""
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, n=14):
+    """ATR (真の値幅の Wilder 平滑, alpha=1/n)"""
+    return ewm_mean(true_range(high, low, close), 1.0 / n)
+
+
+def rsi(values, n=14):
+    """RSI (値上がり/値下がり幅の Wilder 平滑, 0〜100、先頭バーは NaN)"""
+    out = np.full(len(values), np.nan)
+    if len(values) < 2:
+        return out
+    change = np.diff(values)
+    gain = ewm_mean(np.clip(change, 0, None), 1.0 / n)
+    loss = ewm_mean(np.clip(-change, 0, None), 1.0 / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+    return out
+
+
+def session_starts(timestamps):
+    """datetime64 の配列で日付が変わる位置 (セッション開始) の番号"""
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=np.int64)
+    day = timestamps.astype('datetime64[D]')
+    return np.flatnonzero(np.concatenate(([True], day[1:] != day[:-1])))
+
+
+def vwap(high, low, close, volume, starts=None):
+    """
+    VWAP (典型価格 (H+L+C)/3 の出来高加重平均)
+    starts (セッション開始位置) を渡すとセッションごとにリセットする
+    """
+    typical = (high + low + close) / 3.0
+    volume = np.nan_to_num(volume)
+    price_volume = np.cumsum(np.nan_to_num(typical) * volume)
+    total_volume = np.cumsum(volume)
+    if starts is not None and len(starts):
+        # 各バーが属するセッションの開始直前までの累積を引く
+        session_id = np.cumsum(np.isin(np.arange(len(close)), starts)) - 1
+        base = starts[session_id] - 1
+        has_base = base >= 0
+        price_volume = price_volume - np.where(has_base, price_volume[np.maximum(base, 0)], 0.0)
+        total_volume = total_volume - np.where(has_base, total_volume[np.maximum(base, 0)], 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_volume > 0, price_volume / total_volume, np.nan)
+
+
+# ======================
+# メモ化つき指標キャッシュ
+# ======================
+class IndicatorCache(dict):
+    """
+    列名 → 配列 の dict に、指標計算のメモ化を加えたもの
+    同じ IndicatorCache を使い回せば、戦略カーネル・チャートなど何度呼んでも
+    (指標, 列, 窓サイズ) ごとの計算は1回で済む
+    """
+
+    def __init__(self, arrays):
+        super().__init__(arrays)
+        self._memo = {}
+
+    @classmethod
+    def from_frame(cls, df, columns=('Open', 'High', 'Low', 'Close', 'Volume')):
+        """DataFrame の列 (存在するもの) と現地時刻の Datetime を配列として取り出す"""
+        import pandas as pd
+
+        arrays = {col: np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+                  for col in columns if col in df.columns}
+        dt = pd.DatetimeIndex(df['Datetime'] if 'Datetime' in df.columns else df.index)
+        if dt.tz is not None:
+            dt = dt.tz_localize(None)
+        arrays['Datetime'] = np.ascontiguousarray(dt.values)
+        return cls(arrays)
+
+    @staticmethod
+    def series(values, index, name=None):
+        """計算結果を pandas.Series にする (GUI / DataFrame 出力用)"""
+        import pandas as pd
+
+        return pd.Series(values, index=index, name=name)
+
+    def _cached(self, key, func):
+        if key not in self._memo:
+            self._memo[key] = func()
+        return self._memo[key]
+
+    # --- 移動平均 ---
+    def sma(self, col, n):
+        """n 本単純移動平均 (pandas の rolling(n).mean() と同じ値)"""
+        return self._cached(('sma', col, n), lambda: rolling_mean(self[col], n))
+
+    def sma_many(self, col, windows):
+        """
+        複数の窓サイズの SMA (窓ごとに pandas と同じ計算を1回ずつ)
+        pandas の窓合計は窓サイズごとに丸め方が違うので、1回の累積和から全窓を求めると一致しない
+        """
+        return [self.sma(col, n) for n in windows]
+
+    # strategy_engine のカーネルからの呼び名
+    rolling_mean = sma
+
+    def ema(self, col, n):
+        return self._cached(('ema', col, n), lambda: ema(self[col], n))
+
+    # --- 高値/安値 ---
+    def rolling_max(self, col, n):
+        return self._cached(('max', col, n), lambda: rolling_max(self[col], n))
+
+    def rolling_min(self, col, n):
+        return self._cached(('min', col, n), lambda: rolling_min(self[col], n))
+
+    def rolling_std(self, col, n):
+        return self._cached(('std', col, n), lambda: rolling_std(self[col], n))
+
+    # --- その他の指標 ---
+    def atr(self, n=14):
+        return self._cached(('atr', n), lambda: atr(self['High'], self['Low'], self['Close'], n))
+
+    def rsi(self, col='Close', n=14):
+        return self._cached(('rsi', col, n), lambda: rsi(self[col], n))
+
+    def vwap(self, per_session=True):
+        """VWAP (per_session=True かつ Datetime があれば日ごとにリセット)"""
+        def compute():
+            starts = session_starts(self['Datetime']) if per_session and 'Datetime' in self else None
+            return vwap(self['High'], self['Low'], self['Close'], self['Volume'], starts)
+        return self._cached(('vwap', per_session), compute)
+
+    def bollinger(self, col='Close', n=20, k=2.0):
+        """ボリンジャーバンド (上限, 中心 = SMA, 下限)"""
+        def compute():
+            middle = self.sma(col, n)
+            width = k * self.rolling_std(col, n)
+            return middle + width, middle, middle - width
+        return self._cached(('bollinger', col, n, k), compute)
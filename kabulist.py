@@ -1,36 +1,157 @@
-import yfinance as yf
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
+import requests
+
+# 複数銘柄をまとめて問い合わせできる軽量なクォートAPI (必要な項目だけ返させる)
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+CRUMB_URL = "https://query1.finance.yahoo.com/v1/test/getcrumb"
+COOKIE_URL = "https://fc.yahoo.com"
+QUOTE_FIELDS = "longName,shortName,regularMarketPreviousClose"
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+_local = threading.local()
+
+
+def to_ticker(symbol):
+    """コードに接尾辞を追加（東証用）"""
+    return f"{symbol}.T" if symbol.isdigit() else symbol
 
-# 銘柄コードの読み込み
-with open('kabulist.txt', 'r') as file:
-    symbols = file.read().splitlines()
 
-# データ取得
-data = []
-for symbol in symbols:
+def _session():
+    """スレッドごとに接続を使い回す Session"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+        _local.session.headers.update(HEADERS)
+    return _local.session
+
+
+def get_crumb(session):
+    """Yahoo のクォートAPIに必要な cookie と crumb を取得 (取れなければ None)"""
     try:
-        # コードに接尾辞を追加（東証用）
-        if symbol.isdigit():
-            ticker = f"{symbol}.T"
-        else:
-            ticker = symbol
-        
-        # Yahoo Financeから情報取得
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        # 銘柄名と株価を取得
-        name = info.get('longName', 'N/A')  # 銘柄名
-        price = info.get('previousClose', 'N/A')  # 前日終値
+        session.get(COOKIE_URL, timeout=10)
+        response = session.get(CRUMB_URL, timeout=10)
+        if response.ok and response.text and '<' not in response.text:
+            return response.text.strip()
+    except requests.RequestException:
+        pass
+    return None
+
+
+def fetch_batch(tickers, base_url=QUOTE_URL, crumb=None, cookies=None, retries=3, backoff=1.0):
+    """
+    1リクエストで複数銘柄の銘柄名と前日終値を取得する
+    429/5xx と通信エラーは指数バックオフで再試行し、最後まで失敗したら例外を投げる
+    401 (crumb の期限切れ) は crumb を1回だけ取り直してやり直す (それでも 401 なら再試行せずに例外)
+    """
+    session = _session()
+    if cookies:
+        session.cookies.update(cookies)
+    params = {"symbols": ",".join(tickers), "fields": QUOTE_FIELDS}
+    if crumb:
+        params["crumb"] = crumb
+
+    attempt, refreshed = 0, False
+    while True:
+        try:
+            response = session.get(base_url, params=params, timeout=15)
+            if response.status_code == 401 and crumb and not refreshed:
+                refreshed = True
+                crumb = get_crumb(session) or crumb
+                params["crumb"] = crumb
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            response.raise_for_status()
+            results = response.json()["quoteResponse"]["result"]
+            return {item["symbol"]: item for item in results}
+        except (requests.RequestException, ValueError, KeyError) as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if attempt == retries or status == 401:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+            attempt += 1
 
+
+def fetch_quotes(symbols, batch_size=50, workers=4, base_url=QUOTE_URL, retries=3, use_crumb=True, backoff=1.0):
+    """
+    銘柄コード一覧をバッチに分けて並行取得する
+    戻り値: (行データのリスト, {コード: エラーメッセージ})
+    成功したレスポンスに含まれていなかった銘柄もエラーに入れる
+    """
+    tickers = {symbol: to_ticker(symbol) for symbol in symbols}
+    batches = [symbols[i:i + batch_size] for i in range(0, len(symbols), batch_size)]
+
+    crumb, cookies = None, None
+    if use_crumb:
+        session = _session()
+        crumb = get_crumb(session)
+        cookies = session.cookies
+
+    quotes, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_batch, [tickers[s] for s in batch], base_url, crumb, cookies, retries,
+                            backoff): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                quotes.update(future.result())
+            except Exception as e:
+                # バッチ単位で失敗したら、その銘柄すべてにエラーを記録
+                for symbol in batch:
+                    errors[symbol] = str(e)
+                continue
+            for symbol in batch:
+                if tickers[symbol] not in quotes:
+                    errors[symbol] = 'レスポンスに含まれていません'
+
+    data = []
+    for symbol in symbols:
+        if symbol in errors:
+            data.append({'Code': symbol, 'Name': 'Error', 'Price': 'Error'})
+            continue
+        info = quotes.get(tickers[symbol], {})
+        name = info.get('longName') or info.get('shortName') or 'N/A'  # 銘柄名
+        price = info.get('regularMarketPreviousClose', 'N/A')  # 前日終値
         data.append({'Code': symbol, 'Name': name, 'Price': price})
+    return data, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="銘柄名と前日終値をまとめて取得し Excel に出力")
+    parser.add_argument('--input', default='kabulist.txt')
+    parser.add_argument('--output', default='stock_prices_with_names.xlsx')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--base-url', default=QUOTE_URL, help="クォートAPIのURL (ローカルのスタブサーバー確認用)")
+    args = parser.parse_args()
+
+    # 銘柄コードの読み込み
+    with open(args.input, 'r') as file:
+        symbols = [line.strip() for line in file.read().splitlines() if line.strip()]
+
+    # データ取得
+    start = time.perf_counter()
+    data, errors = fetch_quotes(symbols, args.batch_size, args.workers, args.base_url, args.retries,
+                                use_crumb=args.base_url == QUOTE_URL)
+    elapsed = time.perf_counter() - start
+    for symbol, message in errors.items():
+        print(f"取得失敗: {symbol}: {message}")
+
+    # データフレーム化とエクセル出力
+    df = pd.DataFrame(data)
+    df.to_excel(args.output, index=False)
 
-    except Exception as e:
-        data.append({'Code': symbol, 'Name': 'Error', 'Price': 'Error'})
+    print(f"{len(symbols)} 銘柄を {elapsed:.1f} 秒で取得しました (失敗 {len(errors)} 件)。")
+    print(f"データは {args.output} に保存されました。")
 
-# データフレーム化とエクセル出力
-df = pd.DataFrame(data)
-output_path = "stock_prices_with_names.xlsx"
-df.to_excel(output_path, index=False)
 
-print(f"データは {output_path} に保存されました。")
+if __name__ == '__main__':
+    main()
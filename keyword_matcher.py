@@ -0,0 +1,89 @@
+"""
+複数キーワードの一括照合 (Aho-Corasick 法)
+キーワード一覧から1回だけオートマトンを作り、見出し1本を1回なぞるだけで
+含まれているキーワードをすべて返す。照合の手間は見出しの長さだけで決まり、キーワード数には依らない。
+
+照合の前にキーワードと見出しの両方を同じ規則で正規化する:
+    NFKC (全角英数・半角カナ・㈱ など) → 大文字/小文字の区別なし → カタカナをひらがなに
+したがって「トヨタ」「ﾄﾖﾀ」「とよた」、「ＳＯＦＴＢＡＮＫ」「SoftBank」はそれぞれ同じものとして扱う。
+
+使い方:
+    matcher = KeywordMatcher(['トヨタ', 'ソフトバンク', '7203'])
+    matcher.match('ﾄﾖﾀ自動車(7203)が決算発表')  # → ['トヨタ', '7203']
+"""
+import unicodedata
+from collections import deque
+
+# カタカナ (ァ〜ヶ) → ひらがな (ぁ〜ゖ)
+_KANA_FOLD = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def normalize(text):
+    """照合用の正規化 (NFKC + casefold + カタカナ → ひらがな)"""
+    return unicodedata.normalize('NFKC', text).casefold().translate(_KANA_FOLD)
+
+
+def load_keywords(path):
+    """1行1キーワードのファイルを読む (空行と # で始まる行は飛ばす)"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class KeywordMatcher:
+    """キーワード一覧から作る Aho-Corasick オートマトン"""
+
+    def __init__(self, keywords):
+        # 正規化すると同じになるキーワードはまとめる (最初に出てきた表記で返す)
+        self.keywords = []
+        seen = {}
+        for keyword in keywords:
+            key = normalize(keyword.strip())
+            if key and key not in seen:
+                seen[key] = len(self.keywords)
+                self.keywords.append(keyword.strip())
+
+        # トライ木: 状態ごとの 遷移 (文字 → 状態)・失敗時の戻り先・その状態で見つかるキーワード番号
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for key, index in seen.items():
+            state = 0
+            for ch in key:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._out[state].append(index)
+
+        # 幅優先で失敗時の戻り先を決め、戻り先で見つかるキーワードも引き継ぐ
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_keywords(path))
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def match(self, text):
+        """text に含まれるキーワードを 見つかった順に (重複なしで) 返す"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found, state = {}, 0
+        for ch in normalize(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                found.setdefault(index, None)
+        return [self.keywords[index] for index in found]
@@ -0,0 +1,295 @@
+"""
+LLM (Chat Completions API) の非同期呼び出しキュー
+同時実行数の上限・トークンバケットによるレート制限 (リクエスト/分, トークン/分)・
+429 / 5xx のリトライ (Retry-After を優先した指数バックオフ)・SQLite の応答キャッシュを1つにまとめたもの。
+キャッシュのキーは (内容のハッシュ, プロンプトのバージョン, モデル)。同じ文書を同じプロンプトで
+分析し直すときは API を呼ばない。
+
+HTTP は requests をスレッドで呼ぶので追加のライブラリは不要。base_url を変えれば
+OpenAI 互換のサーバー (下の確認用モックサーバーを含む) に向けられる。
+
+使い方:
+    client = LLMClient(model='gpt-4', concurrency=4, rpm=60, tpm=40000, cache=ResponseCache())
+    text = await client.complete(prompt, key=file_hash(pdf_path), prompt_version='v1')
+
+確認用モックサーバー (ランダムに 429 / 503 を返す):
+    python llm_queue.py --port 8000 --latency 0.5 --error-rate 0.2
+    python openapi_analysis.py --base-url http://127.0.0.1:8000/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BASE_URL = 'https://api.openai.com/v1'
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    content_hash   TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    response       TEXT NOT NULL,
+    created_at     REAL NOT NULL,
+    PRIMARY KEY (content_hash, prompt_version, model)
+)
+"""
+
+
+def text_hash(text):
+    """文字列の SHA-256 (キャッシュのキー用)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class LLMError(Exception):
+    """リトライしても応答が得られなかった"""
+
+
+# ======================
+# レート制限
+# ======================
+class TokenBucket:
+    """
+    rate (1秒あたりの補充量) と capacity (最大の貯め) のトークンバケット
+    acquire(amount) は必要な分が貯まるまで待ってから消費する
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, amount):
+        """1分あたり amount (0 や None なら制限なし → None)"""
+        return cls(amount / 60.0, amount) if amount else None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)  # 1回で capacity を超える分は capacity 待てば通す
+        async with self.lock:  # 先に待ち始めたものから順に通す
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+# ======================
+# 応答キャッシュ
+# ======================
+class ResponseCache:
+    """(内容のハッシュ, プロンプトのバージョン, モデル) → 応答 の SQLite キャッシュ"""
+
+    def __init__(self, path='llm_cache.sqlite'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(CACHE_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def get(self, content_hash, prompt_version, model):
+        with self.lock:
+            row = self.conn.execute('SELECT response FROM responses WHERE content_hash = ? AND prompt_version = ? '
+                                    'AND model = ?', (content_hash, prompt_version, model)).fetchone()
+        return row[0] if row else None
+
+    def put(self, content_hash, prompt_version, model, response):
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                              (content_hash, prompt_version, model, response, time.time()))
+            self.conn.commit()
+
+
+# ======================
+# クライアント
+# ======================
+class LLMClient:
+    """
+    Chat Completions API の非同期クライアント
+    concurrency: 同時に送るリクエスト数 / rpm, tpm: 1分あたりのリクエスト数・トークン数の上限
+    """
+
+    def __init__(self, model='gpt-4', api_key=None, base_url=None, concurrency=4, rpm=60, tpm=40000,
+                 cache=None, max_retries=5, timeout=120, max_tokens=1000):
+        self.model = model
+        self.api_key = api_key or os.environ.get('OPENAI_API_KEY', '')
+        self.base_url = (base_url or os.environ.get('OPENAI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.concurrency = concurrency
+        self.requests = TokenBucket.per_minute(rpm)
+        self.tokens = TokenBucket.per_minute(tpm)
+        self.cache = cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.stats = {'calls': 0, 'cached': 0, 'retries': 0, 'failed': 0}
+        self._semaphore = None
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='llm')
+        self._local = threading.local()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def _session(self):
+        """スレッドごとの requests.Session (接続を使い回す)"""
+        import requests
+
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _post(self, prompt):
+        """1回分のリクエスト (ワーカースレッドで実行)。戻り値: (ステータス, Retry-After 秒, 本文)"""
+        response = self._session().post(
+            f'{self.base_url}/chat/completions',
+            headers={'Authorization': f'Bearer {self.api_key}'},
+            json={'model': self.model, 'messages': [{'role': 'user', 'content': prompt}],
+                  'max_tokens': self.max_tokens},
+            timeout=self.timeout)
+        retry_after = response.headers.get('Retry-After')
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        return response.status_code, retry_after, response.text
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after is not None:
+            return retry_after
+        return min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.0)
+
+    def cached(self, key, prompt_version='v1'):
+        """キャッシュ済みの応答 (無ければ None)"""
+        if self.cache is None:
+            return None
+        response = self.cache.get(key, prompt_version, self.model)
+        if response is not None:
+            self.stats['cached'] += 1
+        return response
+
+    async def complete(self, prompt, key=None, prompt_version='v1'):
+        """
+        プロンプトの応答テキストを返す
+        key (文書のハッシュなど) を省略するとプロンプト自体のハッシュをキャッシュのキーにする
+        """
+        key = key or text_hash(prompt)
+        cached = self.cached(key, prompt_version)
+        if cached is not None:
+            return cached
+
+        from report_chunker import count_tokens
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        cost = count_tokens(prompt, self.model) + self.max_tokens
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+            if self.requests:
+                await self.requests.acquire()
+            if self.tokens:
+                await self.tokens.acquire(cost)
+            async with self._semaphore:
+                self.stats['calls'] += 1
+                try:
+                    status, retry_after, body = await loop.run_in_executor(self._executor, self._post, prompt)
+                except Exception as e:  # 接続エラー・タイムアウト
+                    status, retry_after, body, error = None, None, '', e
+            if status == 200:
+                try:
+                    content = json.loads(body)['choices'][0]['message']['content']
+                    if not isinstance(content, str):
+                        raise TypeError(f'content が文字列ではありません: {content!r}')
+                except (ValueError, KeyError, IndexError, TypeError) as e:  # 壊れた応答はリトライする
+                    error = f'応答を解析できません ({e!r}): {body[:200]}'
+                else:
+                    if self.cache is not None:
+                        self.cache.put(key, prompt_version, self.model, content)
+                    return content
+            elif status is not None:
+                error = f'HTTP {status}: {body[:200]}'
+                if status not in RETRY_STATUS:
+                    break
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        self.stats['failed'] += 1
+        raise LLMError(str(error))
+
+
+# ======================
+# 確認用モックサーバー
+# ======================
+def serve_mock(port=8000, latency=0.5, error_rate=0.2):
+    """OpenAI 互換の /chat/completions を返すサーバー (error_rate の割合で 429 / 503 を返す)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    counter = {'requests': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            with lock:
+                counter['requests'] += 1
+                n = counter['requests']
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            time.sleep(latency)
+            if random.random() < error_rate:
+                status = random.choice((429, 503))
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                return
+            prompt = payload['messages'][-1]['content']
+            body = json.dumps({'choices': [{'message': {
+                'role': 'assistant', 'content': f'[mock #{n}] {len(prompt)} 文字のプロンプトを受け取りました。'}}]},
+                ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"モックサーバー: http://127.0.0.1:{server.server_port}/v1 (Ctrl+C で終了)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat Completions API の確認用モックサーバー")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.5, help="1リクエストの応答時間 (秒)")
+    parser.add_argument('--error-rate', type=float, default=0.2, help="429 / 503 を返す割合")
+    args = parser.parse_args()
+    serve_mock(args.port, args.latency, args.error_rate)
+
+
+if __name__ == '__main__':
+    main()
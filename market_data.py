@@ -0,0 +1,177 @@
+"""
+OHLCV のローカルキャッシュ
+(銘柄, 足の間隔) ごとに取得済みのバーと取得済み期間をディスクに保存し、
+要求された [start, end) のうち未取得の部分だけを fetcher で取りに行く。
+保存形式は Parquet (pyarrow などがあれば)、なければ pickle。
+
+使い方:
+    cache = MarketDataCache()
+    df = cache.get('7203.T', '2023-01-01', '2023-12-31', interval='1d')
+
+fetcher は fetcher(ticker, start, end, interval) -> DataFrame の関数で、
+差し替えればネットワークなしでも動作確認できる。
+fetcher は通信エラーやレート制限では例外を出す (その期間は取得済みにならず、次回の get() で取り直す)。
+正常に空を返した過去の期間 (休場日など) は取得済みにする。
+"""
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# yfinance のエラーのうち「その期間に足が無い」だけのもの (休場日などで正常に空)
+NO_PRICE_DATA = re.compile(r'PricesMissing|no price data|no data found', re.IGNORECASE)
+
+
+class FetchError(RuntimeError):
+    """OHLCV の取得に失敗した (通信エラー・レート制限など)"""
+
+
+def yfinance_fetcher(ticker, start, end, interval):
+    """
+    yfinance から [start, end) の OHLCV を取得する既定の fetcher
+    yf.download はエラーを握りつぶして空を返すので、記録されたエラーを見て FetchError にする
+    """
+    import yfinance as yf
+
+    df = yf.download(ticker, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'),
+                     interval=interval, progress=False, auto_adjust=True)
+    errors = getattr(yf.shared, '_ERRORS', {})
+    error = errors.get(ticker.upper()) or errors.get(ticker)
+    if df.empty and error and not NO_PRICE_DATA.search(str(error)):
+        raise FetchError(f"{ticker}: {error}")
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+
+def _storage_format():
+    """Parquet を書けるエンジンがあれば parquet、なければ pickle"""
+    for module in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(module)
+            return 'parquet'
+        except ImportError:
+            continue
+    return 'pickle'
+
+
+def _naive(index):
+    """タイムゾーン付きなら現地時刻のまま tz を外した DatetimeIndex を返す"""
+    index = pd.DatetimeIndex(index)
+    return index.tz_localize(None) if index.tz is not None else index
+
+
+def merge_ranges(ranges):
+    """[(start, end), ...] の重なり・隣接を結合して昇順に並べる"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """取得済み期間 covered に含まれない [start, end) の部分を返す"""
+    gaps = []
+    cursor = start
+    for c_start, c_end in merge_ranges(covered):
+        if c_end <= cursor or c_start >= end:
+            continue
+        if c_start > cursor:
+            gaps.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class MarketDataCache:
+    def __init__(self, cache_dir='market_data_cache', fetcher=yfinance_fetcher):
+        self.cache_dir = cache_dir
+        self.fetcher = fetcher
+        self.format = _storage_format()
+        # 銘柄ごとのロック (別銘柄は並行して取得できる)
+        self.lock = threading.Lock()
+        self._key_locks = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # --- ファイル ---
+    def _path(self, ticker, interval, ext):
+        safe = re.sub(r'[^0-9A-Za-z._-]', '_', ticker)
+        return os.path.join(self.cache_dir, f'{safe}_{interval}.{ext}')
+
+    def _load(self, ticker, interval):
+        """保存済みのバーと取得済み期間を読み込む (なければ空)"""
+        meta_path = self._path(ticker, interval, 'json')
+        data_path = self._path(ticker, interval, self.format)
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return pd.DataFrame(columns=OHLCV_COLUMNS), []
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        covered = [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in meta['covered']]
+        if self.format == 'parquet':
+            df = pd.read_parquet(data_path)
+        else:
+            df = pd.read_pickle(data_path)
+        return df, covered
+
+    def _save(self, ticker, interval, df, covered):
+        data_path = self._path(ticker, interval, self.format)
+        if self.format == 'parquet':
+            df.to_parquet(data_path)
+        else:
+            df.to_pickle(data_path)
+        # メタデータはデータの後に書く (途中で落ちても未取得扱いになるだけ)
+        meta = {'covered': [[s.isoformat(), e.isoformat()] for s, e in covered]}
+        with open(self._path(ticker, interval, 'json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def _key_lock(self, ticker, interval):
+        with self.lock:
+            return self._key_locks.setdefault((ticker, interval), threading.Lock())
+
+    # --- 取得 ---
+    def get(self, ticker, start, end=None, interval='1d'):
+        """
+        [start, end) の OHLCV を返す。未取得の期間だけ fetcher で取得してキャッシュに追加する
+        start/end は日付文字列または Timestamp (end 省略時は明日 = 今日まで)
+        """
+        today = pd.Timestamp.today().normalize()
+        start = pd.Timestamp(start)
+        end = pd.Timestamp(end) if end is not None else today + pd.Timedelta(days=1)
+
+        with self._key_lock(ticker, interval):
+            df, covered = self._load(ticker, interval)
+            gaps = missing_ranges(covered, start, end)
+            fetched, newly_covered = [], []
+            for gap_start, gap_end in gaps:
+                # 通信エラーやレート制限は fetcher が例外を出す (取得済みにならず、次回また取りに行く)
+                part = self.fetcher(ticker, gap_start, gap_end, interval)
+                if part is not None and not part.empty:
+                    fetched.append(part[OHLCV_COLUMNS])
+                # 空でも取得できた過去の期間 (休場日) は取得済み。今日以降は足が確定していないので取り直す
+                if gap_start < today:
+                    newly_covered.append((gap_start, min(gap_end, today)))
+
+            if fetched or newly_covered:
+                if fetched:
+                    df = pd.concat([df] + fetched) if not df.empty else pd.concat(fetched)
+                    df = df[~df.index.duplicated(keep='last')].sort_index()
+                self._save(ticker, interval, df, merge_ranges(covered + newly_covered))
+
+        if df.empty:
+            return df
+        local = _naive(df.index)
+        return df[(local >= start) & (local < end)]
+
+    def clear(self, ticker, interval='1d'):
+        """指定銘柄のキャッシュを削除"""
+        for ext in ('json', 'parquet', 'pickle'):
+            path = self._path(ticker, interval, ext)
+            if os.path.exists(path):
+                os.remove(path)
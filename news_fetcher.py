@@ -0,0 +1,126 @@
+"""
+ニュースサイトの並行取得 (search.py 用)
+取得先は NewsSource (URL と記事の CSS セレクタ) の一覧で、サイトを増やすときは SOURCES に足すだけ。
+NewsFetcher.poll() は全サイトを asyncio で同時に取りに行き (HTTP は接続を使い回す requests.Session を
+スレッドで実行)、ETag / Last-Modified による条件付き GET で 304 が返ったサイトや、
+本文のハッシュが前回と同じサイトは HTML を解析せずに前回の記事一覧を返す。
+サイトを増やしても1回の巡回時間は一番遅いサイトの分だけで済む。
+
+使い方:
+    fetcher = NewsFetcher(SOURCES)
+    for name, result in asyncio.run(fetcher.poll()).items():
+        print(name, result['status'], len(result['items']))
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+
+class NewsSource:
+    """1サイト分の取得設定 (記事の要素・タイトル・リンクの CSS セレクタ)"""
+
+    def __init__(self, name, url, item_selector, title_selector, link_selector='a'):
+        self.name = name
+        self.url = url
+        self.item_selector = item_selector
+        self.title_selector = title_selector
+        self.link_selector = link_selector
+
+    def parse(self, html):
+        """HTML から [{'title', 'link', 'source'}] を取り出す (相対リンクは絶対 URL にする)"""
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        items = []
+        for item in soup.select(self.item_selector):
+            title_elem = item.select_one(self.title_selector)
+            link_elem = item if item.name == 'a' else item.select_one(self.link_selector)
+            if title_elem and link_elem and link_elem.get('href'):
+                items.append({'title': title_elem.get_text().strip(),
+                              'link': urljoin(self.url, link_elem['href']),
+                              'source': self.name})
+        return items
+
+
+# 巡回するサイト (追加するときはここに足す)
+SOURCES = [
+    # Yahooニュース ビジネス版
+    NewsSource('Yahoo', "https://finance.yahoo.co.jp/", '.newsFeed_item', '.newsFeed_item_title'),
+    # Bloomberg日本版
+    NewsSource('Bloomberg', "https://www.bloomberg.co.jp/", '.index-module__post___3vhgV', 'h3'),
+]
+
+
+class NewsFetcher:
+    """
+    全サイトの並行取得。サイトごとに ETag / Last-Modified / 本文のハッシュ / 記事一覧を覚えておき、
+    変わっていなければ解析を省く
+    """
+
+    def __init__(self, sources=SOURCES, timeout=10, max_workers=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.sources = list(sources)
+        self.timeout = timeout
+        workers = max_workers or max(len(self.sources), 1)
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='news')
+        self.state = {source.name: {'etag': None, 'last_modified': None, 'hash': None, 'items': []}
+                      for source in self.sources}
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def fetch(self, source):
+        """
+        1サイト分を取得する (ワーカースレッドで実行)
+        戻り値: {'items', 'status' ('not_modified' / 'unchanged' / 'parsed' / 'error'), 'elapsed', 'error'}
+        """
+        started = time.perf_counter()
+        with self.lock:
+            state = dict(self.state[source.name])
+        headers = {}
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+        try:
+            response = self.session.get(source.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                status = 'not_modified'
+            else:
+                response.raise_for_status()
+                digest = hashlib.sha256(response.content).hexdigest()
+                if digest == state['hash']:
+                    status = 'unchanged'
+                else:
+                    status = 'parsed'
+                    state.update(hash=digest, items=source.parse(response.text))
+                state.update(etag=response.headers.get('ETag'),
+                             last_modified=response.headers.get('Last-Modified'))
+            with self.lock:
+                self.state[source.name] = state
+            error = None
+        except Exception as e:
+            status, error = 'error', e
+        return {'items': state['items'], 'status': status, 'error': error,
+                'elapsed': time.perf_counter() - started}
+
+    async def poll(self):
+        """全サイトを同時に取得し、{サイト名: fetch() の結果} を返す"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, self.fetch, source)
+                                         for source in self.sources))
+        return {source.name: result for source, result in zip(self.sources, results)}
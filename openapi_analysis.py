@@ -1,29 +1,42 @@
+import argparse
+import asyncio
 import os
-import fitz  # PyMuPDF
 import re
-import openai
+import time
 
-# OpenAI APIキーを設定
-openai.api_key = 'your-api-key'
+from llm_queue import LLMClient, LLMError, ResponseCache
+from pdf_text import DEFAULT_CACHE_DIR, extract_texts
+from report_chunker import amap_reduce, chunk_sections, format_savings, prepare_report
+
+# OpenAI APIキーを設定 (環境変数 OPENAI_API_KEY があればそちらを使う)
+api_key = os.environ.get('OPENAI_API_KEY', 'your-api-key')
+model = 'gpt-4'
 
 # フォルダパスを設定
 folder_path = '/pdf_files'
 output_file = 'summary_report.txt'
 
-# PDFからテキストを抽出する関数
-def extract_text_from_pdf(pdf_path):
-    text = ""
-    try:
-        with fitz.open(pdf_path) as doc:
-            for page in doc:
-                text += page.get_text()
-    except Exception as e:
-        print(f"Error processing {pdf_path}: {e}")
-    return text
-
-# ChatGPTにテキストを渡して分析結果を取得する関数
-def analyze_financial_report_with_gpt(text):
-    prompt = f"""
+# 1回のプロンプトに入れる決算情報のトークン数の上限
+token_budget = 6000
+# 1文書あたりのチャンク数の上限 (超える分は重要度の低いセクションから落とす)
+max_chunks = 4
+
+# プロンプトを変えたら上げる (応答キャッシュのキーに含まれる)
+PROMPT_VERSION = 'v1'
+
+# 予算に収まらない決算情報の一部を要約するプロンプト (map-reduce の map)
+def summary_prompt(chunk):
+    return f"""
+    以下は決算短信の一部です。売上高・利益・前年同期比・財政状態・キャッシュ・フロー・業績予想などの
+    数値と、その増減の理由を漏らさずに箇条書きで簡潔に要約してください。
+
+    決算情報:
+    {chunk}
+    """
+
+# ChatGPTに渡す分析のプロンプト
+def analysis_prompt(text):
+    return f"""
     あなたはアナリストで投資家です。以下の決算情報を分析し、以下の項目についてまとめてください。
     ・懸念点
     ・赤字か、黒字か
@@ -35,29 +48,81 @@ def analyze_financial_report_with_gpt(text):
     決算情報:
     {text}
     """
+
+# 1文書分の分析 (前処理 → 必要なら要約 → 分析)。同じ PDF・同じプロンプトの結果はキャッシュから返す
+async def analyze_document(client, filename, content_hash, text, budget, chunk_limit=max_chunks):
+    # 価値の高いセクションと圧縮した数表だけにし (多すぎれば重要度の低い順に落とし、大きすぎるセクションは先頭だけ残す)、予算を超えれば要約してから分析
+    report = prepare_report(text, max_tokens=budget * chunk_limit)
+    chunks = chunk_sections(report['sections'], budget)
+    key, version = content_hash, f'{PROMPT_VERSION}:budget={budget}x{chunk_limit}'
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response['choices'][0]['message']['content']
-    except Exception as e:
-        return f"Error: {e}"
+        analysis = client.cached(key, version)
+        if analysis is None:
+            body = await amap_reduce(
+                chunks, lambda chunk: client.complete(summary_prompt(chunk), prompt_version=PROMPT_VERSION), budget)
+            analysis = await client.complete(analysis_prompt(body), key=key, prompt_version=version)
+    except LLMError as e:
+        analysis = f"Error: {e}"
+    return filename, analysis, report, chunks
 
-# メイン処理
-def main():
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.pdf'):
-                pdf_path = os.path.join(folder_path, filename)
-                text = extract_text_from_pdf(pdf_path)
-                analysis = analyze_financial_report_with_gpt(text)
+# 全文書を並行して分析し、終わったものから順にレポートへ書き出す
+async def analyze_all(args, filenames, pdf_paths, texts, hashes):
+    cache = ResponseCache(args.llm_cache) if args.llm_cache else None
+    client = LLMClient(model=args.model, api_key=api_key, base_url=args.base_url, concurrency=args.concurrency,
+                       rpm=args.rpm, tpm=args.tpm, cache=cache)
+    tasks = [analyze_document(client, filename, hashes[pdf_path], texts[pdf_path], args.budget, args.max_chunks)
+             for filename, pdf_path in zip(filenames, pdf_paths)]
+    try:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for done in asyncio.as_completed(tasks):
+                filename, analysis, report, chunks = await done
+                savings = format_savings(report)
 
                 # レポート出力
                 f.write(f"File: {filename}\n")
+                f.write(f"Tokens: {savings} / チャンク {len(chunks)}\n")
                 f.write(f"{analysis}\n")
                 f.write("\n==============================\n\n")
-                print(f"Processed: {filename}")
+                f.flush()
+                print(f"Processed: {filename} ({savings}, チャンク {len(chunks)})")
+    finally:
+        client.close()
+        if cache is not None:
+            cache.close()
+    return client.stats
+
+# メイン処理
+def main():
+    parser = argparse.ArgumentParser(description="決算PDFをChatGPTで分析してレポートにまとめる")
+    parser.add_argument('--folder', default=folder_path, help="PDFのフォルダ")
+    parser.add_argument('--output', default=output_file)
+    parser.add_argument('--workers', type=int, default=None, help="テキスト抽出のプロセス数 (省略時は CPU 数)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="抽出済みテキストの保存先")
+    parser.add_argument('--no-cache', action='store_true', help="キャッシュを使わずに抽出し直す")
+    parser.add_argument('--budget', type=int, default=token_budget, help="1回のプロンプトの決算情報のトークン数上限")
+    parser.add_argument('--max-chunks', type=int, default=max_chunks,
+                        help="1文書あたりのチャンク数の上限 (超える分は重要度の低いセクションから落とす)")
+    parser.add_argument('--model', default=model)
+    parser.add_argument('--base-url', default=None, help="API の URL (モックサーバーなど。省略時は OpenAI)")
+    parser.add_argument('--concurrency', type=int, default=4, help="同時に送るリクエスト数")
+    parser.add_argument('--rpm', type=int, default=60, help="1分あたりのリクエスト数の上限")
+    parser.add_argument('--tpm', type=int, default=40000, help="1分あたりのトークン数の上限")
+    parser.add_argument('--llm-cache', default='llm_cache.sqlite', help="応答キャッシュ ('' で使わない)")
+    args = parser.parse_args()
+
+    # テキスト抽出はまとめて並列に (内容が変わっていない PDF はキャッシュから読むだけ)
+    filenames = sorted(name for name in os.listdir(args.folder) if name.endswith('.pdf'))
+    pdf_paths = [os.path.join(args.folder, name) for name in filenames]
+    stats, hashes = {}, {}
+    start = time.perf_counter()
+    texts = extract_texts(pdf_paths, None if args.no_cache else args.cache_dir, args.workers, stats, hashes)
+    print(f"テキスト抽出: {stats['extracted']} 件 ({stats['pages']} ページ), キャッシュ {stats['cached']} 件, "
+          f"{time.perf_counter() - start:.1f} 秒")
+
+    start = time.perf_counter()
+    calls = asyncio.run(analyze_all(args, filenames, pdf_paths, texts, hashes))
+    print(f"分析: {len(filenames)} 件を {time.perf_counter() - start:.1f} 秒 (API 呼び出し {calls['calls']} 回, "
+          f"キャッシュ {calls['cached']} 件, リトライ {calls['retries']} 回, 失敗 {calls['failed']} 件)")
 
 if __name__ == '__main__':
     main()
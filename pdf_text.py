@@ -0,0 +1,84 @@
+"""
+PDF のテキスト抽出 (プロセス並列 + ディスクキャッシュ)
+PyMuPDF (fitz) で1ファイルずつ抽出する処理を ProcessPoolExecutor で複数プロセスに分け、
+抽出したテキストはファイル内容の SHA-256 をキーに cache_dir に保存する。
+内容が変わっていない PDF は次回から抽出せずにキャッシュを読むだけになる。
+
+使い方:
+    texts = extract_texts(pdf_paths, cache_dir='text_cache', workers=4)
+    texts['pdf_files/1076.pdf']  # → 抽出したテキスト (失敗したものは '')
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from hashing import file_hash
+
+DEFAULT_CACHE_DIR = 'text_cache'
+
+
+def extract_text_from_pdf(pdf_path):
+    """
+    1ファイル分のテキストとページ数を返す (ページごとのテキストは最後に1回だけ連結)
+    読めなかった場合は ('', 0)
+    """
+    import fitz  # PyMuPDF (ワーカープロセスごとに1回だけ読み込まれる)
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            return ''.join(page.get_text() for page in doc), doc.page_count
+    except Exception as e:
+        print(f"Error processing {pdf_path}: {e}")
+        return '', 0
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f'{digest}.txt')
+
+
+def _write_cache(path, text):
+    """書き込み途中のファイルを読まないよう .part に書いてから置き換える"""
+    partial = path + '.part'
+    with open(partial, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(partial, path)
+
+
+def extract_texts(pdf_paths, cache_dir=DEFAULT_CACHE_DIR, workers=None, stats=None, hashes=None):
+    """
+    pdf_paths のテキストを {パス: テキスト} で返す
+    cache_dir=None ならキャッシュを使わない。workers=None は CPU 数、1 なら同じプロセスで順に抽出
+    stats (dict) を渡すと cached / extracted / pages の件数を書き込む
+    hashes (dict) を渡すと {パス: 内容の SHA-256} を書き込む (応答キャッシュのキーなどに使い回す)
+    """
+    pdf_paths = list(pdf_paths)
+    texts, todo = {}, []
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    for path in pdf_paths:
+        digest = file_hash(path) if cache_dir or hashes is not None else None
+        if hashes is not None:
+            hashes[path] = digest
+        cached = _cache_path(cache_dir, digest) if cache_dir else None
+        if cached and os.path.exists(cached):
+            with open(cached, encoding='utf-8') as f:
+                texts[path] = f.read()
+        else:
+            todo.append((path, cached))
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 and len(todo) > 1 else None
+    results = (executor.map if executor else map)(extract_text_from_pdf, [path for path, _ in todo])
+
+    pages = 0
+    try:
+        for (path, cached), (text, page_count) in zip(todo, results):
+            texts[path] = text
+            pages += page_count
+            if cached and page_count:  # 読めなかったものはキャッシュしない
+                _write_cache(cached, text)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if stats is not None:
+        stats.update(cached=len(pdf_paths) - len(todo), extracted=len(todo), pages=pages)
+    return {path: texts[path] for path in pdf_paths}
@@ -0,0 +1,278 @@
+"""
+決算短信テキストの前処理 (セクション分割・数表の圧縮・トークン予算)
+PDF から抽出したテキストを サマリー / 経営成績 / 業績予想 / 損益計算書 / 貸借対照表 /
+キャッシュ・フロー などのセクションに分け、目次や注記などの価値の低いセクションを落とし、
+1セル1行になっている数表を「科目 | 数値 | 数値 ...」の1行にまとめる。
+それでも max_tokens を超える場合は重要度の低いセクションから落とし、予算より大きい重要なセクションは先頭だけを残す。
+予算 (トークン数) に収まらない場合は、チャンクごとに要約してから要約をまとめて分析する (map-reduce)。
+
+使い方:
+    report = prepare_report(text, max_tokens=6000 * 4)
+    chunks = chunk_sections(report['sections'], budget=6000)
+    summary = await amap_reduce(chunks, summarize, budget=6000)  # summarize(プロンプト用テキスト) → 要約 (async)
+    print(format_savings(report))
+"""
+import functools
+import re
+import unicodedata
+from collections import Counter
+
+# (セクション名, 重要度 (小さいほど重要), 見出しの正規表現)。上から順に判定する
+SECTIONS = [
+    ('toc', 99, re.compile(r'目次')),
+    ('outlook', 2, re.compile(r'業績予想|将来予測|見通し')),
+    ('income_statement', 3, re.compile(r'損益(及び包括利益)?計算書|包括利益計算書')),
+    ('balance_sheet', 4, re.compile(r'貸借対照表')),
+    ('cash_flow', 5, re.compile(r'キャッシュ・?フロー')),
+    ('results', 1, re.compile(r'経営成績|定性的情報|決算の概況|業績の概況')),
+    ('financial_position', 6, re.compile(r'財政状態')),
+    ('segment', 7, re.compile(r'セグメント')),
+    ('notes', 9, re.compile(r'注記|会計方針|継続企業の前提|株主資本の金額|後発事象')),
+]
+SUMMARY = ('summary', 0)   # 最初の見出しより前 (1ページ目のサマリー情報)
+DROP_SECTIONS = ('toc', 'notes')
+
+# 見出しらしい行: 番号付き (1. / (1) / ① / 第1 など) か短い行
+HEADING_NUMBER = re.compile(r'^(\d+[.．]|\(\d+\)|[①-⑳]|[ア-ン][.．]|第\d)\s*')
+HEADING_MAX_CHARS = 40
+# 目次の行 (見出し …… ページ番号)
+TOC_LINE = re.compile(r'(\.{3,}|…+|・{3,}|‥+)\s*\d+\s*$')
+# ページ番号だけの行 (- 3 - / ―3― など)
+PAGE_FOOTER = re.compile(r'^[-―－‐]\s*\d+\s*[-―－‐]$')
+# 表のセル (△1,234 / -5.6 / 12.3% / - など)
+NUMBER_CELL = re.compile(r'^[△▲\-−+]?[\d,]+(\.\d+)?[%％倍円]?$|^[-―－–]$')
+
+
+# ======================
+# トークン数
+# ======================
+@functools.lru_cache(maxsize=None)
+def _encoding(model):
+    """tiktoken のエンコーダ (tiktoken が無ければ None)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+
+
+def count_tokens(text, model='gpt-4'):
+    """
+    text のトークン数 (tiktoken があれば正確に数える)
+    無い場合は 日本語など非ASCII 1文字 = 1トークン、ASCII 4文字 = 1トークン で見積もる
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (len(text) - ascii_chars) + (ascii_chars + 3) // 4
+
+
+# ======================
+# セクション分割
+# ======================
+def classify_heading(line):
+    """見出しの行ならセクション名と重要度を返す (見出しでなければ None)"""
+    if len(line) > HEADING_MAX_CHARS or TOC_LINE.search(line):
+        return None
+    title = HEADING_NUMBER.sub('', line)
+    if title == line and len(line) > HEADING_MAX_CHARS // 2:
+        return None  # 番号の無い長めの行は本文とみなす
+    for name, priority, pattern in SECTIONS:
+        if pattern.search(title):
+            return name, priority
+    return None
+
+
+def split_sections(text):
+    """
+    テキストをセクションに分ける
+    戻り値: [{'name', 'priority', 'title', 'lines'}] (文書の順)
+    """
+    text = unicodedata.normalize('NFKC', text)
+    name, priority = SUMMARY
+    sections = [{'name': name, 'priority': priority, 'title': '', 'lines': []}]
+    body = sections[0]  # 目次の直前の本文のセクション
+    for raw in text.splitlines():
+        line = ' '.join(raw.split())
+        if not line or PAGE_FOOTER.match(line):
+            continue
+        toc_line = TOC_LINE.search(line)
+        if toc_line and sections[-1]['name'] != 'toc':
+            sections.append({'name': 'toc', 'priority': 99, 'title': '目次', 'lines': []})
+        heading = classify_heading(line)
+        if heading and heading[0] != sections[-1]['name']:
+            sections.append({'name': heading[0], 'priority': heading[1], 'title': line, 'lines': []})
+        elif sections[-1]['name'] == 'toc' and not toc_line and len(line) > HEADING_MAX_CHARS:
+            # 目次の項目より長い行は本文: 目次を閉じて目次の前のセクションの続きとする
+            sections.append({'name': body['name'], 'priority': body['priority'], 'title': body['title'], 'lines': []})
+        if sections[-1]['name'] != 'toc':
+            body = sections[-1]
+        sections[-1]['lines'].append(line)
+    return [section for section in sections if section['lines']]
+
+
+# ======================
+# 数表の圧縮
+# ======================
+def is_number_line(line):
+    return all(NUMBER_CELL.match(cell) for cell in line.split())
+
+
+def compact_tables(lines):
+    """
+    1セル1行になっている数表を「科目 | 数値 | 数値 ...」の1行にまとめる
+    科目と数値が同じ行にあるものも区切りを揃える
+    """
+    rows = []
+    for line in lines:
+        cells = line.split()
+        if rows and is_number_line(line) and (rows[-1][0] is None or len(rows[-1][0]) <= HEADING_MAX_CHARS):
+            rows[-1][1].extend(cells)  # 直前の科目 (または数値だけの行) の続き
+            continue
+        numbers = []
+        while cells and NUMBER_CELL.match(cells[-1]):
+            numbers.insert(0, cells.pop())
+        label = ' '.join(cells)
+        if numbers and label:
+            rows.append([label, numbers])
+        else:
+            rows.append([line if label else None, [] if label else numbers])
+    out = []
+    for label, numbers in rows:
+        if label is None:
+            out.append(' | '.join(numbers))
+        elif numbers:
+            out.append(' | '.join([label] + numbers))
+        else:
+            out.append(label)
+    return out
+
+
+# ======================
+# 予算内のプロンプト作成
+# ======================
+def prepare_report(text, drop=DROP_SECTIONS, model='gpt-4', max_tokens=None):
+    """
+    セクション分割 → 価値の低いセクションを除外 → 数表を圧縮 した結果とトークン数
+    max_tokens を指定すると、超える分は重要度の低いセクションから落とす (fit_to_budget)。
+    予算より大きい重要なセクションは先頭だけを残す
+    戻り値: {'sections': [{'name', 'priority', 'title', 'text', 'tokens'}], 'dropped': [名前],
+             'truncated': [先頭だけ残した名前], 'original_tokens', 'tokens'}
+    """
+    kept, dropped = [], []
+    for section in split_sections(text):
+        if section['name'] in drop:
+            dropped.append(section['name'])
+            continue
+        body = '\n'.join(compact_tables(section['lines']))
+        kept.append({'name': section['name'], 'priority': section['priority'], 'title': section['title'],
+                     'text': body, 'tokens': count_tokens(body, model)})
+    if max_tokens and sum(section['tokens'] for section in kept) > max_tokens:
+        fitted = fit_to_budget(kept, max_tokens, model)
+        dropped.extend((Counter(section['name'] for section in kept)
+                        - Counter(section['name'] for section in fitted)).elements())
+        kept = fitted
+    return {'sections': kept, 'dropped': dropped,
+            'truncated': [section['name'] for section in kept if section.get('truncated')],
+            'original_tokens': count_tokens(text, model),
+            'tokens': sum(section['tokens'] for section in kept)}
+
+
+def fit_to_budget(sections, budget, model='gpt-4'):
+    """
+    重要度の高い順に予算に収まるセクションを選び、文書の順に並べて返す
+    残りの予算より大きいセクションは落とさず、行単位で分けた先頭を残りの予算の分だけ残す
+    (そのセクションは text / tokens を差し替えた写しになり、'truncated': True が付く)
+    """
+    chosen, used = {}, 0
+    for i in sorted(range(len(sections)), key=lambda i: sections[i]['priority']):
+        section = sections[i]
+        remaining = budget - used
+        if section['tokens'] <= remaining:
+            chosen[i] = section
+        elif remaining > 0:
+            head = _split_text(section['text'], remaining, model)[0]
+            tokens = count_tokens(head, model)
+            if not head or tokens > remaining:
+                continue
+            chosen[i] = dict(section, text=head, tokens=tokens, truncated=True)
+        else:
+            continue
+        used += chosen[i]['tokens']
+    return [chosen[i] for i in sorted(chosen)]
+
+
+def _split_text(text, budget, model):
+    """予算を超える1セクションを行単位で分ける (1行で予算を超える行は文字数で切る)"""
+    step = max(budget // 2, 1)  # 1文字が2トークンになっても収まる長さ
+    lines = []
+    for line in text.splitlines():
+        if count_tokens(line, model) < budget:
+            lines.append(line)
+        else:
+            lines.extend(line[i:i + step] for i in range(0, len(line), step))
+    pieces, current, used = [], [], 0
+    for line in lines:
+        tokens = count_tokens(line, model) + 1
+        if current and used + tokens > budget:
+            pieces.append('\n'.join(current))
+            current, used = [], 0
+        current.append(line)
+        used += tokens
+    if current:
+        pieces.append('\n'.join(current))
+    return pieces
+
+
+def chunk_sections(sections, budget, model='gpt-4'):
+    """
+    セクションを予算以内のチャンク (テキスト) に詰める。文書の順を保ち、
+    1セクションが予算を超える場合だけ行単位で分ける。全部収まれば1チャンク
+    """
+    chunks, current, used = [], [], 0
+    for section in sections:
+        pieces = [section['text']] if section['tokens'] <= budget else _split_text(section['text'], budget, model)
+        for piece in pieces:
+            tokens = count_tokens(piece, model) if len(pieces) > 1 else section['tokens']
+            if current and used + tokens + 1 > budget:  # +1 は区切りの空行
+                chunks.append('\n\n'.join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += tokens + 1
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def format_savings(report):
+    """削減したトークン数の1行レポート"""
+    original, tokens = report['original_tokens'], report['tokens']
+    saved = original - tokens
+    rate = saved / original * 100 if original else 0.0
+    sections = ', '.join(section['name'] + ('(先頭のみ)' if section.get('truncated') else '')
+                         for section in report['sections'])
+    return f"{original} → {tokens} トークン ({saved} 削減, {rate:.0f}%) 使用: {sections}"
+
+
+async def amap_reduce(chunks, summarize, budget, model='gpt-4', max_rounds=3):
+    """
+    チャンクが複数なら各チャンクを summarize (async 関数) で並行して要約し、
+    要約をつなげたものが予算に収まるまで繰り返す
+    max_rounds 回で収まらなければ先頭から予算に収まる分だけを残す
+    戻り値: 予算内のテキスト (最終的な分析に渡す)
+    """
+    import asyncio
+
+    text = '\n\n'.join(chunks)
+    for _ in range(max_rounds):
+        if len(chunks) <= 1 and count_tokens(text, model) <= budget:
+            return text
+        text = '\n\n'.join(await asyncio.gather(*(summarize(chunk) for chunk in chunks)))
+        chunks = _split_text(text, budget, model)
+    if count_tokens(text, model) <= budget:
+        return text
+    return chunks[0] if chunks else ''
@@ -1,12 +1,16 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import threading
 import time
-import requests
-from bs4 import BeautifulSoup
+import asyncio
 import os
+import re
 import webbrowser
 
+from dedup_store import DedupStore
+from keyword_matcher import KeywordMatcher, load_keywords
+from news_fetcher import NewsFetcher, SOURCES
+
 class ScraperApp:
     def __init__(self, root):
         self.root = root
@@ -16,20 +20,19 @@ class ScraperApp:
         # スクレイピング設定
         self.scraping = False
         self.keyword = ""
+        self.matcher = None
         self.interval = 60  # デフォルト60秒
-        self.collected_titles = set()
         self.results = []
         self.scraper_thread = None
         self.lock = threading.Lock()
         
-        # テキストファイルのパス
-        self.TEXT_FILE = 'collected_titles.txt'
-        
-        # テキストファイルから既存のタイトルを読み込む
-        if os.path.exists(self.TEXT_FILE):
-            with open(self.TEXT_FILE, 'r', encoding='utf-8') as f:
-                for line in f:
-                    self.collected_titles.add(line.strip())
+        # 収集済みタイトルの記録 (SQLite。起動時に全件は読み込まない)
+        self.TEXT_FILE = 'collected_titles.txt'  # 旧形式 (初回だけ取り込む)
+        self.STORE_FILE = 'collected_titles.sqlite'
+        self.EXPIRE_DAYS = None  # 例: 90 にすると90日より前に収集したタイトルは忘れる
+        self.collected_titles = DedupStore(
+            self.STORE_FILE, ttl=self.EXPIRE_DAYS and self.EXPIRE_DAYS * 24 * 3600, bloom_bits=1 << 20)
+        self.collected_titles.import_lines(self.TEXT_FILE)
         
         self.create_widgets()
         self.update_results_periodically()
@@ -39,10 +42,14 @@ class ScraperApp:
         control_frame = ttk.Frame(self.root)
         control_frame.pack(pady=10, padx=10, fill='x')
         
-        # キーワード入力
+        # キーワード入力 (カンマ区切りで複数、またはファイルから一覧を読み込む)
         ttk.Label(control_frame, text="キーワード:").grid(row=0, column=0, padx=5, pady=5, sticky='e')
         self.keyword_entry = ttk.Entry(control_frame, width=30)
         self.keyword_entry.grid(row=0, column=1, padx=5, pady=5, sticky='w')
+        ttk.Button(control_frame, text="一覧を読込", command=self.load_keyword_file).grid(row=0, column=3, padx=5, pady=5)
+        self.keyword_file = None
+        self.keyword_file_label = ttk.Label(control_frame, text="")
+        self.keyword_file_label.grid(row=1, column=3, padx=5, pady=5, sticky='w')
         
         # 間隔入力
         ttk.Label(control_frame, text="間隔（秒）:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
@@ -59,13 +66,15 @@ class ScraperApp:
         self.stop_button.grid(row=1, column=2, padx=10, pady=5)
         
         # 結果表示用ツリービュー
-        columns = ("Title", "Link", "Source")
+        columns = ("Title", "Keywords", "Link", "Source")
         self.tree = ttk.Treeview(self.root, columns=columns, show='headings')
         self.tree.heading("Title", text="タイトル")
+        self.tree.heading("Keywords", text="キーワード")
         self.tree.heading("Link", text="リンク")
         self.tree.heading("Source", text="ソース")
-        self.tree.column("Title", width=500)
-        self.tree.column("Link", width=250)
+        self.tree.column("Title", width=400)
+        self.tree.column("Keywords", width=150)
+        self.tree.column("Link", width=200)
         self.tree.column("Source", width=100)
         self.tree.pack(pady=10, padx=10, fill='both', expand=True)
         
@@ -77,11 +86,21 @@ class ScraperApp:
         # ダブルクリックで元ページへ
         self.tree.bind("<Double-1>", self.open_link)
     
+    def load_keyword_file(self):
+        path = filedialog.askopenfilename(filetypes=[("テキスト", "*.txt"), ("すべて", "*.*")])
+        if path:
+            self.keyword_file = path
+            self.keyword_file_label.config(text=f"{os.path.basename(path)} ({len(load_keywords(path))} 件)")
+    
     def start_scraping(self):
         self.keyword = self.keyword_entry.get().strip()
         interval_str = self.interval_entry.get().strip()
         
-        if not self.keyword:
+        # 入力欄とファイルのキーワードから照合器を1回だけ作る
+        keywords = [word for word in re.split(r'[,、]', self.keyword) if word.strip()]
+        if self.keyword_file:
+            keywords += load_keywords(self.keyword_file)
+        if not keywords:
             messagebox.showwarning("入力エラー", "キーワードを入力してください。")
             return
         
@@ -94,12 +113,13 @@ class ScraperApp:
             return
         
         if not self.scraping:
+            self.matcher = KeywordMatcher(keywords)
             self.scraping = True
             self.scraper_thread = threading.Thread(target=self.scrape, daemon=True)
             self.scraper_thread.start()
             self.start_button.config(state='disabled')
             self.stop_button.config(state='normal')
-            messagebox.showinfo("スクレイピング開始", f"キーワード「{self.keyword}」でスクレイピングを開始します。")
+            messagebox.showinfo("スクレイピング開始", f"キーワード {len(self.matcher)} 件でスクレイピングを開始します。")
     
     def stop_scraping(self):
         if self.scraping:
@@ -109,69 +129,41 @@ class ScraperApp:
             messagebox.showinfo("スクレイピング停止", "スクレイピングを停止しました。")
     
     def scrape(self):
-        while self.scraping:
-            try:
-                # Yahooニュース ビジネス版
-                yahoo_url = "https://finance.yahoo.co.jp/"
-                yahoo_headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-                }
-                yahoo_response = requests.get(yahoo_url, headers=yahoo_headers)
-                yahoo_soup = BeautifulSoup(yahoo_response.text, 'html.parser')
-                
-                # Yahooニュースの記事を抽出
-                for item in yahoo_soup.select('.newsFeed_item'):
-                    title_elem = item.select_one('.newsFeed_item_title')
-                    link_elem = item.select_one('a')
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        link = link_elem['href']
-                        if self.keyword.lower() in title.lower():
-                            with self.lock:
-                                if title not in self.collected_titles:
-                                    self.collected_titles.add(title)
-                                    self.results.insert(0, {'title': title, 'link': link, 'source': 'Yahoo'})
-                                    # 最新10件に制限
-                                    self.results = self.results[:10]
-                                    # テキストファイルに記録
-                                    with open(self.TEXT_FILE, 'a', encoding='utf-8') as f:
-                                        f.write(title + '\n')
-                
-                # Bloomberg日本版
-                bloomberg_url = "https://www.bloomberg.co.jp/"
-                bloomberg_headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-                }
-                bloomberg_response = requests.get(bloomberg_url, headers=bloomberg_headers)
-                bloomberg_soup = BeautifulSoup(bloomberg_response.text, 'html.parser')
-                
-                # Bloombergの記事を抽出
-                for item in bloomberg_soup.select('.index-module__post___3vhgV'):
-                    title_elem = item.select_one('h3')
-                    link_elem = item.select_one('a')
-                    if title_elem and link_elem:
-                        title = title_elem.get_text().strip()
-                        link = link_elem['href']
-                        if not link.startswith('http'):
-                            link = 'https://www.bloomberg.co.jp' + link
-                        if self.keyword.lower() in title.lower():
-                            with self.lock:
-                                if title not in self.collected_titles:
-                                    self.collected_titles.add(title)
-                                    self.results.insert(0, {'title': title, 'link': link, 'source': 'Bloomberg'})
-                                    # 最新10件に制限
-                                    self.results = self.results[:10]
-                                    # テキストファイルに記録
-                                    with open(self.TEXT_FILE, 'a', encoding='utf-8') as f:
-                                        f.write(title + '\n')
-                
-                # GUIを更新
-                self.root.after(0, self.update_treeview)
+        # 全サイトを同時に取得 (変更の無いサイトは解析しない)
+        fetcher = NewsFetcher(SOURCES)
+        try:
+            while self.scraping:
+                try:
+                    polled = asyncio.run(fetcher.poll())
+                    for name, result in polled.items():
+                        if result['error']:
+                            print(f"{name} の取得中にエラーが発生しました: {result['error']}")
+                    self.collect([item for result in polled.values() for item in result['items']])
+
+                    # GUIを更新
+                    self.root.after(0, self.update_treeview)
+                except Exception as e:
+                    print(f"スクレイピング中にエラーが発生しました: {e}")
                 # 次のスクレイピングまで待機
                 time.sleep(self.interval)
-            except Exception as e:
-                print(f"スクレイピング中にエラーが発生しました: {e}")
-                time.sleep(self.interval)
+        finally:
+            fetcher.close()
+    
+    def collect(self, items):
+        # キーワードを含む新しい記事だけを、含まれていたキーワードを付けて結果に加える
+        matched = {}
+        for item in items:
+            keywords = self.matcher.match(item['title'])
+            if keywords:
+                matched.setdefault(item['title'], {**item, 'keywords': keywords})
+        # 1回の巡回分をまとめて記録し、まだ記録されていなかったものだけ表示する
+        new_titles = self.collected_titles.add_many(list(matched))
+        self.collected_titles.expire()
+        with self.lock:
+            for title in new_titles:
+                self.results.insert(0, matched[title])
+            # 最新10件に制限
+            self.results = self.results[:10]
     
     def update_treeview(self):
         # ツリービューをクリア
@@ -179,7 +171,7 @@ class ScraperApp:
             self.tree.delete(item)
         # 最新の結果を挿入
         for item in self.results:
-            self.tree.insert('', 'end', values=(item['title'], item['link'], item['source']))
+            self.tree.insert('', 'end', values=(item['title'], ', '.join(item['keywords']), item['link'], item['source']))
     
     def update_results_periodically(self):
         # 定期的にツリービューを更新
@@ -191,7 +183,7 @@ class ScraperApp:
         selected_item = self.tree.selection()
         if selected_item:
             item = self.tree.item(selected_item)
-            link = item['values'][1]
+            link = item['values'][2]
             if link:
                 webbrowser.open(link)
 
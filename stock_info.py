@@ -1,11 +1,34 @@
+"""
+kabutan の決算ページから株価と決算短信 PDF を取得して Excel にまとめる
+まずブラウザを使わず HTTP で取得する (ページの HTML を解析し、PDF はチャンクごとにファイルへ書き出す)。
+必要な要素が HTML に無いページ (JavaScript で描画されるもの) だけを Selenium で処理する。
+Selenium 側は常駐するヘッドレス Chrome を N 個 (ワーカー) 起動し、各ワーカーがキューから URL を取り出して処理する。
+ワーカーごとにダウンロード先フォルダを分けるので、「フォルダ内で一番新しい PDF」が
+別のワーカーのファイルと混ざることはない。
+
+使い方:
+    python stock_info.py --http-workers 16 --workers 4
+    python stock_info.py --mode browser --workers 2 --show   # ブラウザだけで処理 (表示して動作確認)
+ローカルの確認用 HTTP サーバーに置いたページの URL を links ファイルに書けば、そのまま動作確認できる。
+処理状況は crawl_journal.sqlite に1件ずつ記録し、再実行すると完了済みの URL は飛ばす
+(失敗したものだけ処理し直す。--refresh で全件を取り直す。内容が同じ PDF は再ダウンロードしない)。
+"""
+import argparse
+import hashlib
 import os
+import queue
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+import requests
+from bs4 import BeautifulSoup
+
+from crawl_journal import CrawlJournal
+from download_tracker import DownloadTracker
 
 # リンク一覧ファイル名
 links_file = 'links.txt'
@@ -15,109 +38,369 @@ output_excel = 'stock_info.xlsx'
 pdf_folder = 'pdf_files'
 log_file = 'error_log.txt'
 
-# 保存フォルダ作成
-os.makedirs(pdf_folder, exist_ok=True)
+current_dir = os.path.abspath(os.path.dirname(__file__))
+
+# ページ内の要素 (HTTP 取得・ブラウザ共通)
+CODE_SELECTOR = '#stockinfo_i1 > div.si_i1_1 > h2 > span.inline-block'
+PRICE_SELECTOR = '#stockinfo_i1 > div.si_i1_2 > span.kabuka'
+PDF_PAGE_SELECTOR = 'div.fin_quarter_t0_d.fin_quarter_result_d > table > tbody > tr > td.fb_pdf1 > a'
+PDF_LINK_SELECTOR = '#pdflink > p > a'
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+_log_lock = threading.Lock()
 
-# ログ記録関数
+
+# ログ記録関数 (複数ワーカーから呼ばれる)
 def log_error(message):
-    with open(log_file, 'a', encoding='utf-8') as log:
-        log.write(message + '\n')
-
-# データ保存リスト
-data = []
-
-# ブラウザ設定
-options = webdriver.ChromeOptions()
-options.add_argument('--log-level=3')  # ログレベル抑制
-options.add_argument('--disable-dev-shm-usage')
-options.add_argument('--no-sandbox')
-options.add_argument('--disable-gpu')  # GPU無効化
-options.add_argument('--disable-software-rasterizer')
-options.add_experimental_option('excludeSwitches', ['enable-logging'])  # USBエラー抑制
-
-# ダウンロードディレクトリ設定
-current_dir = os.path.abspath(os.path.dirname(__file__))
-download_dir = os.path.join(current_dir, pdf_folder)
-prefs = {
-    "download.default_directory": download_dir,
-    "download.prompt_for_download": False,
-    "download.directory_upgrade": True,
-    "plugins.always_open_pdf_externally": True
-}
-options.add_experimental_option("prefs", prefs)
-
-# ダウンロード完了待機処理
-def wait_for_downloads(download_path, timeout=30):
-    end_time = time.time() + timeout
-    while time.time() < end_time:
-        if any([filename.endswith('.pdf') for filename in os.listdir(download_path)]):
-            return True
-        time.sleep(1)
-    return False
-
-# データ取得処理
-def fetch_stock_info(url):
+    with _log_lock:
+        with open(log_file, 'a', encoding='utf-8') as log:
+            log.write(message + '\n')
+
+
+# ======================
+# HTTP 取得 (ブラウザなし)
+# ======================
+class NeedsBrowser(Exception):
+    """HTML に必要な要素が無い (JavaScript で描画される) ため、ブラウザで処理すべきページ"""
+
+
+class PDFNotSaved(Exception):
+    """決算短信 PDF のリンクが無い、またはダウンロードが終わらなかった (完了扱いにせず失敗として記録する)"""
+
+
+_local = threading.local()
+
+
+def _session():
+    """スレッドごとに接続を使い回す Session"""
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+        _local.session.headers.update(HEADERS)
+    return _local.session
+
+
+def parse_stock_page(html, url):
+    """決算ページの HTML から (銘柄コード, 株価, PDF ページの URL または None) を取り出す"""
+    soup = BeautifulSoup(html, 'html.parser')
+    code = soup.select_one(CODE_SELECTOR)
+    price = soup.select_one(PRICE_SELECTOR)
+    if code is None or price is None:
+        raise NeedsBrowser(f'株価が HTML に含まれていません: {url}')
+    pdf_pages = soup.select(PDF_PAGE_SELECTOR)
+    pdf_page = urljoin(url, pdf_pages[-1]['href']) if pdf_pages and pdf_pages[-1].get('href') else None
+    return code.get_text(strip=True), price.get_text(strip=True), pdf_page
+
+
+def parse_pdf_page(html, url):
+    """PDF ページの HTML から PDF 本体の URL を取り出す"""
+    link = BeautifulSoup(html, 'html.parser').select_one(PDF_LINK_SELECTOR)
+    if link is None or not link.get('href'):
+        raise NeedsBrowser(f'PDF のリンクが HTML に含まれていません: {url}')
+    return urljoin(url, link['href'])
+
+
+def download_file(session, url, dest, chunk_size=1 << 16, timeout=30):
+    """
+    url をチャンクごとに dest へ書き出す (書き込み中は .part、完了後に置き換え)
+    戻り値: 内容の SHA-256
+    """
+    partial = dest + '.part'
+    digest = hashlib.sha256()
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        with open(partial, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+    os.replace(partial, dest)
+    return digest.hexdigest()
+
+
+def fetch_stock_info_http(url, pdf_dir=pdf_folder, journal=None):
+    """
+    ブラウザを使わずに1ページ分を取得する
+    必要な要素が HTML に無ければ NeedsBrowser、PDF のリンクが無ければ PDFNotSaved を投げる
+    journal があれば、前回と同じ内容の PDF はダウンロードしない
+    """
+    session = _session()
+    response = session.get(url, timeout=30)
+    response.raise_for_status()
+    stock_code, stock_price, pdf_page = parse_stock_page(response.text, response.url)
+    row = {'Stock Code': stock_code, 'Price': stock_price, 'PDF': f'{stock_code}.pdf'}
+    if pdf_page is None:
+        raise PDFNotSaved(f'PDF link not found for URL: {url}')
+
+    page = session.get(pdf_page, timeout=30)
+    page.raise_for_status()
+    pdf_url = parse_pdf_page(page.text, page.url)
+    dest = os.path.join(pdf_dir, f'{stock_code}.pdf')
+    if journal is None:
+        download_file(session, pdf_url, dest)
+    elif not journal.pdf_unchanged(url, pdf_url, dest):
+        journal.record_pdf(url, pdf_url, dest, download_file(session, pdf_url, dest))
+    return row
+
+
+def crawl_http(links, workers=16, pdf_dir=pdf_folder, journal=None):
+    """
+    links を HTTP で並行取得する
+    戻り値: (links と同じ順の結果リスト (失敗は None), ブラウザで処理し直す位置のリスト)
+    """
+    os.makedirs(pdf_dir, exist_ok=True)
+    results = [None] * len(links)
+    needs_browser = []
+
+    def task(position, url):
+        try:
+            results[position] = fetch_stock_info_http(url, pdf_dir, journal)
+            if journal:
+                journal.record_done(url, results[position])
+        except NeedsBrowser:
+            needs_browser.append(position)
+        except Exception as e:
+            log_error(f'Error processing URL {url}: {str(e)}')
+            if journal:
+                journal.record_failure(url, e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for position, url in enumerate(links):
+            executor.submit(task, position, url)
+    return results, sorted(needs_browser)
+
+
+# ======================
+# ブラウザ (Selenium) での取得
+# ======================
+# ブラウザ設定 (ダウンロード先はワーカーごと)
+def make_options(download_dir, headless=True):
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--log-level=3')  # ログレベル抑制
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-gpu')  # GPU無効化
+    options.add_argument('--disable-software-rasterizer')
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])  # USBエラー抑制
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "plugins.always_open_pdf_externally": True
+    }
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def start_browser(download_dir, headless=True):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    return webdriver.Chrome(service=Service(), options=make_options(download_dir, headless))
+
+
+# データ取得処理 (driver は使い回し、終わったら元のタブに戻す)
+# PDF のリンクが無い・ダウンロードが時間内に終わらない場合は PDFNotSaved を投げる
+def fetch_stock_info(driver, url, download_dir, pdf_dir=pdf_folder, journal=None):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    main_window = driver.current_window_handle
+    driver.get(url)
+    # ページ読み込み待機 (株価の表示まで)
+    wait = WebDriverWait(driver, 15)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, PRICE_SELECTOR)))
+
+    # 銘柄コード取得
+    stock_code = driver.find_element(By.CSS_SELECTOR, CODE_SELECTOR).text.strip()
+    stock_price = driver.find_element(By.CSS_SELECTOR, PRICE_SELECTOR).text.strip()
+    row = {'Stock Code': stock_code, 'Price': stock_price, 'PDF': f'{stock_code}.pdf'}
+
+    # PDFリンク取得
+    pdf_links = driver.find_elements(By.CSS_SELECTOR, PDF_PAGE_SELECTOR)
+    if not pdf_links:
+        raise PDFNotSaved(f'PDF link not found for URL: {url}')
+
     try:
-        service = Service()
-        driver = webdriver.Chrome(service=service, options=options)
-
-        driver.get(url)
-        # ページ読み込み待機
-        WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, '#stockinfo_i1')))
-        time.sleep(3)  # JS処理の待機
-
-        # 銘柄コード取得
-        stock_code = driver.find_element(By.CSS_SELECTOR, '#stockinfo_i1 > div.si_i1_1 > h2 > span.inline-block').text.strip()
-        stock_price = driver.find_element(By.CSS_SELECTOR, '#stockinfo_i1 > div.si_i1_2 > span.kabuka').text.strip()
-
-        # PDFリンク取得
-        pdf_links = driver.find_elements(By.CSS_SELECTOR, 'div.fin_quarter_t0_d.fin_quarter_result_d > table > tbody > tr > td.fb_pdf1 > a')
-        if pdf_links:
-            last_link = pdf_links[-1]
-            last_link.click()  # 最後のリンクをクリック
-            time.sleep(5)  # PDF画面への遷移待機
-
-            # 新しいウィンドウに切り替え
-            driver.switch_to.window(driver.window_handles[-1])
-
-            # PDFリンククリック
-            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, '#pdflink > p > a')))
-            pdf_final_link = driver.find_element(By.CSS_SELECTOR, '#pdflink > p > a')
+        windows = len(driver.window_handles)
+        pdf_links[-1].click()  # 最後のリンクをクリック
+        # PDF画面 (新しいウィンドウ) が開くまで待って切り替え
+        wait.until(EC.number_of_windows_to_be(windows + 1))
+        driver.switch_to.window(driver.window_handles[-1])
+
+        # PDFリンククリック
+        wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, PDF_LINK_SELECTOR)))
+        pdf_final_link = driver.find_element(By.CSS_SELECTOR, PDF_LINK_SELECTOR)
+        pdf_url = pdf_final_link.get_attribute('href') or None
+        expected = os.path.basename(urlparse(pdf_url or '').path) or None
+        dest = os.path.join(pdf_dir, f'{stock_code}.pdf')
+        if journal and pdf_url and journal.pdf_unchanged(url, pdf_url, dest):
+            return row  # 前回と同じ PDF
+
+        # ダウンロード確認 (このクリックで増えた PDF の書き込みが終わった時点で銘柄コード名で保存)
+        with DownloadTracker(download_dir) as tracker:
             pdf_final_link.click()
-            time.sleep(10)  # PDFダウンロード待機
+            latest_file = tracker.wait(timeout=30, expected=expected)
+        if not latest_file:
+            raise PDFNotSaved(f'Failed to download PDF for URL: {url}')
+        os.replace(latest_file, dest)
+        if journal:
+            journal.record_pdf(url, pdf_url, dest)
+    finally:
+        # 開いたウィンドウを閉じて元のタブに戻す
+        for handle in driver.window_handles:
+            if handle != main_window:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(main_window)
+    return row
 
-            # ダウンロード確認
-            if wait_for_downloads(download_dir):
-                latest_file = max([os.path.join(download_dir, f) for f in os.listdir(download_dir) if f.endswith('.pdf')], key=os.path.getmtime)
-                dest_path = os.path.join(download_dir, f'{stock_code}.pdf')
-                os.rename(latest_file, dest_path)
-            else:
-                log_error(f'Failed to download PDF for URL: {url}')
 
-        else:
-            log_error(f'PDF link not found for URL: {url}')
+# ======================
+# ワーカープール
+# ======================
+class BrowserWorker(threading.Thread):
+    """ブラウザを1つ持ち続け、キューの URL を順に処理するワーカー"""
 
-        # データ追加
-        data.append({'Stock Code': stock_code, 'Price': stock_price, 'PDF': f'{stock_code}.pdf'})
+    def __init__(self, worker_id, tasks, results, pdf_dir=pdf_folder, headless=True, browser_factory=start_browser,
+                 journal=None):
+        super().__init__(name=f'browser-{worker_id}', daemon=True)
+        self.journal = journal
+        self.tasks = tasks
+        self.results = results
+        self.pdf_dir = pdf_dir
+        self.headless = headless
+        self.browser_factory = browser_factory
+        self.download_dir = os.path.join(os.path.abspath(pdf_dir), '_downloads', f'worker_{worker_id}')
+        self.driver = None
 
-    except Exception as e:
-        log_error(f'Error processing URL {url}: {str(e)}')
+    def run(self):
+        os.makedirs(self.download_dir, exist_ok=True)
+        try:
+            while True:
+                try:
+                    position, url = self.tasks.get_nowait()
+                except queue.Empty:
+                    return
+                self.results[position] = self.process(url)
+        finally:
+            self.quit()
 
-    finally:
-        # ブラウザ終了
-        driver.quit()
+    def process(self, url):
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            if self.driver is None:
+                self.driver = self.browser_factory(self.download_dir, self.headless)
+            row = fetch_stock_info(self.driver, url, self.download_dir, self.pdf_dir, self.journal)
+            if self.journal:
+                self.journal.record_done(url, row)
+            return row
+        except WebDriverException as e:
+            # ブラウザが落ちた・応答しない場合は作り直して次の URL へ
+            log_error(f'Error processing URL {url}: {str(e)}')
+            self.quit()
+            error = e
+        except Exception as e:
+            log_error(f'Error processing URL {url}: {str(e)}')
+            error = e
+        if self.journal:
+            self.journal.record_failure(url, error)
+        return None
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+def crawl_browser(links, workers=4, pdf_dir=pdf_folder, headless=True, browser_factory=start_browser, journal=None):
+    """links を workers 個のブラウザで並行処理し、links と同じ順の結果リスト (失敗は None) を返す"""
+    os.makedirs(pdf_dir, exist_ok=True)
+    tasks = queue.Queue()
+    for position, url in enumerate(links):
+        tasks.put((position, url))
+    results = [None] * len(links)
+
+    pool = [BrowserWorker(i, tasks, results, pdf_dir, headless, browser_factory, journal)
+            for i in range(max(min(workers, len(links)), 1))]
+    for worker in pool:
+        worker.start()
+    for worker in pool:
+        worker.join()
+    shutil.rmtree(os.path.join(os.path.abspath(pdf_dir), '_downloads'), ignore_errors=True)
+    return results
+
+
+def crawl(links, mode='auto', http_workers=16, workers=4, pdf_dir=pdf_folder, headless=True,
+          browser_factory=start_browser, journal=None):
+    """
+    mode='auto'   : HTTP で取得し、JavaScript が必要なページだけブラウザで取得
+    mode='http'   : HTTP のみ / mode='browser' : ブラウザのみ
+    journal (CrawlJournal) があれば1件ごとに結果を記録する
+    links の順に結果 (取得できたもの) を返す
+    """
+    if mode == 'browser':
+        results, retry = [None] * len(links), list(range(len(links)))
+    else:
+        results, retry = crawl_http(links, http_workers, pdf_dir, journal)
+    if retry and mode != 'http':
+        for position, row in zip(retry, crawl_browser([links[i] for i in retry], workers, pdf_dir,
+                                                      headless, browser_factory, journal)):
+            results[position] = row
+    elif retry:
+        for position in retry:
+            log_error(f'JavaScript が必要なため取得できませんでした: {links[position]}')
+            if journal:
+                journal.record_failure(links[position], 'JavaScript が必要')
+    return [row for row in results if row]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kabutan から株価と決算短信 PDF を取得")
+    parser.add_argument('--links', default=links_file)
+    parser.add_argument('--output', default=output_excel)
+    parser.add_argument('--pdf-dir', default=os.path.join(current_dir, pdf_folder))
+    parser.add_argument('--mode', choices=['auto', 'http', 'browser'], default='auto',
+                        help="auto: HTTP で取得し、必要なページだけブラウザ")
+    parser.add_argument('--http-workers', type=int, default=16, help="HTTP で同時に取得するページ数")
+    parser.add_argument('--workers', type=int, default=4, help="同時に動かすブラウザの数")
+    parser.add_argument('--show', action='store_true', help="ブラウザを表示する (ヘッドレスにしない)")
+    parser.add_argument('--journal', default='crawl_journal.sqlite', help="処理状況を記録する SQLite ファイル")
+    parser.add_argument('--refresh', action='store_true', help="完了済みの URL も取り直す")
+    args = parser.parse_args()
+
+    # リンク一覧読み込み
+    with open(args.links, 'r') as file:
+        links = [line.strip() for line in file.readlines() if line.strip()]
+
+    # 各リンクにアクセスしてデータ取得 (完了済みは飛ばす)
+    journal = CrawlJournal(args.journal)
+    todo = journal.pending(links, refresh=args.refresh)
+    start = time.perf_counter()
+    crawl(todo, args.mode, args.http_workers, args.workers, args.pdf_dir, headless=not args.show, journal=journal)
+    elapsed = time.perf_counter() - start
+
+    # 今回と前回までの完了分をまとめて出力
+    data = journal.rows(links)
+    counts = journal.counts()
+    journal.close()
 
-# リンク一覧読み込み
-with open(links_file, 'r') as file:
-    links = [line.strip() for line in file.readlines() if line.strip()]
+    # Excelファイルに出力
+    if data:
+        df = pd.DataFrame(data)
+        df.to_excel(args.output, index=False)
 
-# 各リンクにアクセスしてデータ取得
-for link in links:
-    fetch_stock_info(link)
+    print(f'{len(todo)} 件を {elapsed:.0f} 秒で処理しました (完了 {len(data)}/{len(links)} 件, '
+          f'失敗 {counts.get("failed", 0)} 件)。')
+    print(f'Data saved to {args.output} and PDFs saved to {args.pdf_dir}.')
 
-# Excelファイルに出力
-if data:
-    df = pd.DataFrame(data)
-    df.to_excel(output_excel, index=False)
 
-print(f'Data saved to {output_excel} and PDFs saved to {pdf_folder}.')
+if __name__ == '__main__':
+    main()
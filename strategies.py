@@ -0,0 +1,103 @@
+"""
+売買戦略の関数群 (GUI に依存しない)
+yfinace.py の StrategyGUI やスキャナー/CLI から共通で使う。
+計算本体は strategy_engine の各カーネル。
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorCache
+from strategy_engine import apply_strategies_to_frame
+
+
+# ======================
+# 売買戦略の関数群
+# ======================
+def breakout_strategy(df, n=20, inplace=False):
+    """
+    ブレイクアウト戦略
+    過去n期間の高値を上抜け → Breakout_Buy=1
+    過去n期間の安値を下抜け → Breakout_Sell=1
+    inplace=True なら df をコピーせず列を書き込む
+    """
+    if not inplace:
+        df = df.copy()
+    return apply_strategies_to_frame(df, ['breakout'], {'breakout': {'n': n}}, combine=False)
+
+
+def moving_average_crossover_strategy(df, short_window=5, long_window=25, inplace=False):
+    """
+    移動平均線のゴールデンクロス/デッドクロス戦略
+    短期MAが長期MAを上抜け → MA_Buy=1
+    短期MAが長期MAを下抜け → MA_Sell=1
+    inplace=True なら df をコピーせず列を書き込む
+    """
+    if not inplace:
+        df = df.copy()
+    params = {'ma_cross': {'short_window': short_window, 'long_window': long_window}}
+    return apply_strategies_to_frame(df, ['ma_cross'], params, combine=False)
+
+
+def opening_range_break_strategy(df, opening_minutes=30, inplace=False):
+    """
+    オープニングレンジ・ブレイク戦略 (intraday用)
+    日ごとに、最初の X分間の高値/安値を超えたら OR_Buy/OR_Sell
+    groupby/merge を使わず、セッション開始時刻のブロードキャストと
+    日ごとの reduceat で1パスで計算する (df は時系列順が前提)
+    inplace=True なら df をコピーせず列を書き込む
+    """
+    if not inplace:
+        df = df.copy()
+    params = {'opening_range': {'opening_minutes': opening_minutes}}
+    apply_strategies_to_frame(df, ['opening_range'], params, combine=False)
+
+    # Datetime 列があればそれを、なければインデックスを時刻インデックスにする
+    if 'Datetime' in df.columns:
+        df.index = pd.DatetimeIndex(df.pop('Datetime'))
+    df.index = df.index.rename('Datetime')
+    return df
+
+
+def combine_signals(df, inplace=False):
+    """
+    3つの戦略（ブレイクアウト, オープニングレンジ, MAクロス）シグナルを融合
+    OR条件で Synergy_Buy, Synergy_Sell を出す
+    inplace=True なら df をコピーせず列を書き込む
+    """
+    if not inplace:
+        df = df.copy()
+    buy_cols  = ['Breakout_Buy','MA_Buy','OR_Buy']
+    sell_cols = ['Breakout_Sell','MA_Sell','OR_Sell']
+
+    for col in buy_cols + sell_cols:
+        if col not in df.columns:
+            df[col] = 0
+
+    # 列ごとの配列を OR で畳み込む (df[cols] の一時フレームを作らない)
+    buy = np.zeros(len(df), dtype=bool)
+    sell = np.zeros(len(df), dtype=bool)
+    for col in buy_cols:
+        buy |= df[col].to_numpy() > 0
+    for col in sell_cols:
+        sell |= df[col].to_numpy() > 0
+
+    df['Synergy_Buy'] = np.where(buy, 1, 0)
+    df['Synergy_Sell'] = np.where(sell, 1, 0)
+    return df
+
+
+def apply_strategies(df, names=None, params=None, inplace=True, indicators=None):
+    """
+    登録済み戦略 (strategy_engine.STRATEGIES) + シグナル合成をまとめて適用するパイプライン
+    入力配列は1回だけ取り出して全戦略で共有し、inplace=True (既定) では
+    渡された df 1つに全シグナル列を書き込み、途中のコピーを作らない
+    indicators (df から作った IndicatorCache) を渡すと、チャート用の MA などと計算結果を共有する
+    """
+    if not inplace:
+        df = df.copy()
+    if indicators is None:
+        indicators = IndicatorCache.from_frame(df)
+    apply_strategies_to_frame(df, names, params, indicators=indicators)
+    # 75日線計算
+    df['MA_75'] = indicators.sma('Close', 75)
+    return df
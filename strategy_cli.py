@@ -0,0 +1,137 @@
+"""
+売買戦略パイプラインのコマンドライン版 (GUIなしで実行)
+データ取得 → 戦略適用 + シグナル合成 → 損益検証 → シグナルのファイル出力 を
+複数銘柄まとめて行う。tkinter / matplotlib は一切読み込まず、pandas などの重いモジュールも
+引数の解析が終わってから読み込むので、--help やヘッドレスのサーバーでもすぐ起動する。
+
+使い方:
+    python strategy_cli.py AAPL MSFT --start 2023-01-01 --end 2023-12-31 --interval 1d \
+        --strategies breakout,ma_cross --param ma_cross.short_window=10 --format parquet --output-dir signals
+    python strategy_cli.py --watchlist kabulist.txt --start 2024-01-01 --format json --signals-only
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+FORMATS = ('csv', 'parquet', 'json')
+
+
+def parse_params(specs):
+    """['breakout.n=30', 'ma_cross.short_window=10'] → {'breakout': {'n': '30'}, ...}"""
+    params = {}
+    for spec in specs:
+        key, _, value = spec.partition('=')
+        name, _, param = key.partition('.')
+        if not (name and param and value):
+            raise ValueError(f"パラメータは 戦略名.パラメータ名=値 の形式で指定してください: {spec}")
+        params.setdefault(name, {})[param] = value
+    return params
+
+
+def load_tickers(args):
+    """引数とウォッチリストから銘柄一覧を作る (東証のコードには .T を付ける)"""
+    tickers = list(args.tickers)
+    if args.watchlist:
+        from kabulist import to_ticker
+        from watchlist_scanner import load_watchlist
+
+        tickers += [to_ticker(symbol) for symbol in load_watchlist(args.watchlist)]
+    return list(dict.fromkeys(tickers))
+
+
+def write_signals(df, path, fmt):
+    """シグナル付きの DataFrame を csv / parquet / json で書き出す"""
+    if fmt == 'csv':
+        df.to_csv(path)
+    elif fmt == 'parquet':
+        df.to_parquet(path)
+    elif fmt == 'json':
+        df.reset_index().to_json(path, orient='records', date_format='iso', force_ascii=False, indent=1)
+    else:
+        raise ValueError(f"未対応の出力形式です: {fmt}")
+
+
+def run_ticker(ticker, cache, args, names, params):
+    """1銘柄分のパイプライン。戻り値: (出力先, 行数, 検証結果 dict)"""
+    from backtest import backtest
+    from market_data import OHLCV_COLUMNS
+    from strategies import apply_strategies
+
+    df = cache.get(ticker, args.start, args.end, interval=args.interval)
+    if df.empty:
+        raise ValueError("データが取得できませんでした")
+    df = df[OHLCV_COLUMNS].sort_index()
+    apply_strategies(df, names, params)
+    stats, _ = backtest(df, fee=args.fee, slippage=args.slippage)
+
+    if args.signals_only:
+        df = df[(df['Synergy_Buy'] == 1) | (df['Synergy_Sell'] == 1)]
+    safe = ticker.replace('/', '_').replace('^', '_')
+    path = os.path.join(args.output_dir, f"{safe}_{args.interval}.{args.format}")
+    write_signals(df, path, args.format)
+    return path, len(df), stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="売買戦略のシグナル計算と出力 (GUIなし)")
+    parser.add_argument('tickers', nargs='*', help="銘柄 (例: AAPL 7203.T)")
+    parser.add_argument('--watchlist', help="銘柄コードを1行ずつ書いたファイル (kabulist.txt など)")
+    parser.add_argument('--start', required=True, help="開始日 YYYY-MM-DD")
+    parser.add_argument('--end', default=None, help="終了日 YYYY-MM-DD (省略時は今日まで)")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--strategies', default=None, help="カンマ区切りの戦略名 (省略時は全戦略)")
+    parser.add_argument('--param', action='append', default=[], help="戦略名.パラメータ名=値 (複数指定可)")
+    parser.add_argument('--fee', type=float, default=0.0005)
+    parser.add_argument('--slippage', type=float, default=0.0005)
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output-dir', default='signals')
+    parser.add_argument('--signals-only', action='store_true', help="Synergy シグナルが出た行だけ出力")
+    parser.add_argument('--workers', type=int, default=4, help="並行して処理する銘柄数")
+    args = parser.parse_args(argv)
+
+    tickers = load_tickers(args)
+    if not tickers:
+        parser.error("銘柄またはウォッチリストを指定してください")
+    try:
+        params = parse_params(args.param)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == 'parquet' and not any(importlib.util.find_spec(m) for m in ('pyarrow', 'fastparquet')):
+        parser.error("parquet で出力するには pyarrow または fastparquet が必要です")
+
+    # ここから重いモジュールを読み込む
+    from concurrent.futures import ThreadPoolExecutor
+
+    from backtest import format_stats
+    from market_data import MarketDataCache
+    from strategy_engine import STRATEGIES
+
+    names = args.strategies.split(',') if args.strategies else list(STRATEGIES)
+    unknown = [name for name in names + list(params) if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"未登録の戦略です: {', '.join(unknown)} (登録済み: {', '.join(STRATEGIES)})")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache = MarketDataCache()
+    started = time.perf_counter()
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {ticker: executor.submit(run_ticker, ticker, cache, args, names, params) for ticker in tickers}
+        for ticker, future in futures.items():
+            try:
+                path, rows, stats = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"{ticker}: エラー: {e}", file=sys.stderr)
+                continue
+            print(f"{ticker}: {rows} 行 → {path}")
+            print("    " + format_stats(stats).replace("\n", "\n    "))
+
+    print(f"{len(tickers)} 銘柄 (失敗 {failed} 件) を {time.perf_counter() - started:.1f} 秒で処理しました。")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
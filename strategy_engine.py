@@ -0,0 +1,243 @@
+"""
+売買戦略エンジン
+各戦略は入力列・パラメータ・必要な過去本数(lookback)を宣言して登録し、
+連続した float64 の NumPy 配列だけを受け取る純粋な関数(カーネル)として実装する。
+run_strategies() が入力配列を一度だけ用意し、指定した戦略をまとめて実行する。
+カーネルに渡される arrays は indicators.IndicatorCache で、ローリング計算は窓サイズごとに1回だけ行われる
+(呼び出し側が IndicatorCache を渡せば、チャートなど戦略以外の指標計算とも結果を共有できる)。
+
+新しい戦略の追加例:
+    @register_strategy('my_strategy', inputs=('Close',), outputs=('My_Buy', 'My_Sell'),
+                       params={'n': 10}, lookback=lambda p: p['n'])
+    def my_kernel(arrays, n):
+        ...
+        return {'My_Buy': buy, 'My_Sell': sell}
+"""
+import numpy as np
+
+from indicators import IndicatorCache
+
+
+# ======================
+# 戦略レジストリ
+# ======================
+class Strategy:
+    """登録された戦略 1つ分の定義"""
+
+    def __init__(self, name, kernel, inputs, outputs, params, lookback, label=None):
+        self.name = name
+        self.kernel = kernel
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = dict(params)
+        self._lookback = lookback
+        self.label = label or name
+
+    @property
+    def buy_column(self):
+        return next(col for col in self.outputs if col.endswith('_Buy'))
+
+    @property
+    def sell_column(self):
+        return next(col for col in self.outputs if col.endswith('_Sell'))
+
+    def resolve_params(self, overrides=None):
+        """既定値に上書き値を重ねたパラメータを返す (未知のキーはエラー)"""
+        params = dict(self.params)
+        for key, value in (overrides or {}).items():
+            if key not in params:
+                raise KeyError(f"{self.name} に存在しないパラメータです: {key}")
+            params[key] = type(params[key])(value)
+        return params
+
+    def lookback(self, params=None):
+        """最新バーのシグナルを出すのに必要な過去バー数"""
+        return int(self._lookback(self.resolve_params(params)))
+
+    def __call__(self, arrays, params=None):
+        return self.kernel(arrays, **self.resolve_params(params))
+
+
+STRATEGIES = {}
+
+
+def register_strategy(name, inputs, outputs, params, lookback, label=None):
+    """カーネル関数を戦略として登録するデコレータ"""
+    def decorator(kernel):
+        STRATEGIES[name] = Strategy(name, kernel, inputs, outputs, params, lookback, label)
+        return kernel
+    return decorator
+
+
+# ======================
+# 配列ヘルパー
+# ======================
+def shift(values, periods=1):
+    """pandas の shift(periods) と同じ (periods >= 0)"""
+    out = np.full(len(values), np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def to_signal(cond):
+    """bool 配列を 0/1 の int64 シグナルに変換"""
+    return cond.astype(np.int64)
+
+
+# ======================
+# 戦略カーネル
+# ======================
+@register_strategy('breakout', inputs=('High', 'Low', 'Close'),
+                   outputs=('Highest', 'Lowest', 'Breakout_Buy', 'Breakout_Sell'),
+                   params={'n': 20}, lookback=lambda p: p['n'] + 1, label="ブレイクアウト")
+def breakout_kernel(arrays, n):
+    """過去n期間の高値を上抜け → Buy, 安値を下抜け → Sell"""
+    highest = shift(arrays.rolling_max('High', n))
+    lowest = shift(arrays.rolling_min('Low', n))
+    close = arrays['Close']
+    return {
+        'Highest': highest,
+        'Lowest': lowest,
+        'Breakout_Buy': to_signal(close > highest),
+        'Breakout_Sell': to_signal(close < lowest),
+    }
+
+
+@register_strategy('ma_cross', inputs=('Close',),
+                   outputs=('MA_short', 'MA_long', 'MA_Buy', 'MA_Sell'),
+                   params={'short_window': 5, 'long_window': 25},
+                   lookback=lambda p: max(p['short_window'], p['long_window']) + 1, label="MAクロス")
+def ma_cross_kernel(arrays, short_window, long_window):
+    """短期MAが長期MAを上抜け → Buy, 下抜け → Sell"""
+    ma_short = arrays.rolling_mean('Close', short_window)
+    ma_long = arrays.rolling_mean('Close', long_window)
+    prev_short = shift(ma_short)
+    prev_long = shift(ma_long)
+    return {
+        'MA_short': ma_short,
+        'MA_long': ma_long,
+        'MA_Buy': to_signal((prev_short <= prev_long) & (ma_short > ma_long)),
+        'MA_Sell': to_signal((prev_short >= prev_long) & (ma_short < ma_long)),
+    }
+
+
+@register_strategy('opening_range', inputs=('Datetime', 'High', 'Low', 'Close'),
+                   outputs=('OR_High', 'OR_Low', 'OR_Buy', 'OR_Sell'),
+                   params={'opening_minutes': 30}, lookback=lambda p: 0, label="オープニングレンジ")
+def opening_range_kernel(arrays, opening_minutes):
+    """
+    日ごとに最初の X分間の高値/安値を超えたら Buy/Sell
+    Datetime は現地時刻の datetime64 (時系列順)。lookback はセッション開始まで遡る必要がある
+    """
+    ts = arrays['Datetime']
+    high = arrays['High']
+    low = arrays['Low']
+    if len(ts) == 0:
+        no_signal = np.zeros(0, dtype=np.int64)
+        return {'OR_High': np.empty(0), 'OR_Low': np.empty(0), 'OR_Buy': no_signal, 'OR_Sell': no_signal}
+
+    # 日付が変わる位置 = セッション開始
+    day = ts.astype('datetime64[D]')
+    new_session = np.empty(len(ts), dtype=bool)
+    new_session[0] = True
+    new_session[1:] = day[1:] != day[:-1]
+    starts = np.flatnonzero(new_session)
+    session_id = np.cumsum(new_session) - 1
+
+    # セッション開始時刻を各行へブロードキャストし、最初の X分間だけを残す
+    in_window = (ts - ts[starts][session_id]) < np.timedelta64(opening_minutes, 'm')
+    or_high = np.fmax.reduceat(np.where(in_window, high, -np.inf), starts)
+    or_low = np.fmin.reduceat(np.where(in_window, low, np.inf), starts)
+    # 全て欠損のセッションは NaN に戻す
+    or_high[np.isinf(or_high)] = np.nan
+    or_low[np.isinf(or_low)] = np.nan
+
+    or_high = or_high[session_id]
+    or_low = or_low[session_id]
+    close = arrays['Close']
+    return {
+        'OR_High': or_high,
+        'OR_Low': or_low,
+        'OR_Buy': to_signal(close > or_high),
+        'OR_Sell': to_signal(close < or_low),
+    }
+
+
+# ======================
+# エンジン本体
+# ======================
+def frame_to_arrays(df, columns):
+    """DataFrame から指定列を連続した配列として取り出す (Datetime は現地時刻の datetime64)"""
+    import pandas as pd
+
+    arrays = {}
+    for col in columns:
+        if col == 'Datetime':
+            dt = pd.DatetimeIndex(df['Datetime'] if 'Datetime' in df.columns else df.index)
+            if dt.tz is not None:
+                dt = dt.tz_localize(None)
+            arrays[col] = np.ascontiguousarray(dt.values)
+        else:
+            arrays[col] = np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+    return IndicatorCache(arrays)
+
+
+def combine_outputs(outputs, names):
+    """実行した戦略の Buy/Sell を OR 条件で合成し Synergy_Buy/Synergy_Sell を作る"""
+    length = len(next(iter(outputs.values()))) if outputs else 0
+    buy = np.zeros(length, dtype=bool)
+    sell = np.zeros(length, dtype=bool)
+    for name in names:
+        strategy = STRATEGIES[name]
+        buy |= outputs[strategy.buy_column] > 0
+        sell |= outputs[strategy.sell_column] > 0
+    return {'Synergy_Buy': to_signal(buy), 'Synergy_Sell': to_signal(sell)}
+
+
+def run_strategies(data, names=None, params=None, combine=True):
+    """
+    登録済み戦略をまとめて実行し、出力列名 → 配列 の dict を返す
+    data   : DataFrame、列名 → 配列 の dict、または使い回す IndicatorCache
+    names  : 実行する戦略名のリスト (None なら全戦略)
+    params : {戦略名: {パラメータ名: 値}} の上書き指定
+    """
+    names = list(STRATEGIES) if names is None else list(names)
+    params = params or {}
+    strategies = [STRATEGIES[name] for name in names]
+
+    # 全戦略の入力を一度だけ配列化して共有する
+    needed = []
+    for strategy in strategies:
+        needed.extend(col for col in strategy.inputs if col not in needed)
+    if isinstance(data, IndicatorCache):
+        arrays = data
+    elif isinstance(data, dict):
+        arrays = IndicatorCache({col: data[col] for col in needed})
+    else:
+        arrays = frame_to_arrays(data, needed)
+
+    outputs = {}
+    for strategy in strategies:
+        outputs.update(strategy(arrays, params.get(strategy.name)))
+    if combine:
+        outputs.update(combine_outputs(outputs, names))
+    return outputs
+
+
+def apply_strategies_to_frame(df, names=None, params=None, combine=True, indicators=None):
+    """
+    run_strategies() の結果を df の列として書き込む (df 自体を更新して返す)
+    indicators に df から作った IndicatorCache を渡すと、その計算結果を共有する
+    """
+    data = df if indicators is None else indicators
+    for col, values in run_strategies(data, names, params, combine).items():
+        df[col] = values
+    return df
+
+
+def required_history(names=None, params=None):
+    """指定戦略の最新バーのシグナル計算に必要な過去バー数の最大値"""
+    names = list(STRATEGIES) if names is None else list(names)
+    params = params or {}
+    return max((STRATEGIES[name].lookback(params.get(name)) for name in names), default=0)
@@ -0,0 +1,193 @@
+"""
+ブレイクアウト / MAクロス戦略のパラメータ探索 (GUIなしで実行)
+取得した OHLCV は共有メモリに1回だけ置き、ProcessPoolExecutor の各ワーカーから参照する。
+ローリング最大/最小/平均は (銘柄, 窓サイズ) ごとに1回だけ計算し、全組み合わせで使い回す。
+各組み合わせの損益は backtest.backtest_arrays() で評価する。
+
+使い方:
+    python strategy_sweep.py AAPL MSFT 7203.T --start 2020-01-01 --end 2023-12-31 \
+        --n 10:60:5 --short 3,5,10 --long 20:80:5 --search random --samples 200
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest_arrays, infer_periods_per_year
+from market_data import MarketDataCache
+from indicators import IndicatorCache
+from strategy_engine import STRATEGIES
+
+SWEEP_COLUMNS = ('High', 'Low', 'Close')
+
+
+# ======================
+# パラメータ空間
+# ======================
+def parse_values(spec):
+    """'10,20,30' または 'start:stop:step' (stop を含む) を整数リストに変換"""
+    if ':' in spec:
+        start, stop, step = (int(v) for v in spec.split(':'))
+        return list(range(start, stop + 1, step))
+    return [int(v) for v in spec.split(',') if v.strip()]
+
+
+def build_combinations(n_values, short_values, long_values, search='grid', samples=100, seed=0):
+    """探索する (戦略名, パラメータ) の一覧を作る。random は全組み合わせから samples 件を抽出"""
+    combos = [('breakout', {'n': n}) for n in n_values]
+    combos += [('ma_cross', {'short_window': s, 'long_window': l})
+               for s, l in itertools.product(short_values, long_values) if s < l]
+    if search == 'random' and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    # 同じ窓サイズが続くように並べ、ワーカー内のキャッシュを効かせる
+    return sorted(combos, key=lambda c: (c[0], sorted(c[1].items())))
+
+
+# ======================
+# 共有メモリ
+# ======================
+def to_shared_memory(df):
+    """High/Low/Close を (3, n) の float64 として共有メモリへ置き、(SharedMemory, 形状) を返す"""
+    values = np.ascontiguousarray(df[list(SWEEP_COLUMNS)].to_numpy(dtype=np.float64).T)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+    return shm, values.shape
+
+
+# ワーカープロセス内のキャッシュ: 共有メモリ名 → (SharedMemory, IndicatorCache)
+_worker_arrays = {}
+
+
+def _attach(shm_name, shape):
+    """共有メモリを(コピーせず)配列として参照し、ワーカー内で使い回す IndicatorCache を返す"""
+    if shm_name not in _worker_arrays:
+        # 解放 (unlink) は作成した親プロセスが行う
+        shm = shared_memory.SharedMemory(name=shm_name)
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        _worker_arrays[shm_name] = (shm, IndicatorCache(dict(zip(SWEEP_COLUMNS, values))))
+    return _worker_arrays[shm_name][1]
+
+
+# ======================
+# 評価
+# ======================
+def evaluate_signals(close, buy, sell, horizon=5, **backtest_options):
+    """
+    シグナルを評価する
+    return / sharpe / max_drawdown / win_rate / turnover : backtest_arrays() の結果
+    hit_rate : 買いシグナルのうち horizon バー後の終値が上がっていた割合
+    """
+    stats, _ = backtest_arrays(close, buy, sell, **backtest_options)
+    entries = np.flatnonzero(buy[:len(close) - horizon] > 0)
+    hit_rate = float(np.mean(close[entries + horizon] > close[entries])) if len(entries) else np.nan
+    return {'return': stats['total_return'], 'sharpe': stats['sharpe'], 'max_drawdown': stats['max_drawdown'],
+            'win_rate': stats['win_rate'], 'turnover': stats['turnover'],
+            'hit_rate': hit_rate, 'signals': int(len(entries))}
+
+
+def _evaluate_task(ticker, shm_name, shape, combos, horizon, backtest_options):
+    """1銘柄分の組み合わせをまとめて評価 (ワーカープロセスで実行)"""
+    arrays = _attach(shm_name, shape)
+    rows = []
+    for name, params in combos:
+        strategy = STRATEGIES[name]
+        outputs = strategy(arrays, params)
+        metrics = evaluate_signals(arrays['Close'], outputs[strategy.buy_column],
+                                   outputs[strategy.sell_column], horizon, **backtest_options)
+        rows.append({'ticker': ticker, 'strategy': name,
+                     'params': ', '.join(f'{k}={v}' for k, v in params.items()), **metrics})
+    return rows
+
+
+def run_sweep(data, combos, workers=None, horizon=5, chunk_size=None, **backtest_options):
+    """
+    data   : 銘柄 → OHLCV DataFrame
+    combos : build_combinations() の結果
+    backtest_options : fee / slippage / allow_short / periods_per_year (backtest_arrays() へ渡す)
+    戻り値 : (全結果の DataFrame, 組み合わせごとに平均したランキング DataFrame)
+    """
+    workers = workers or os.cpu_count() or 1
+    # 1タスク = 1銘柄 × 組み合わせの塊 (ワーカー数の数倍のタスクに分ける)
+    chunk_size = chunk_size or max(1, len(combos) * len(data) // (workers * 4))
+
+    shared = {ticker: to_shared_memory(df) for ticker, df in data.items() if not df.empty}
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_evaluate_task, ticker, shm.name, shape, combos[i:i + chunk_size],
+                                horizon, backtest_options)
+                for ticker, (shm, shape) in shared.items()
+                for i in range(0, len(combos), chunk_size)
+            ]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+    finally:
+        for shm, _ in shared.values():
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results, results
+    ranking = (results.groupby(['strategy', 'params'])
+               .agg(mean_return=('return', 'mean'), sharpe=('sharpe', 'mean'),
+                    max_drawdown=('max_drawdown', 'min'), win_rate=('win_rate', 'mean'),
+                    hit_rate=('hit_rate', 'mean'), turnover=('turnover', 'mean'),
+                    signals=('signals', 'sum'), tickers=('ticker', 'nunique'))
+               .sort_values('mean_return', ascending=False)
+               .reset_index())
+    return results, ranking
+
+
+def download_ohlcv(tickers, start, end, interval, cache=None):
+    """銘柄ごとの OHLCV を取得 (ローカルキャッシュ経由、未取得の期間だけダウンロード)"""
+    cache = cache or MarketDataCache()
+    return {ticker: cache.get(ticker, start, end, interval) for ticker in tickers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ブレイクアウト / MAクロスのパラメータ探索")
+    parser.add_argument('tickers', nargs='+', help="銘柄コード (例: AAPL 7203.T)")
+    parser.add_argument('--start', default='2020-01-01')
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--n', default='10:60:5', help="ブレイクアウト期間 (例: 10,20,30 / 10:60:5)")
+    parser.add_argument('--short', default='3,5,10', help="短期MA")
+    parser.add_argument('--long', default='20:80:5', help="長期MA")
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=100, help="random 探索の件数")
+    parser.add_argument('--horizon', type=int, default=5, help="ヒット率判定の先読みバー数")
+    parser.add_argument('--fee', type=float, default=0.0005, help="手数料 (約定金額比)")
+    parser.add_argument('--slippage', type=float, default=0.0005, help="スリッページ (約定金額比)")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=None, help="ランキングの保存先 CSV")
+    args = parser.parse_args()
+
+    combos = build_combinations(parse_values(args.n), parse_values(args.short), parse_values(args.long),
+                                args.search, args.samples)
+    t0 = time.perf_counter()
+    data = download_ohlcv(args.tickers, args.start, args.end, args.interval)
+    t1 = time.perf_counter()
+    # シャープレシオの年換算は最も長い銘柄の足の間隔から推定する
+    longest = max(data.values(), key=len)
+    _, ranking = run_sweep(data, combos, args.workers, args.horizon, fee=args.fee, slippage=args.slippage,
+                           periods_per_year=infer_periods_per_year(longest.index))
+    t2 = time.perf_counter()
+
+    print(f"{len(data)} 銘柄 × {len(combos)} 組み合わせ  取得 {t1 - t0:.1f}s  探索 {t2 - t1:.1f}s")
+    print(ranking.head(args.top).to_string(index=False))
+    if args.output:
+        ranking.to_csv(args.output, index=False)
+        print(f"ランキングを {args.output} に保存しました。")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+ライブ足向けの逐次シグナル計算
+1本ずつ足を受け取り、銘柄ごとに O(窓サイズ) の状態だけを持って
+Breakout / MA / OR / Synergy のシグナルを1本あたり O(1) で出す。
+
+    rolling max/min : 単調 deque
+    移動平均        : 窓の合計を補正項つきで足し引き (pandas の rolling().mean() と同じ計算順序)
+    オープニングレンジ : 当日のセッション開始時刻と高値/安値
+
+出力は strategy_engine (バッチ計算) と一致する。
+ただし OR_High/OR_Low はオープニング時間中は「その時点までの」高値/安値になる
+(バッチはその時間帯の確定値を使うが、時間中のバーの OR シグナルはどちらも必ず 0)。
+
+使い方:
+    monitor = StreamingMonitor()
+    signals = monitor.update('7203.T', timestamp, open_, high, low, close, volume)
+"""
+import math
+from collections import deque
+
+import pandas as pd
+
+from strategy_engine import STRATEGIES
+
+
+class RollingExtreme:
+    """直近 n 本の最大値 (または最小値) を単調 deque で O(1) 償却で求める"""
+
+    def __init__(self, n, mode='max'):
+        self.n = n
+        self.better = (lambda a, b: a >= b) if mode == 'max' else (lambda a, b: a <= b)
+        self.window = deque()   # (バー番号, 値) 値は単調
+        self.last_nan = -1      # 直近で NaN が来たバー番号 (窓に NaN があれば結果も NaN)
+        self.count = 0
+
+    def push(self, value):
+        i = self.count
+        self.count += 1
+        if math.isnan(value):
+            self.last_nan = i
+        else:
+            while self.window and self.better(value, self.window[-1][1]):
+                self.window.pop()
+            self.window.append((i, value))
+        while self.window and self.window[0][0] <= i - self.n:
+            self.window.popleft()
+
+    def value(self):
+        """直近 n 本の極値 (n 本に満たない、または NaN を含む場合は NaN)"""
+        if self.count < self.n or self.last_nan > self.count - 1 - self.n or not self.window:
+            return math.nan
+        return self.window[0][1]
+
+
+class RollingMean:
+    """
+    直近 n 本の平均 (窓内に NaN があれば NaN)
+    pandas の rolling(n).mean() と同じ手順で計算する: 窓全体の合計を1つ持ち続け、
+    出ていく値を引いてから入ってくる値を足す (足し算・引き算それぞれに Kahan の補正項を持つ)。
+    同じ値が窓いっぱいに続くときはその値、符号がそろっているのに合計の符号が逆なら 0 とする点も同じ
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.window = deque()
+        self.nobs = 0           # 窓内の NaN でない値の数
+        self.total = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg_count = 0
+        self.same_count = 0     # 末尾から同じ値が続いている本数
+        self.prev = None
+        self.result = math.nan
+
+    def push(self, value):
+        if self.n == 1:
+            # 窓 1 本は pandas でも毎回状態を作り直すので値そのもの
+            self.result = value
+            return
+        if self.prev is None:
+            self.prev = value
+        self.window.append(value)
+        if len(self.window) > self.n:
+            old = self.window.popleft()
+            if not math.isnan(old):
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.total + y
+                self.comp_remove = t - self.total - y
+                self.total = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg_count -= 1
+        if not math.isnan(value):
+            self.nobs += 1
+            y = value - self.comp_add
+            t = self.total + y
+            self.comp_add = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_count += 1
+            self.same_count = self.same_count + 1 if value == self.prev else 1
+            self.prev = value
+        self.result = self._mean()
+
+    def _mean(self):
+        if self.nobs < self.n:
+            return math.nan
+        if self.same_count >= self.nobs:
+            return self.prev
+        result = self.total / self.nobs
+        if self.neg_count == 0 and result < 0:
+            return 0.0
+        if self.neg_count == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    def value(self):
+        return self.result
+
+
+class StreamingSignals:
+    """1銘柄分の逐次シグナル計算"""
+
+    def __init__(self, params=None):
+        params = params or {}
+        self.n = STRATEGIES['breakout'].resolve_params(params.get('breakout'))['n']
+        ma = STRATEGIES['ma_cross'].resolve_params(params.get('ma_cross'))
+        self.opening_minutes = STRATEGIES['opening_range'].resolve_params(params.get('opening_range'))['opening_minutes']
+
+        # ブレイクアウト: 前バーまでの n 本の高値/安値
+        self.highest = RollingExtreme(self.n, 'max')
+        self.lowest = RollingExtreme(self.n, 'min')
+        # MAクロス
+        self.ma_short = RollingMean(ma['short_window'])
+        self.ma_long = RollingMean(ma['long_window'])
+        self.prev_short = math.nan
+        self.prev_long = math.nan
+        # オープニングレンジ
+        self.session_date = None
+        self.session_start = None
+        self.or_high = math.nan
+        self.or_low = math.nan
+
+    def update(self, timestamp, open_, high, low, close, volume=0.0):
+        """新しい足を1本追加し、そのバーのシグナル dict を返す"""
+        out = {}
+
+        # --- ブレイクアウト (当バーを入れる前の n 本と比較) ---
+        highest = self.highest.value()
+        lowest = self.lowest.value()
+        self.highest.push(high)
+        self.lowest.push(low)
+        out['Highest'] = highest
+        out['Lowest'] = lowest
+        out['Breakout_Buy'] = int(close > highest)
+        out['Breakout_Sell'] = int(close < lowest)
+
+        # --- MAクロス ---
+        self.ma_short.push(close)
+        self.ma_long.push(close)
+        ma_short = self.ma_short.value()
+        ma_long = self.ma_long.value()
+        out['MA_short'] = ma_short
+        out['MA_long'] = ma_long
+        out['MA_Buy'] = int(self.prev_short <= self.prev_long and ma_short > ma_long)
+        out['MA_Sell'] = int(self.prev_short >= self.prev_long and ma_short < ma_long)
+        self.prev_short, self.prev_long = ma_short, ma_long
+
+        # --- オープニングレンジ (現地時刻の日付でセッションを区切る) ---
+        ts = pd.Timestamp(timestamp)
+        if ts.tzinfo is not None:
+            ts = ts.tz_localize(None)
+        if ts.date() != self.session_date:
+            self.session_date = ts.date()
+            self.session_start = ts
+            self.or_high = math.nan
+            self.or_low = math.nan
+        if ts - self.session_start < pd.Timedelta(minutes=self.opening_minutes):
+            # オープニング時間中: 高値/安値を更新 (NaN は無視)
+            if not math.isnan(high):
+                self.or_high = high if math.isnan(self.or_high) else max(self.or_high, high)
+            if not math.isnan(low):
+                self.or_low = low if math.isnan(self.or_low) else min(self.or_low, low)
+            out['OR_Buy'] = 0
+            out['OR_Sell'] = 0
+        else:
+            out['OR_Buy'] = int(close > self.or_high)
+            out['OR_Sell'] = int(close < self.or_low)
+        out['OR_High'] = self.or_high
+        out['OR_Low'] = self.or_low
+
+        # --- 合成 ---
+        out['Synergy_Buy'] = int(out['Breakout_Buy'] or out['MA_Buy'] or out['OR_Buy'])
+        out['Synergy_Sell'] = int(out['Breakout_Sell'] or out['MA_Sell'] or out['OR_Sell'])
+        return out
+
+    def warm_up(self, df):
+        """過去の足 (DataFrame) を流し込んで状態を作り、各バーのシグナルを DataFrame で返す"""
+        rows = [self.update(ts, *values) for ts, values in
+                zip(df.index, df[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=False, name=None))]
+        return pd.DataFrame(rows, index=df.index)
+
+
+class StreamingMonitor:
+    """複数銘柄の逐次シグナル計算をまとめて管理する"""
+
+    def __init__(self, params=None):
+        self.params = params
+        self.states = {}
+
+    def update(self, ticker, timestamp, open_, high, low, close, volume=0.0):
+        if ticker not in self.states:
+            self.states[ticker] = StreamingSignals(self.params)
+        return self.states[ticker].update(timestamp, open_, high, low, close, volume)
+
+    def warm_up(self, ticker, df):
+        self.states[ticker] = StreamingSignals(self.params)
+        return self.states[ticker].warm_up(df)
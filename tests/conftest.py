@@ -0,0 +1,47 @@
+"""
+テスト共通: リポジトリ直下のモジュールを import できるようにし、ローカルの確認用 HTTP サーバーを用意する
+"""
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serve():
+    """
+    serve(handle) でサーバーを起動してベース URL を返す
+    handle(handler) → (ステータス, ヘッダーの dict, 本文 bytes)。handler は BaseHTTPRequestHandler
+    (GET / POST とも handle を呼ぶ。POST の本文は handler.rfile から読む)
+    """
+    servers = []
+
+    def start(handle):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                status, headers, body = handle(self)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = do_GET
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,119 @@
+"""
+比較用: 高速化前の yfinace.py の戦略関数 (pandas の rolling / groupby をそのまま使う実装)
+新しい実装のシグナルがこれと完全に一致することをテストで確かめる
+"""
+import numpy as np
+import pandas as pd
+
+
+def breakout_strategy(df, n=20):
+    """
+    ブレイクアウト戦略
+    過去n期間の高値を上抜け → Breakout_Buy=1
+    過去n期間の安値を下抜け → Breakout_Sell=1
+    """
+    df = df.copy()
+    df['Highest'] = df['High'].rolling(n).max().shift(1)
+    df['Lowest']  = df['Low'].rolling(n).min().shift(1)
+
+    # alignで行を厳密に合わせてから演算
+    close_aligned, high_aligned = df['Close'].align(df['Highest'], axis=0, copy=False)
+    df['Breakout_Buy'] = np.where(close_aligned > high_aligned, 1, 0)
+
+    close_aligned2, low_aligned = df['Close'].align(df['Lowest'], axis=0, copy=False)
+    df['Breakout_Sell'] = np.where(close_aligned2 < low_aligned, 1, 0)
+
+    return df
+
+
+def moving_average_crossover_strategy(df, short_window=5, long_window=25):
+    """
+    移動平均線のゴールデンクロス/デッドクロス戦略
+    短期MAが長期MAを上抜け → MA_Buy=1
+    短期MAが長期MAを下抜け → MA_Sell=1
+    """
+    df = df.copy()
+    df['MA_short'] = df['Close'].rolling(short_window).mean()
+    df['MA_long']  = df['Close'].rolling(long_window).mean()
+
+    # クロス判定用に前日値を用意
+    df['prev_short'] = df['MA_short'].shift(1)
+    df['prev_long']  = df['MA_long'].shift(1)
+
+    df['MA_Buy'] = 0
+    df['MA_Sell'] = 0
+
+    buy_cond = (df['prev_short'] <= df['prev_long']) & (df['MA_short'] > df['MA_long'])
+    sell_cond = (df['prev_short'] >= df['prev_long']) & (df['MA_short'] < df['MA_long'])
+
+    df.loc[buy_cond, 'MA_Buy'] = 1
+    df.loc[sell_cond, 'MA_Sell'] = 1
+
+    df.drop(['prev_short','prev_long'], axis=1, inplace=True)
+    return df
+
+
+def opening_range_break_strategy(df, opening_minutes=30):
+    """
+    オープニングレンジ・ブレイク戦略 (intraday用)
+    日ごとに、最初の X分間の高値/安値を超えたら OR_Buy/OR_Sell
+    """
+    df = df.copy()
+    # Datetime 列がなければ作成
+    if 'Datetime' not in df.columns:
+        df['Datetime'] = df.index
+
+    df['Date'] = df['Datetime'].dt.date
+    df['Time'] = df['Datetime'].dt.time
+
+    def calc_or(sub_df):
+        if len(sub_df) == 0:
+            return pd.Series([np.nan, np.nan], index=['OR_High','OR_Low'])
+
+        times = sub_df['Datetime'].sort_values()
+        start_dt = times.iloc[0]
+        end_dt = start_dt + pd.Timedelta(minutes=opening_minutes)
+        mask = (sub_df['Datetime'] >= start_dt) & (sub_df['Datetime'] < end_dt)
+        sub_open = sub_df[mask]
+        if len(sub_open) == 0:
+            return pd.Series([np.nan, np.nan], index=['OR_High','OR_Low'])
+        return pd.Series([
+            sub_open['High'].max(),
+            sub_open['Low'].min()
+        ], index=['OR_High','OR_Low'])
+
+    or_df = df.groupby('Date').apply(calc_or).reset_index()
+    # -> or_df: [Date, OR_High, OR_Low]
+
+    df_reset = df.reset_index(drop=False)
+    df_merged = pd.merge(df_reset, or_df, on='Date', how='left')
+
+    df_merged.set_index('Datetime', inplace=True)
+    df_merged.sort_index(inplace=True)
+
+    # alignして演算
+    close_aligned, high_aligned = df_merged['Close'].align(df_merged['OR_High'], axis=0, copy=False)
+    df_merged['OR_Buy'] = np.where(close_aligned > high_aligned, 1, 0)
+
+    close_aligned2, low_aligned = df_merged['Close'].align(df_merged['OR_Low'], axis=0, copy=False)
+    df_merged['OR_Sell'] = np.where(close_aligned2 < low_aligned, 1, 0)
+
+    return df_merged
+
+
+def combine_signals(df):
+    """
+    3つの戦略（ブレイクアウト, オープニングレンジ, MAクロス）シグナルを融合
+    OR条件で Synergy_Buy, Synergy_Sell を出す
+    """
+    df = df.copy()
+    buy_cols  = ['Breakout_Buy','MA_Buy','OR_Buy']
+    sell_cols = ['Breakout_Sell','MA_Sell','OR_Sell']
+
+    for col in buy_cols + sell_cols:
+        if col not in df.columns:
+            df[col] = 0
+
+    df['Synergy_Buy'] = np.where(df[buy_cols].sum(axis=1) > 0, 1, 0)
+    df['Synergy_Sell'] = np.where(df[sell_cols].sum(axis=1) > 0, 1, 0)
+    return df
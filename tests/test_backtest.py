@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from backtest import _holding_steps, _trade_returns, backtest_arrays, positions_from_signals
+
+COST = 0.0005 + 0.0005  # 既定の fee + slippage
+
+
+def prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = close * np.exp(rng.normal(0, 0.005, n))
+    return open_, close
+
+
+def test_positions_from_signals():
+    buy = [1, 0, 0, 1, 1, 0]
+    sell = [0, 0, 1, 1, 0, 1]
+    np.testing.assert_array_equal(positions_from_signals(buy, sell), [1, 1, 0, 0, 1, 0])
+    np.testing.assert_array_equal(positions_from_signals(buy, sell, allow_short=True), [1, 1, -1, -1, 1, -1])
+
+
+def test_next_open_trade_compounds_overnight_and_intraday():
+    open_ = np.array([10.0, 11.0, 12.0, 13.0, 14.0])
+    close = np.array([10.5, 11.5, 12.5, 13.5, 14.5])
+    # バー0で買い → バー1の始値で建て、バー2で売り → バー3の始値で手仕舞い
+    stats, detail = backtest_arrays(close, [1, 0, 0, 0, 0], [0, 0, 1, 0, 0], open_=open_, fill='next_open')
+    expected = open_[3] / open_[1] * (1 - COST) ** 2 - 1
+    assert stats['trades'] == 1
+    assert stats['total_return'] == pytest.approx(expected)
+    held, moves, _ = _holding_steps(detail['position'], close, open_, 'next_open')
+    assert _trade_returns(held, moves, COST)[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('fill', ['close', 'next_open'])
+def test_trade_returns_compound_to_equity(fill):
+    # 全トレードが期間内に手仕舞えば、トレードごとのリターンの積は資産曲線と一致する
+    n = 500
+    open_, close = prices(n)
+    rng = np.random.default_rng(1)
+    buy = rng.random(n) < 0.05
+    sell = rng.random(n) < 0.05
+    buy[-2:] = False
+    sell[-1 if fill == 'close' else -2] = True
+    stats, detail = backtest_arrays(close, buy, sell, open_=open_, fill=fill)
+    held, moves, _ = _holding_steps(detail['position'], close, open_, fill)
+    closing = detail['position'][-1] if fill == 'close' else None
+    trade_returns = _trade_returns(held, moves, COST, closing)
+    assert len(trade_returns) == stats['trades'] > 5
+    assert np.prod(1 + trade_returns) - 1 == pytest.approx(stats['total_return'])
+
+
+def test_exit_on_last_bar_is_charged_per_trade():
+    close = np.array([100.0, 110.0, 121.0])
+    stats, _ = backtest_arrays(close, [1, 0, 0], [0, 0, 1], fill='close')
+    expected = 121.0 / 100.0 * (1 - COST) ** 2 - 1
+    assert stats['total_return'] == pytest.approx(expected)
+    assert stats['trades'] == 1 and stats['win_rate'] == 1.0
+
+    held, moves, _ = _holding_steps(np.array([1.0, 1.0, 0.0]), close)
+    assert _trade_returns(held, moves, COST, closing=0.0)[0] == pytest.approx(expected)
+    # 最後まで持ち続けたトレードは手仕舞いのコストを引かない
+    held, moves, _ = _holding_steps(np.array([1.0, 1.0, 1.0]), close)
+    assert _trade_returns(held, moves, COST, closing=1.0)[0] == pytest.approx(121.0 / 100.0 * (1 - COST) - 1)
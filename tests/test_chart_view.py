@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from chart_view import CandleChart
+
+
+def bars(n):
+    close = 100 + np.arange(n, dtype=np.float64)
+    index = pd.date_range('2024-01-04', periods=n, freq='1D')
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 10.0},
+                        index=index)
+
+
+def test_empty_data_clears_previous_artists():
+    chart = CandleChart(max_bars=50)
+    df = bars(100)
+    chart.set_data(df, lines={'MA': (df['Close'], 'red')}, buy=np.ones(100), sell=np.ones(100))
+    assert len(chart.bodies.get_paths()) == 50
+    assert len(chart.lines['MA'][0].get_xdata()) == 50
+
+    empty = bars(0)
+    chart.set_data(empty, lines={'MA': (empty['Close'], 'red')})
+    assert len(chart.bodies.get_paths()) == 0
+    assert len(chart.wicks.get_segments()) == 0
+    assert len(chart.volume_bars.get_paths()) == 0
+    assert len(chart.lines['MA'][0].get_xdata()) == 0
+    assert len(chart.buy_marker.get_xdata()) == 0
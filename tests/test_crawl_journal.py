@@ -0,0 +1,65 @@
+import pytest
+
+from crawl_journal import CrawlJournal
+from hashing import file_hash
+
+URLS = [f'https://kabutan.jp/stock/finance?code={code}' for code in ('1301', '7203', '8706')]
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+    yield journal
+    journal.close()
+
+
+def row(code):
+    return {'Stock Code': code, 'Price': '1,000円', 'PDF': f'{code}.pdf'}
+
+
+def test_resume_skips_done_and_retries_failed(tmp_path, journal):
+    # 1回目: 1件目は完了、2件目は失敗、3件目は処理前に中断
+    journal.record_done(URLS[0], row('1301'))
+    journal.record_failure(URLS[1], 'timeout')
+    assert journal.counts() == {'done': 1, 'failed': 1}
+
+    # 再実行 (別の接続) では完了済みだけを飛ばす
+    resumed = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+    assert resumed.pending(URLS) == URLS[1:]
+    assert resumed.pending(URLS, refresh=True) == URLS
+
+    resumed.record_failure(URLS[1], 'timeout again')
+    resumed.record_done(URLS[2], row('8706'))
+    assert resumed.pending(URLS) == [URLS[1]]
+    failures, error = resumed.conn.execute('SELECT failures, error FROM pages WHERE url = ?', (URLS[1],)).fetchone()
+    assert (failures, error) == (2, 'timeout again')
+
+    resumed.record_done(URLS[1], row('7203'))
+    assert resumed.pending(URLS) == []
+    assert [r['Stock Code'] for r in resumed.rows(URLS)] == ['1301', '7203', '8706']
+    resumed.close()
+
+
+def test_rows_only_include_done_pages(journal):
+    journal.record_done(URLS[2], row('8706'))
+    journal.record_failure(URLS[0], 'not found')
+    assert journal.rows(URLS) == [{'Stock Code': '8706', 'Price': '1,000円', 'PDF': '8706.pdf'}]
+
+
+def test_saved_pdf_is_pending_until_page_is_done(tmp_path, journal):
+    pdf = tmp_path / '7203.pdf'
+    pdf.write_bytes(b'%PDF-1.4\n')
+    pdf_url = 'https://kabutan.jp/disclosures/pdf/20240508/140120240508512345.pdf'
+    journal.record_pdf(URLS[1], pdf_url, str(pdf))
+    # PDF を保存しただけでは完了にしない (行の記録前に落ちたら処理し直す)
+    assert journal.pending(URLS) == URLS
+    assert journal.pdf_unchanged(URLS[1], pdf_url, str(pdf))
+
+    journal.record_done(URLS[1], row('7203'))
+    assert journal.rows(URLS) == [{'Stock Code': '7203', 'Price': '1,000円', 'PDF': '7203.pdf'}]
+    assert journal.conn.execute('SELECT content_hash FROM pages').fetchone()[0] == file_hash(str(pdf))
+
+    # 別の PDF の URL や内容が変わったファイルはダウンロードし直す
+    assert not journal.pdf_unchanged(URLS[1], pdf_url.replace('512345', '512346'), str(pdf))
+    pdf.write_bytes(b'%PDF-1.4\nchanged\n')
+    assert not journal.pdf_unchanged(URLS[1], pdf_url, str(pdf))
@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+
+from download_tracker import DownloadTracker
+
+
+def write_later(path, delay, data=b'%PDF-1.4\n'):
+    def write():
+        time.sleep(delay)
+        with open(path, 'wb') as f:
+            f.write(data)
+    thread = threading.Thread(target=write)
+    thread.start()
+    return thread
+
+
+def test_returns_new_file_once_written(tmp_path):
+    (tmp_path / 'old.pdf').write_bytes(b'old')
+    with DownloadTracker(str(tmp_path), poll_interval=0.05) as tracker:
+        thread = write_later(tmp_path / 'new.pdf', 0.2)
+        started = time.monotonic()
+        path = tracker.wait(timeout=5)
+        thread.join()
+    assert path == os.path.join(str(tmp_path), 'new.pdf')
+    assert time.monotonic() - started < 3
+
+
+def test_waits_for_partial_download(tmp_path):
+    with DownloadTracker(str(tmp_path), poll_interval=0.05) as tracker:
+        partial = tmp_path / 'report.pdf.crdownload'
+        partial.write_bytes(b'%PDF')
+        (tmp_path / 'report.pdf').write_bytes(b'%PDF')
+        # 書き込み中のファイルが残っている間は完了にしない
+        assert tracker.completed() is None
+        partial.unlink()
+        assert tracker.wait(timeout=5) == os.path.join(str(tmp_path), 'report.pdf')
+
+
+def test_prefers_expected_name(tmp_path):
+    with DownloadTracker(str(tmp_path), poll_interval=0.05) as tracker:
+        (tmp_path / 'wanted.pdf').write_bytes(b'%PDF')
+        time.sleep(0.05)
+        (tmp_path / 'other.pdf').write_bytes(b'%PDF')
+        assert tracker.wait(timeout=5, expected='wanted.pdf') == os.path.join(str(tmp_path), 'wanted.pdf')
+
+
+def test_timeout_returns_none(tmp_path):
+    (tmp_path / 'old.pdf').write_bytes(b'old')
+    with DownloadTracker(str(tmp_path), poll_interval=0.05) as tracker:
+        (tmp_path / 'notes.txt').write_bytes(b'not a pdf')
+        started = time.monotonic()
+        assert tracker.wait(timeout=0.3) is None
+    assert 0.3 <= time.monotonic() - started < 2
@@ -0,0 +1,18 @@
+import numpy as np
+
+from indicators import IndicatorCache
+from test_strategy_engine import flat_bars
+
+
+def test_sma_many_matches_pandas_rolling():
+    df = flat_bars(3000, '1D', seed=2)
+    indicators = IndicatorCache.from_frame(df)
+    windows = [5, 25, 50, 75, 100]
+    for n, values in zip(windows, indicators.sma_many('Close', windows)):
+        np.testing.assert_array_equal(values, df['Close'].rolling(n).mean().to_numpy(), err_msg=str(n))
+
+
+def test_sma_is_memoized():
+    indicators = IndicatorCache.from_frame(flat_bars(100, '1D'))
+    assert indicators.sma('Close', 25) is indicators.rolling_mean('Close', 25)
+    assert indicators.sma_many('Close', [25])[0] is indicators.sma('Close', 25)
@@ -0,0 +1,70 @@
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import kabulist
+
+
+def quote_server(serve, missing=(), throttle_first=False, expired_crumb=None):
+    """
+    クォートAPIのスタブ。受け取った symbols を requests に記録する
+    missing の銘柄は結果に含めない / throttle_first なら最初の1回は 429 /
+    expired_crumb と同じ crumb には 401 を返す
+    """
+    state = {'requests': [], 'crumbs': 0}
+    lock = threading.Lock()
+
+    def handle(handler):
+        url = urlparse(handler.path)
+        query = parse_qs(url.query)
+        if url.path == '/cookie':
+            return 200, {'Set-Cookie': 'B=stub'}, b''
+        if url.path == '/crumb':
+            with lock:
+                state['crumbs'] += 1
+                return 200, {}, f"crumb{state['crumbs']}".encode()
+        symbols = query['symbols'][0].split(',')
+        with lock:
+            state['requests'].append(symbols)
+            first = len(state['requests']) == 1
+        if throttle_first and first:
+            return 429, {}, b''
+        if expired_crumb and query.get('crumb') == [expired_crumb]:
+            return 401, {}, b''
+        result = [{'symbol': s, 'longName': f'name {s}', 'regularMarketPreviousClose': 100.0}
+                  for s in symbols if s not in missing]
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'quoteResponse': {'result': result}}).encode()
+
+    return serve(handle), state
+
+
+def test_batches_backoff_and_missing_symbol(serve):
+    base, state = quote_server(serve, missing={'9984.T'}, throttle_first=True)
+    symbols = ['7203', '6758', '9984', '8306', 'AAPL']
+
+    data, errors = kabulist.fetch_quotes(symbols, batch_size=2, workers=1, base_url=base + '/v7/finance/quote',
+                                         use_crumb=False, backoff=0.01)
+
+    # 2銘柄ずつ3回 + 429 でやり直した1回
+    batches = [tuple(r) for r in state['requests']]
+    assert len(batches) == 4
+    assert sorted(set(batches)) == sorted({('7203.T', '6758.T'), ('9984.T', '8306.T'), ('AAPL',)})
+    assert batches[0] == batches[1]
+    # レスポンスに無かった銘柄はエラーになり、他は順番どおりに取れている
+    assert list(errors) == ['9984']
+    assert [row['Code'] for row in data] == symbols
+    assert data[2] == {'Code': '9984', 'Name': 'Error', 'Price': 'Error'}
+    assert data[0] == {'Code': '7203', 'Name': 'name 7203.T', 'Price': 100.0}
+
+
+def test_expired_crumb_is_refreshed_once(serve, monkeypatch):
+    base, state = quote_server(serve, expired_crumb='crumb1')
+    monkeypatch.setattr(kabulist, 'COOKIE_URL', base + '/cookie')
+    monkeypatch.setattr(kabulist, 'CRUMB_URL', base + '/crumb')
+
+    data, errors = kabulist.fetch_quotes(['7203'], base_url=base + '/v7/finance/quote', retries=0)
+
+    assert errors == {}
+    assert data[0]['Name'] == 'name 7203.T'
+    assert state['crumbs'] == 2
+    assert len(state['requests']) == 2
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from llm_queue import LLMClient, LLMError, ResponseCache, TokenBucket
+
+
+def completion(content):
+    return json.dumps({'choices': [{'message': {'role': 'assistant', 'content': content}}]}).encode()
+
+
+@pytest.fixture
+def llm_server(serve):
+    """
+    responses (ステータス, 本文) を順に返す Chat Completions のスタブ。使い切ったら 200 を返し続ける
+    受け取ったプロンプトと、同時に処理していたリクエスト数の最大を記録する
+    """
+    state = {'responses': [], 'prompts': [], 'active': 0, 'max_active': 0, 'latency': 0.0}
+    lock = threading.Lock()
+
+    def handle(handler):
+        payload = json.loads(handler.rfile.read(int(handler.headers['Content-Length'])))
+        with lock:
+            state['prompts'].append(payload['messages'][-1]['content'])
+            state['active'] += 1
+            state['max_active'] = max(state['max_active'], state['active'])
+            status, body = state['responses'].pop(0) if state['responses'] else (200, completion('ok'))
+        time.sleep(state['latency'])
+        with lock:
+            state['active'] -= 1
+        headers = {'Retry-After': '0'} if status in (429, 503) else {}
+        return status, headers, body
+
+    state['base_url'] = serve(handle) + '/v1'
+    return state
+
+
+def client_for(server, **kwargs):
+    kwargs.setdefault('rpm', 0)
+    kwargs.setdefault('tpm', 0)
+    return LLMClient(api_key='test', base_url=server['base_url'], **kwargs)
+
+
+def test_token_bucket_waits_for_refill():
+    async def run():
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        started = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 2つは貯めから、残り2つは 1/20 秒ずつ補充を待つ
+    assert 0.08 <= asyncio.run(run()) < 0.5
+    assert TokenBucket.per_minute(0) is None
+    assert TokenBucket.per_minute(120).rate == 2.0
+
+
+def test_token_bucket_caps_large_requests():
+    async def run():
+        bucket = TokenBucket(rate=1000.0, capacity=10)
+        await bucket.acquire(50)  # capacity を超える要求も貯めが満ちれば通す
+        return bucket.tokens
+
+    assert asyncio.run(run()) == pytest.approx(0.0, abs=1.0)
+
+
+def test_retries_rate_limit_and_server_errors(llm_server, monkeypatch):
+    llm_server['responses'] = [(429, b''), (503, b''), (200, b'{"choices": []}'), (200, completion('分析結果'))]
+    client = client_for(llm_server)
+    waits = []
+    backoff = client._backoff
+    monkeypatch.setattr(client, '_backoff', lambda attempt, retry_after: waits.append(
+        (attempt, retry_after, backoff(attempt, retry_after))) or 0.0)
+    assert asyncio.run(client.complete('決算短信')) == '分析結果'
+    client.close()
+    assert client.stats == {'calls': 4, 'cached': 0, 'retries': 3, 'failed': 0}
+    # Retry-After があればそれに従い、無ければ指数バックオフ
+    assert waits[:2] == [(0, 0.0, 0.0), (1, 0.0, 0.0)]
+    assert waits[2][1] is None and 2.0 <= waits[2][2] <= 4.0
+
+
+def test_gives_up_after_max_retries(llm_server):
+    llm_server['responses'] = [(503, b'busy')] * 3
+    client = client_for(llm_server, max_retries=2)
+    with pytest.raises(LLMError, match='503'):
+        asyncio.run(client.complete('決算短信'))
+    client.close()
+    assert client.stats['calls'] == 3 and client.stats['failed'] == 1
+
+
+def test_client_errors_are_not_retried(llm_server):
+    llm_server['responses'] = [(400, b'bad request')]
+    client = client_for(llm_server)
+    with pytest.raises(LLMError, match='400'):
+        asyncio.run(client.complete('決算短信'))
+    client.close()
+    assert client.stats['calls'] == 1
+
+
+def test_cache_skips_repeated_calls(llm_server, tmp_path):
+    cache = ResponseCache(str(tmp_path / 'llm_cache.sqlite'))
+    client = client_for(llm_server, cache=cache)
+
+    async def run():
+        first = await client.complete('決算短信 A', key='hash-a', prompt_version='v1')
+        again = await client.complete('決算短信 A (プロンプトの表記違い)', key='hash-a', prompt_version='v1')
+        other = await client.complete('決算短信 A', key='hash-a', prompt_version='v2')
+        return first, again, other
+
+    assert asyncio.run(run()) == ('ok', 'ok', 'ok')
+    client.close()
+    assert len(llm_server['prompts']) == 2
+    assert client.stats['cached'] == 1
+    assert cache.get('hash-a', 'v1', 'gpt-4') == 'ok'
+    cache.close()
+
+
+def test_concurrency_limit(llm_server):
+    llm_server['latency'] = 0.1
+    client = client_for(llm_server, concurrency=2)
+
+    async def run():
+        return await asyncio.gather(*(client.complete(f'決算短信 {i}') for i in range(6)))
+
+    assert asyncio.run(run()) == ['ok'] * 6
+    client.close()
+    assert llm_server['max_active'] == 2
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from market_data import OHLCV_COLUMNS, MarketDataCache, missing_ranges
+
+
+class FakeFetcher:
+    """呼び出された期間を記録し、その期間の平日の日足を返す (empty=True なら常に空)"""
+
+    def __init__(self, empty=False, error=None):
+        self.calls = []
+        self.empty = empty
+        self.error = error
+
+    def __call__(self, ticker, start, end, interval):
+        self.calls.append((start, end))
+        if self.error is not None:
+            raise self.error
+        days = pd.bdate_range(start, end - pd.Timedelta(days=1))
+        if self.empty:
+            days = days[:0]
+        return pd.DataFrame({col: 100.0 for col in OHLCV_COLUMNS}, index=days)
+
+
+def ts(text):
+    return pd.Timestamp(text)
+
+
+def test_missing_ranges():
+    covered = [(ts('2024-01-01'), ts('2024-01-10')), (ts('2024-01-15'), ts('2024-01-20'))]
+    assert missing_ranges(covered, ts('2024-01-05'), ts('2024-01-25')) == [
+        (ts('2024-01-10'), ts('2024-01-15')), (ts('2024-01-20'), ts('2024-01-25'))]
+
+
+def test_only_gaps_are_fetched(tmp_path):
+    fetcher = FakeFetcher()
+    cache = MarketDataCache(str(tmp_path), fetcher)
+    cache.get('7203.T', '2024-01-01', '2024-01-10')
+    df = cache.get('7203.T', '2024-01-01', '2024-01-20')
+    assert fetcher.calls == [(ts('2024-01-01'), ts('2024-01-10')), (ts('2024-01-10'), ts('2024-01-20'))]
+    assert list(df.index) == list(pd.bdate_range('2024-01-01', '2024-01-19'))
+
+    # 別インスタンス (ディスクから読み込み) でも取り直さない
+    again = MarketDataCache(str(tmp_path), fetcher).get('7203.T', '2024-01-03', '2024-01-15')
+    assert len(fetcher.calls) == 2
+    assert list(again.index) == list(pd.bdate_range('2024-01-03', '2024-01-12'))
+
+
+def test_empty_past_gap_is_covered(tmp_path):
+    fetcher = FakeFetcher(empty=True)
+    cache = MarketDataCache(str(tmp_path), fetcher)
+    for _ in range(3):
+        assert cache.get('7203.T', '2024-01-06', '2024-01-08').empty  # 土日
+    assert fetcher.calls == [(ts('2024-01-06'), ts('2024-01-08'))]
+
+
+def test_today_tail_is_fetched_again(tmp_path):
+    fetcher = FakeFetcher()
+    cache = MarketDataCache(str(tmp_path), fetcher)
+    today = pd.Timestamp.today().normalize()
+    start = today - pd.Timedelta(days=10)
+    cache.get('7203.T', start)
+    cache.get('7203.T', start)
+    tomorrow = today + pd.Timedelta(days=1)
+    assert fetcher.calls == [(start, tomorrow), (today, tomorrow)]
+
+
+def test_fetch_error_is_not_covered(tmp_path):
+    cache = MarketDataCache(str(tmp_path), FakeFetcher(error=ConnectionError('rate limited')))
+    with pytest.raises(ConnectionError):
+        cache.get('7203.T', '2024-01-01', '2024-01-10')
+
+    fetcher = FakeFetcher()
+    cache.fetcher = fetcher
+    assert len(cache.get('7203.T', '2024-01-01', '2024-01-10')) == 7
+    assert fetcher.calls == [(ts('2024-01-01'), ts('2024-01-10'))]
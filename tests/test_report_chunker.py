@@ -0,0 +1,67 @@
+from report_chunker import TOC_LINE, count_tokens, fit_to_budget, prepare_report, split_sections
+
+REPORT = """2024年3月期 決算短信〔日本基準〕(連結)
+売上高 1,234 5.6%
+添付資料の目次
+1. 経営成績等の概況 ………………………… 2
+2. 連結財務諸表及び主な注記 ……………… 5
+- 1 -
+1. 経営成績等の概況
+当連結会計年度におけるわが国経済は、雇用・所得環境の改善により緩やかな回復基調で推移しました。
+(2) 今後の見通し
+次期の業績は増収増益を見込んでおります。
+(3) 連結損益計算書
+売上高
+1,234
+1,300
+"""
+
+
+def section(name, priority, tokens):
+    text = '\n'.join('あ' * 9 for _ in range(tokens // 10))
+    return {'name': name, 'priority': priority, 'title': name, 'text': text, 'tokens': count_tokens(text)}
+
+
+def test_split_sections():
+    sections = split_sections(REPORT)
+    assert [s['name'] for s in sections] == ['summary', 'toc', 'results', 'outlook', 'income_statement']
+    assert sections[1]['lines'][0] == '添付資料の目次'
+    assert all(TOC_LINE.search(line) for line in sections[1]['lines'][1:])
+    assert sections[2]['lines'][1].startswith('当連結会計年度')
+
+
+def test_toc_ends_at_body_text():
+    # 見出しとして認識できない本文が続いても目次に含めず、目次の前のセクションの続きにする
+    text = ("日本産業の中期見通し\n目次\n1. 産業総合\nP2\n2. 化学\nP9\n"
+            "変化の続く外部環境をフォワードルックに捉え、国内の課題解決を足掛かりに国際競争力の向上を図る\n本文の続き\n")
+    sections = split_sections(text)
+    assert [s['name'] for s in sections] == ['outlook', 'toc', 'outlook']
+    assert sections[1]['lines'] == ['目次', '1. 産業総合', 'P2', '2. 化学', 'P9']
+    assert sections[2]['lines'][-1] == '本文の続き'
+
+
+def test_fit_to_budget_keeps_order_and_drops_low_priority():
+    sections = [section('summary', 0, 100), section('notes', 9, 300), section('results', 1, 300)]
+    fitted = fit_to_budget(sections, sections[0]['tokens'] + sections[2]['tokens'])
+    assert [s['name'] for s in fitted] == ['summary', 'results']
+    assert fitted[1] is sections[2]
+
+
+def test_fit_to_budget_truncates_oversized_section():
+    sections = [section('summary', 0, 100), section('results', 1, 5000), section('segment', 7, 100)]
+    fitted = fit_to_budget(sections, 1000)
+    assert [s['name'] for s in fitted][:2] == ['summary', 'results']
+    results = fitted[1]
+    assert results['truncated'] and 0 < results['tokens'] <= 1000 - sections[0]['tokens']
+    assert sections[1]['text'].startswith(results['text'])
+    assert sum(s['tokens'] for s in fitted) <= 1000
+
+
+def test_prepare_report_keeps_head_of_large_section():
+    body = '\n'.join(f'当期の売上高は前年同期比で{i}%増加しました。' for i in range(2000))
+    text = f"決算短信\n1. 経営成績等の概況\n{body}\n(2) セグメント情報\n自動車事業は好調でした。\n"
+    report = prepare_report(text, max_tokens=3000)
+    assert [s['name'] for s in report['sections']][:2] == ['summary', 'results']
+    assert report['truncated'][0] == 'results'
+    assert 'results' not in report['dropped']
+    assert 0 < report['tokens'] <= 3000
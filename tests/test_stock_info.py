@@ -0,0 +1,191 @@
+import os
+
+import pytest
+
+import stock_info
+from crawl_journal import CrawlJournal
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PDF_BODY = b'%PDF-1.4\n% stub\n'
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture
+def kabutan(serve):
+    """kabutan の決算ページ・開示ページ・PDF を返すスタブ (ページ内の絶対 URL はスタブに向ける)"""
+    def handle(handler):
+        path = handler.path
+        if path.startswith('/stock/finance'):
+            body = fixture('kabutan_finance_8706.html')
+        elif path.startswith('/disclosures/pdf/') and path.endswith('.pdf'):
+            return 200, {'Content-Type': 'application/pdf'}, PDF_BODY
+        elif path.startswith('/disclosures/pdf/'):
+            body = fixture('kabutan_disclosure_8706.html')
+        else:
+            return 404, {}, b''
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, body.replace(b'https://kabutan.jp', base.encode())
+
+    base = serve(handle)
+    return base
+
+
+def test_parse_recorded_pages():
+    url = 'https://kabutan.jp/stock/finance?code=8706'
+    code, price, pdf_page = stock_info.parse_stock_page(fixture('kabutan_finance_8706.html').decode('utf-8'), url)
+    assert (code, price) == ('8706', '1,450円')
+    # 一番下 (最新) の決算の開示ページ
+    assert pdf_page == 'https://kabutan.jp/disclosures/pdf/20241029/140120241028587654/'
+
+    pdf_url = stock_info.parse_pdf_page(fixture('kabutan_disclosure_8706.html').decode('utf-8'), pdf_page)
+    assert pdf_url == 'https://kabutan.jp/disclosures/pdf/20241029/140120241028587654.pdf'
+
+
+def test_parse_page_without_price_needs_browser():
+    with pytest.raises(stock_info.NeedsBrowser):
+        stock_info.parse_stock_page('<html><body><div id="stockinfo_i1"></div></body></html>', 'https://kabutan.jp/')
+
+
+def test_fetch_stock_info_http(kabutan, tmp_path):
+    journal = CrawlJournal(str(tmp_path / 'journal.sqlite'))
+    url = kabutan + '/stock/finance?code=8706'
+
+    row = stock_info.fetch_stock_info_http(url, str(tmp_path), journal)
+
+    assert row == {'Stock Code': '8706', 'Price': '1,450円', 'PDF': '8706.pdf'}
+    assert (tmp_path / '8706.pdf').read_bytes() == PDF_BODY
+    pdf_url = kabutan + '/disclosures/pdf/20241029/140120241028587654.pdf'
+    assert journal.pdf_unchanged(url, pdf_url, str(tmp_path / '8706.pdf'))
+    journal.close()
+
+
+# ======================
+# ブラウザのワーカープール
+# ======================
+class FakeElement:
+    def __init__(self, driver, tag):
+        self.driver = driver
+        self.tag = tag
+
+    @property
+    def text(self):
+        return self.tag.get_text(strip=True)
+
+    def get_attribute(self, name):
+        value = self.tag.get(name)
+        return self.driver.absolute(value) if name == 'href' and value else value
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        href = self.get_attribute('href')
+        if href.endswith('.pdf'):  # ダウンロード先フォルダに保存
+            name = href.rsplit('/', 1)[-1]
+            with open(os.path.join(self.driver.download_dir, name), 'wb') as f:
+                f.write(self.driver.session.get(href, timeout=10).content)
+        else:  # target="_blank" のリンクは新しいウィンドウで開く
+            self.driver.windows.append(None)
+            self.driver.handle = len(self.driver.windows) - 1
+            self.driver.get(href)
+            self.driver.handle = 0
+
+
+class FakeDriver:
+    """requests + BeautifulSoup で HTML を読む、fetch_stock_info が使う分だけの WebDriver"""
+
+    def __init__(self, download_dir, headless=True):
+        import requests
+
+        self.download_dir = download_dir
+        self.session = requests.Session()
+        self.windows = [None]  # ウィンドウごとの (URL, soup)
+        self.handle = 0
+        self.switch_to = self
+        self.quitted = False
+
+    def absolute(self, href):
+        from urllib.parse import urljoin
+
+        return urljoin(self.windows[self.handle][0], href)
+
+    def get(self, url):
+        from bs4 import BeautifulSoup
+
+        response = self.session.get(url, timeout=10)
+        self.windows[self.handle] = (response.url, BeautifulSoup(response.text, 'html.parser'))
+
+    @property
+    def current_window_handle(self):
+        return self.handle
+
+    @property
+    def window_handles(self):
+        return [i for i, window in enumerate(self.windows) if window is not False]
+
+    def window(self, handle):
+        self.handle = handle
+
+    def close(self):
+        self.windows[self.handle] = False
+
+    def find_elements(self, by, selector):
+        return [FakeElement(self, tag) for tag in self.windows[self.handle][1].select(selector)]
+
+    def find_element(self, by, selector):
+        from selenium.common.exceptions import NoSuchElementException
+
+        elements = self.find_elements(by, selector)
+        if not elements:
+            raise NoSuchElementException(selector)
+        return elements[0]
+
+    def quit(self):
+        self.quitted = True
+        self.session.close()
+
+
+def test_browser_pool_returns_results_in_order(serve, tmp_path, monkeypatch):
+    import time
+
+    monkeypatch.setattr(stock_info, 'log_file', str(tmp_path / 'error_log.txt'))
+    codes = ['8706', '8609', '3003', '7203', '6758']
+
+    def handle(handler):
+        path = handler.path
+        code = path.rsplit('=', 1)[-1] if '=' in path else path.rstrip('/').split('/')[-1].split('.')[0]
+        if path.startswith('/stock/finance'):
+            if code == codes[0]:
+                time.sleep(0.3)  # 先頭の URL を一番遅く終わらせる
+            body = fixture('kabutan_finance_8706.html').replace(b'8706', code.encode())
+            body = body.replace(b'/140120241028587654/', f'/{code}/'.encode())
+        elif path.endswith('.pdf'):
+            return 200, {'Content-Type': 'application/pdf'}, PDF_BODY + code.encode()
+        else:
+            body = fixture('kabutan_disclosure_8706.html').replace(b'https://kabutan.jp', base.encode())
+            body = body.replace(b'140120241028587654.pdf', f'{code}.pdf'.encode())
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, body
+
+    base = serve(handle)
+    drivers = []
+
+    def browser_factory(download_dir, headless):
+        drivers.append(FakeDriver(download_dir, headless))
+        return drivers[-1]
+
+    links = [f'{base}/stock/finance?code={code}' for code in codes]
+    results = stock_info.crawl_browser(links, workers=2, pdf_dir=str(tmp_path), browser_factory=browser_factory)
+
+    assert [row['Stock Code'] for row in results] == codes
+    assert [row['Price'] for row in results] == ['1,450円'] * len(codes)
+    for code in codes:
+        assert (tmp_path / f'{code}.pdf').read_bytes() == PDF_BODY + code.encode()
+    # ワーカーごとにブラウザ1つを使い回し、終わったら閉じる
+    assert len(drivers) == 2 and all(driver.quitted for driver in drivers)
+    assert not (tmp_path / '_downloads').exists()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import strategy_engine
+from indicators import IndicatorCache
+from legacy_strategies import moving_average_crossover_strategy
+
+
+def flat_bars(n, freq, seed=0):
+    """0.1 刻みの終値に横ばいの区間を多く混ぜたバー (移動平均が並びやすく、クロス判定の差が出やすい)"""
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([-0.3, -0.1, 0.0, 0.1, 0.3], n)
+    steps[rng.random(n) < 0.6] = 0.0
+    close = np.round(1234.5 + np.cumsum(steps), 1)
+    index = pd.date_range('2024-01-04 09:00', periods=n, freq=freq, name='Datetime')
+    return pd.DataFrame({'Open': close, 'High': close + 0.1, 'Low': close - 0.1,
+                         'Close': close, 'Volume': 100.0}, index=index)
+
+
+@pytest.mark.parametrize('freq', ['1D', '1min'])
+@pytest.mark.parametrize('windows', [(5, 25), (3, 10)])
+def test_ma_cross_matches_legacy(freq, windows):
+    df = flat_bars(3000, freq)
+    short_window, long_window = windows
+    expected = moving_average_crossover_strategy(df, short_window, long_window)
+
+    outputs = strategy_engine.run_strategies(
+        df, ['ma_cross'], {'ma_cross': {'short_window': short_window, 'long_window': long_window}})
+    for col in ('MA_short', 'MA_long', 'MA_Buy', 'MA_Sell'):
+        np.testing.assert_array_equal(outputs[col], expected[col].to_numpy(dtype=np.float64), err_msg=col)
+
+
+def test_sma_matches_pandas_rolling():
+    df = flat_bars(2000, '1min', seed=1)
+    df.iloc[100:130, df.columns.get_loc('Close')] = np.nan
+    indicators = IndicatorCache.from_frame(df)
+    for n in (1, 5, 25, 75):
+        np.testing.assert_array_equal(indicators.sma('Close', n), df['Close'].rolling(n).mean().to_numpy())
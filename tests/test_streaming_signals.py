@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from legacy_strategies import (breakout_strategy, combine_signals, moving_average_crossover_strategy,
+                               opening_range_break_strategy)
+from strategies import apply_strategies
+from streaming_signals import RollingMean, StreamingSignals
+
+SIGNALS = ['Breakout_Buy', 'Breakout_Sell', 'MA_Buy', 'MA_Sell', 'OR_Buy', 'OR_Sell',
+           'Synergy_Buy', 'Synergy_Sell']
+
+
+def session_bars(days, seed=0):
+    """1分足 (9:00〜11:30, 12:30〜15:00) の 0.1 刻みの終値。横ばいの区間を多く混ぜる"""
+    rng = np.random.default_rng(seed)
+    index = []
+    for day in pd.bdate_range('2024-01-04', periods=days):
+        index.extend(pd.date_range(day + pd.Timedelta('9h'), day + pd.Timedelta('11h29min'), freq='1min'))
+        index.extend(pd.date_range(day + pd.Timedelta('12h30min'), day + pd.Timedelta('14h59min'), freq='1min'))
+    n = len(index)
+    steps = rng.choice([-0.3, -0.1, 0.0, 0.1, 0.3], n)
+    steps[rng.random(n) < 0.6] = 0.0
+    close = np.round(1234.5 + np.cumsum(steps), 1)
+    spread = np.round(rng.choice([0.0, 0.1, 0.2], n), 1)
+    return pd.DataFrame({'Open': close, 'High': close + spread, 'Low': close - spread,
+                         'Close': close, 'Volume': 100.0}, index=pd.DatetimeIndex(index))
+
+
+def legacy_pipeline(df):
+    """高速化前の yfinace.py と同じ順番で戦略を重ねる"""
+    out = breakout_strategy(df)
+    out = moving_average_crossover_strategy(out)
+    out = opening_range_break_strategy(out)
+    return combine_signals(out)
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return session_bars(5)
+
+
+@pytest.fixture(scope='module')
+def expected(bars):
+    with pytest.warns(Warning):
+        return legacy_pipeline(bars)
+
+
+@pytest.mark.parametrize('n', [1, 2, 5, 25, 75])
+def test_rolling_mean_matches_pandas(n):
+    values = session_bars(2, seed=3)['Close'].to_numpy(copy=True)
+    values[50:60] = np.nan
+    rolling = RollingMean(n)
+    streamed = []
+    for value in values:
+        rolling.push(value)
+        streamed.append(rolling.value())
+    np.testing.assert_array_equal(streamed, pd.Series(values).rolling(n).mean().to_numpy())
+
+
+def test_streaming_signals_match_legacy(bars, expected):
+    streamed = StreamingSignals().warm_up(bars)
+    for col in SIGNALS + ['MA_short', 'MA_long', 'Highest', 'Lowest']:
+        np.testing.assert_array_equal(streamed[col].to_numpy(dtype=np.float64),
+                                      expected[col].to_numpy(dtype=np.float64), err_msg=col)
+
+
+def test_batch_signals_match_legacy(bars, expected):
+    batch = apply_strategies(bars.copy())
+    for col in SIGNALS + ['MA_short', 'MA_long', 'Highest', 'Lowest', 'OR_High', 'OR_Low']:
+        np.testing.assert_array_equal(batch[col].to_numpy(dtype=np.float64),
+                                      expected[col].to_numpy(dtype=np.float64), err_msg=col)
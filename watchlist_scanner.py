@@ -0,0 +1,179 @@
+"""
+ウォッチリスト (kabulist.txt) 全銘柄のシグナルスキャナー (GUIなしで実行)
+銘柄ごとに「データ取得 → 3戦略 + シグナル合成」をワーカープールで並行実行し、
+最新バーで Synergy_Buy / Synergy_Sell が出た銘柄だけを1つの表にまとめる。
+制限時間 (--budget) になった時点で終わっている銘柄だけで結果をまとめ、工程ごとの所要時間を表示する。
+実行中のワーカーも工程の区切り (取得の前後・戦略ごと) で締め切りを確認して打ち切る
+(実行中の1工程 (1回の取得など) が終わるまでは止まらない)。
+取得待ちが中心ならスレッド (--pool thread)、キャッシュ済みで計算が中心ならプロセス (--pool process)。
+
+使い方:
+    python watchlist_scanner.py --interval 1d --days 180 --workers 16 --budget 300 --output scan_result.csv
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from kabulist import to_ticker
+from market_data import MarketDataCache, OHLCV_COLUMNS
+from strategies import (breakout_strategy, moving_average_crossover_strategy,
+                        opening_range_break_strategy, combine_signals)
+from strategy_engine import STRATEGIES
+
+SIGNAL_COLUMNS = [col for strategy in STRATEGIES.values() for col in (strategy.buy_column, strategy.sell_column)]
+
+
+class ScanTimeout(Exception):
+    """締め切りを過ぎたため途中で打ち切った"""
+
+
+def _check_deadline(deadline):
+    # 締め切りは time.time() (プロセスプールでもワーカー間で同じ時計を使う)
+    if deadline is not None and time.time() >= deadline:
+        raise ScanTimeout()
+
+
+def load_watchlist(path='kabulist.txt'):
+    with open(path, 'r') as file:
+        return [line.strip() for line in file.read().splitlines() if line.strip()]
+
+
+def scan_symbol(symbol, cache, start, end, interval, deadline=None):
+    """
+    1銘柄分の取得とシグナル計算
+    deadline (time.time() の値) を過ぎていたら工程の区切りで ScanTimeout を投げる
+    戻り値: (最新バーの結果 dict または None, 工程ごとの秒数 dict)
+    """
+    timings = {}
+    _check_deadline(deadline)
+    t0 = time.perf_counter()
+    df = cache.get(to_ticker(symbol), start, end, interval)
+    t1 = time.perf_counter()
+    timings['download'] = t1 - t0
+    if df.empty:
+        timings['strategy'] = 0.0
+        return None, timings
+
+    df = df[OHLCV_COLUMNS].sort_index()
+    for step in (breakout_strategy, moving_average_crossover_strategy, opening_range_break_strategy,
+                 combine_signals):
+        _check_deadline(deadline)
+        step(df, inplace=True)
+    timings['strategy'] = time.perf_counter() - t1
+
+    last = df.iloc[-1]
+    if not (last['Synergy_Buy'] or last['Synergy_Sell']):
+        return None, timings
+    return {
+        'Code': symbol,
+        'Datetime': df.index[-1],
+        'Close': last['Close'],
+        'Synergy_Buy': int(last['Synergy_Buy']),
+        'Synergy_Sell': int(last['Synergy_Sell']),
+        'Signals': ', '.join(col for col in SIGNAL_COLUMNS if last[col]),
+    }, timings
+
+
+# プロセスごとに1つ作るキャッシュ (ロックを含むのでプロセス間では渡せない)
+_process_cache = None
+
+
+def _scan_in_process(symbol, cache_dir, start, end, interval, deadline):
+    global _process_cache
+    if _process_cache is None:
+        _process_cache = MarketDataCache(cache_dir)
+    return scan_symbol(symbol, _process_cache, start, end, interval, deadline)
+
+
+def scan_watchlist(symbols, start, end=None, interval='1d', workers=16, budget=None, cache=None, pool='thread'):
+    """
+    全銘柄をスキャンする
+    pool='process' のときは各プロセスが cache と同じディレクトリのキャッシュを開く
+    budget (秒) を指定すると、その時点で終わった銘柄だけの結果を返す (残りは timed_out)
+    戻り値: (シグナルが出た銘柄の DataFrame, 集計 dict)
+    """
+    cache = cache or MarketDataCache()
+    started = time.perf_counter()
+    deadline = time.time() + budget if budget is not None else None
+    rows, errors, timed_out, scanned = [], {}, [], 0
+    totals = {'download': 0.0, 'strategy': 0.0}
+
+    if pool == 'process':
+        executor = ProcessPoolExecutor(max_workers=workers)
+        futures = {executor.submit(_scan_in_process, symbol, cache.cache_dir, start, end, interval, deadline): symbol
+                   for symbol in symbols}
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {executor.submit(scan_symbol, symbol, cache, start, end, interval, deadline): symbol
+                   for symbol in symbols}
+    done, not_done = wait(futures, timeout=budget)
+    # 制限時間切れ: 未着手の銘柄は取り消し、実行中のものは締め切りを見て次の工程の前で止まる
+    for future in not_done:
+        future.cancel()
+    executor.shutdown(wait=False, cancel_futures=True)
+    timed_out.extend(futures[f] for f in not_done)
+
+    for future in done:
+        symbol = futures[future]
+        try:
+            row, timings = future.result()
+        except ScanTimeout:
+            timed_out.append(symbol)
+            continue
+        except Exception as e:
+            errors[symbol] = str(e)
+            continue
+        scanned += 1
+        for stage, seconds in timings.items():
+            totals[stage] += seconds
+        if row:
+            rows.append(row)
+
+    summary = {
+        'symbols': len(symbols),
+        'scanned': scanned,
+        'errors': errors,
+        'timed_out': sorted(timed_out),
+        'fired': len(rows),
+        'wall': time.perf_counter() - started,
+        # 各工程の合計 (ワーカーの時間を足したもの)
+        'download_total': totals['download'],
+        'strategy_total': totals['strategy'],
+    }
+    result = pd.DataFrame(rows, columns=['Code', 'Datetime', 'Close', 'Synergy_Buy', 'Synergy_Sell', 'Signals'])
+    return result.sort_values(['Synergy_Buy', 'Code'], ascending=[False, True]), summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ウォッチリスト全銘柄の最新シグナルをスキャン")
+    parser.add_argument('--watchlist', default='kabulist.txt')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--days', type=int, default=180, help="取得する過去日数")
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--budget', type=float, default=None, help="全体の制限時間 (秒)")
+    parser.add_argument('--output', default='scan_result.csv')
+    args = parser.parse_args()
+
+    symbols = load_watchlist(args.watchlist)
+    start = pd.Timestamp.today().normalize() - pd.Timedelta(days=args.days)
+    result, summary = scan_watchlist(symbols, start, interval=args.interval,
+                                     workers=args.workers, budget=args.budget, pool=args.pool)
+    result.to_csv(args.output, index=False)
+
+    print(result.to_string(index=False))
+    print(f"\n{summary['symbols']} 銘柄中 {summary['scanned']} 銘柄をスキャン、"
+          f"シグナル {summary['fired']} 件 (エラー {len(summary['errors'])} 件, 時間切れ {len(summary['timed_out'])} 件)")
+    scanned = max(summary['scanned'], 1)
+    print(f"経過時間 {summary['wall']:.1f}s  "
+          f"取得 合計 {summary['download_total']:.1f}s (平均 {summary['download_total'] / scanned * 1000:.0f} ms)  "
+          f"戦略計算 合計 {summary['strategy_total']:.1f}s (平均 {summary['strategy_total'] / scanned * 1000:.1f} ms)")
+    for symbol, message in summary['errors'].items():
+        print(f"エラー: {symbol}: {message}")
+    print(f"結果は {args.output} に保存されました。")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,145 +1,36 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import yfinance as yf
-import pandas as pd
-import numpy as np
 import datetime
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import matplotlib
 matplotlib.use("Agg")  # GUI上でmatplotlibを埋め込むためのバックエンド設定
-import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import mplfinance as mpf  # ローソク足描画ライブラリ
 
-
-# ======================
-# 売買戦略の関数群
-# ======================
-def breakout_strategy(df, n=20):
-    """
-    ブレイクアウト戦略
-    過去n期間の高値を上抜け → Breakout_Buy=1
-    過去n期間の安値を下抜け → Breakout_Sell=1
-    """
-    df = df.copy()
-    df['Highest'] = df['High'].rolling(n).max().shift(1)
-    df['Lowest']  = df['Low'].rolling(n).min().shift(1)
-
-    # alignで行を厳密に合わせてから演算
-    close_aligned, high_aligned = df['Close'].align(df['Highest'], axis=0, copy=False)
-    df['Breakout_Buy'] = np.where(close_aligned > high_aligned, 1, 0)
-
-    close_aligned2, low_aligned = df['Close'].align(df['Lowest'], axis=0, copy=False)
-    df['Breakout_Sell'] = np.where(close_aligned2 < low_aligned, 1, 0)
-
-    return df
-
-
-def moving_average_crossover_strategy(df, short_window=5, long_window=25):
-    """
-    移動平均線のゴールデンクロス/デッドクロス戦略
-    短期MAが長期MAを上抜け → MA_Buy=1
-    短期MAが長期MAを下抜け → MA_Sell=1
-    """
-    df = df.copy()
-    df['MA_short'] = df['Close'].rolling(short_window).mean()
-    df['MA_long']  = df['Close'].rolling(long_window).mean()
-
-    # クロス判定用に前日値を用意
-    df['prev_short'] = df['MA_short'].shift(1)
-    df['prev_long']  = df['MA_long'].shift(1)
-
-    df['MA_Buy'] = 0
-    df['MA_Sell'] = 0
-
-    buy_cond = (df['prev_short'] <= df['prev_long']) & (df['MA_short'] > df['MA_long'])
-    sell_cond = (df['prev_short'] >= df['prev_long']) & (df['MA_short'] < df['MA_long'])
-
-    df.loc[buy_cond, 'MA_Buy'] = 1
-    df.loc[sell_cond, 'MA_Sell'] = 1
-
-    df.drop(['prev_short','prev_long'], axis=1, inplace=True)
-    return df
-
-
-def opening_range_break_strategy(df, opening_minutes=30):
-    """
-    オープニングレンジ・ブレイク戦略 (intraday用)
-    日ごとに、最初の X分間の高値/安値を超えたら OR_Buy/OR_Sell
-    """
-    df = df.copy()
-    # Datetime 列がなければ作成
-    if 'Datetime' not in df.columns:
-        df['Datetime'] = df.index
-
-    df['Date'] = df['Datetime'].dt.date
-    df['Time'] = df['Datetime'].dt.time
-
-    def calc_or(sub_df):
-        if len(sub_df) == 0:
-            return pd.Series([np.nan, np.nan], index=['OR_High','OR_Low'])
-
-        times = sub_df['Datetime'].sort_values()
-        start_dt = times.iloc[0]
-        end_dt = start_dt + pd.Timedelta(minutes=opening_minutes)
-        mask = (sub_df['Datetime'] >= start_dt) & (sub_df['Datetime'] < end_dt)
-        sub_open = sub_df[mask]
-        if len(sub_open) == 0:
-            return pd.Series([np.nan, np.nan], index=['OR_High','OR_Low'])
-        return pd.Series([
-            sub_open['High'].max(),
-            sub_open['Low'].min()
-        ], index=['OR_High','OR_Low'])
-
-    or_df = df.groupby('Date').apply(calc_or).reset_index()
-    # -> or_df: [Date, OR_High, OR_Low]
-
-    df_reset = df.reset_index(drop=False)
-    df_merged = pd.merge(df_reset, or_df, on='Date', how='left')
-
-    df_merged.set_index('Datetime', inplace=True)
-    df_merged.sort_index(inplace=True)
-
-    # alignして演算
-    close_aligned, high_aligned = df_merged['Close'].align(df_merged['OR_High'], axis=0, copy=False)
-    df_merged['OR_Buy'] = np.where(close_aligned > high_aligned, 1, 0)
-
-    close_aligned2, low_aligned = df_merged['Close'].align(df_merged['OR_Low'], axis=0, copy=False)
-    df_merged['OR_Sell'] = np.where(close_aligned2 < low_aligned, 1, 0)
-
-    return df_merged
-
-
-def combine_signals(df):
-    """
-    3つの戦略（ブレイクアウト, オープニングレンジ, MAクロス）シグナルを融合
-    OR条件で Synergy_Buy, Synergy_Sell を出す
-    """
-    df = df.copy()
-    buy_cols  = ['Breakout_Buy','MA_Buy','OR_Buy']
-    sell_cols = ['Breakout_Sell','MA_Sell','OR_Sell']
-
-    for col in buy_cols + sell_cols:
-        if col not in df.columns:
-            df[col] = 0
-
-    df['Synergy_Buy'] = np.where(df[buy_cols].sum(axis=1) > 0, 1, 0)
-    df['Synergy_Sell'] = np.where(df[sell_cols].sum(axis=1) > 0, 1, 0)
-    return df
+from backtest import backtest, format_stats
+from chart_view import CandleChart
+from indicators import IndicatorCache
+from market_data import MarketDataCache
+from strategies import apply_strategies
+from strategy_engine import STRATEGIES
 
 
 # ======================
 # GUIクラス
 # ======================
 class StrategyGUI:
+    POLL_MS = 30  # ワーカーからの通知を確認する間隔
+
     def __init__(self, root):
         self.root = root
         self.root.title("株式シグナル（順張り3戦略＋グラフ表示）")
 
         # --- 入力欄 ---
         ttk.Label(root, text="銘柄コード (例: AAPL, 7203.T)").grid(row=0, column=0, padx=5, pady=2, sticky="w")
-        self.ticker_entry = ttk.Entry(root)
-        self.ticker_entry.insert(0, "AAPL")  # デフォルト値
+        self.ticker_var = tk.StringVar(value="AAPL")  # デフォルト値
+        self.ticker_entry = ttk.Entry(root, textvariable=self.ticker_var)
         self.ticker_entry.grid(row=0, column=1, padx=5, pady=2)
 
         ttk.Label(root, text="開始日 (YYYY-MM-DD)").grid(row=1, column=0, padx=5, pady=2, sticky="w")
@@ -157,22 +48,73 @@ class StrategyGUI:
         self.interval_combo.current(0)
         self.interval_combo.grid(row=3, column=1, padx=5, pady=2)
 
-        # 実行ボタン
-        self.run_button = ttk.Button(root, text="データ取得＆検証", command=self.run_strategy)
-        self.run_button.grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+        # 戦略ごとの有効/無効とパラメータ (strategy_engine の登録内容から生成)
+        self.strategy_vars = {}
+        self.param_entries = {}
+        param_frame = ttk.LabelFrame(root, text="戦略パラメータ")
+        param_frame.grid(row=4, column=0, columnspan=2, padx=5, pady=2, sticky="ew")
+        for i, strategy in enumerate(STRATEGIES.values()):
+            var = tk.BooleanVar(value=True)
+            ttk.Checkbutton(param_frame, text=strategy.label, variable=var).grid(row=i, column=0, padx=5, pady=2, sticky="w")
+            self.strategy_vars[strategy.name] = var
+            for j, (key, value) in enumerate(strategy.params.items()):
+                ttk.Label(param_frame, text=key).grid(row=i, column=1 + j * 2, padx=5, pady=2, sticky="e")
+                entry = ttk.Entry(param_frame, width=6)
+                entry.insert(0, str(value))
+                entry.grid(row=i, column=2 + j * 2, padx=5, pady=2, sticky="w")
+                self.param_entries[(strategy.name, key)] = entry
+
+        # 実行ボタン・中止ボタン・進捗表示
+        run_frame = ttk.Frame(root)
+        run_frame.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+        self.run_button = ttk.Button(run_frame, text="データ取得＆検証", command=self.run_strategy)
+        self.run_button.pack(side="left")
+        self.cancel_button = ttk.Button(run_frame, text="中止", command=self.cancel_run, state="disabled")
+        self.cancel_button.pack(side="left", padx=5)
+        self.progress = ttk.Progressbar(run_frame, length=200, maximum=100)
+        self.progress.pack(side="left", padx=5)
+        self.status_label = ttk.Label(run_frame, text="")
+        self.status_label.pack(side="left", padx=5)
 
         # 結果のテキスト表示
         self.result_text = tk.Text(root, height=15, width=80)
-        self.result_text.grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+        self.result_text.grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+
+        # グラフ表示用のキャンバス (Figure とキャンバスは1つだけ作り、実行のたびに中身を差し替える)
+        self.chart = CandleChart(figsize=(10,6))
+        self.canvas = FigureCanvasTkAgg(self.chart.fig, master=self.root)
+        self.chart.attach(self.canvas)  # ホイールで拡大・縮小、ダブルクリックで全期間
+        self.canvas.get_tk_widget().grid(row=7, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+
+        # 取得済みの期間はローカルキャッシュから読む
+        self.market_data = MarketDataCache()
+
+        # 取得・計算はワーカースレッド1本で順番に行い、結果はキュー経由で受け取る
+        # (チャートのアーティストを触るのは GUI スレッドだけ)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.events = queue.Queue()
+        self.job_id = 0
+        self.cancel_event = None
+        self.root.after(self.POLL_MS, self.poll_events)
 
-        # グラフ表示用のキャンバス
-        self.fig = None
-        self.canvas = None
+        # 銘柄を変えたら実行中の処理は中止する
+        self.ticker_var.trace_add("write", lambda *_: self.cancel_run("銘柄が変更されたため中止しました"))
 
-        root.rowconfigure(5, weight=1)
+        root.rowconfigure(6, weight=1)
         root.columnconfigure(1, weight=1)
 
 
+    def read_strategy_settings(self):
+        """チェックされた戦略名と、入力欄から読み取ったパラメータを返す"""
+        names = [name for name, var in self.strategy_vars.items() if var.get()]
+        params = {}
+        for (name, key), entry in self.param_entries.items():
+            params.setdefault(name, {})[key] = entry.get().strip()
+        # 型変換と未知キーのチェックは戦略側で行う
+        params = {name: STRATEGIES[name].resolve_params(values) for name, values in params.items()}
+        return names, params
+
+
     def run_strategy(self):
         ticker = self.ticker_entry.get().strip()
         start_date_str = self.start_entry.get().strip()
@@ -202,117 +144,186 @@ class StrategyGUI:
             messagebox.showerror("エラー", "日付形式が正しくありません。YYYY-MM-DD で入力してください。")
             return
 
+        try:
+            names, params = self.read_strategy_settings()
+        except ValueError:
+            messagebox.showerror("エラー", "戦略パラメータは整数で入力してください。")
+            return
+        if not names:
+            messagebox.showerror("エラー", "戦略を1つ以上選択してください。")
+            return
+
         # 文字列に戻す
         new_end_date_str = end_dt.strftime("%Y-%m-%d")
         new_start_date_str = start_dt.strftime("%Y-%m-%d")
 
-        try:
-            # 1) データ取得
-            df = yf.download(
-                ticker,
-                start=new_start_date_str,
-                end=new_end_date_str,
-                interval=interval,
-                progress=False,
-                auto_adjust=True
-            )
-            if df.empty:
-                self.result_text.delete("1.0", tk.END)
-                self.result_text.insert("end", f"データが取得できませんでした。\n" \
-                                               f"銘柄:{ticker}, 期間:{new_start_date_str}～{new_end_date_str}, interval:{interval}\n")
-                return
+        # 実行中の処理があれば中止して、新しい処理をワーカーに渡す
+        self.cancel_run()
+        self.job_id += 1
+        self.cancel_event = threading.Event()
+        self.executor.submit(self.compute_job, self.job_id, self.cancel_event, ticker,
+                             new_start_date_str, new_end_date_str, interval, names, params)
+        self.cancel_button.config(state="normal")
+        self.show_progress(0, "開始")
 
-            df = df[['Open','High','Low','Close','Volume']].copy()
-            df.sort_index(inplace=True)
 
-            # 2) 売買戦略の適用
-            df = breakout_strategy(df, n=20)
-            df = moving_average_crossover_strategy(df, short_window=5, long_window=25)
-            # 75日線計算
-            df['MA_75'] = df['Close'].rolling(75).mean()
+    def cancel_run(self, message="中止しました"):
+        """実行中の処理に中止を通知する (結果は破棄される)"""
+        if self.cancel_event is not None and not self.cancel_event.is_set():
+            self.cancel_event.set()
+            self.job_id += 1  # 以降に届く古い処理の通知は無視
+            self.cancel_button.config(state="disabled")
+            self.show_progress(0, message)
 
-            # オープニングレンジ (intradayで有効)
-            df = opening_range_break_strategy(df, opening_minutes=30)
 
-            # シグナル合成
-            df = combine_signals(df)
+    def show_progress(self, percent, message):
+        self.progress["value"] = percent
+        self.status_label.config(text=message)
 
-            # 3) 出力
-            self.result_text.delete("1.0", tk.END)
-            self.result_text.insert("end", f"銘柄: {ticker}\n")
-            self.result_text.insert("end", f"取得データ: {len(df)} 行\n")
-            self.result_text.insert("end", f"期間: {new_start_date_str} ～ {new_end_date_str}\n\n")
 
-            show_cols = ['Close','Breakout_Buy','Breakout_Sell','MA_Buy','MA_Sell','OR_Buy','OR_Sell','Synergy_Buy','Synergy_Sell']
-            tail_data = df[show_cols].tail(10)
-            self.result_text.insert("end", "直近10行のシグナル状況:\n")
-            self.result_text.insert("end", str(tail_data))
-            self.result_text.insert("end", "\n")
+    # ----------------------
+    # ワーカースレッド側 (Tk のウィジェットには触らない)
+    # ----------------------
+    def compute_job(self, job_id, cancel_event, ticker, start, end, interval, names, params):
+        def post(kind, payload=None):
+            self.events.put((job_id, kind, payload))
+
+        def check_cancel():
+            if cancel_event.is_set():
+                raise InterruptedError
+
+        try:
+            # 1) データ取得 (未取得の期間だけダウンロード)
+            post("progress", (10, "データ取得中..."))
+            df = self.market_data.get(ticker, start, end, interval=interval)
+            check_cancel()
+            if df.empty:
+                post("empty", (ticker, start, end, interval))
+                return
 
-            # 4) グラフの描画
-            self.plot_candlestick_with_signals(df)
+            df = df[['Open','High','Low','Close','Volume']].copy()
+            df.sort_index(inplace=True)
 
+            # 2) 売買戦略の適用 (上で作った1つの df に全シグナル列を書き込む)
+            #    指標は indicators にメモ化され、チャートの MA と共有する
+            post("progress", (40, "シグナル計算中..."))
+            indicators = IndicatorCache.from_frame(df)
+            apply_strategies(df, names, params, indicators=indicators)
+            check_cancel()
+
+            # Synergy シグナルで売買した場合の損益
+            post("progress", (55, "損益検証中..."))
+            stats, _ = backtest(df)
+            check_cancel()
+
+            # 3) グラフ用の線 (描画そのものは GUI スレッド)
+            post("progress", (70, "グラフ準備中..."))
+            lines = self.chart_lines(df, indicators)
+            check_cancel()
+
+            post("result", {'ticker': ticker, 'start': start, 'end': end, 'names': names,
+                            'df': df, 'stats': stats, 'lines': lines})
+        except InterruptedError:
+            pass
         except Exception as e:
-            messagebox.showerror("エラー", f"処理中にエラーが発生しました。\n{str(e)}")
-
-
-    def plot_candlestick_with_signals(self, df):
-        """mplfinance を用いてローソク足 + MA(5/25/75) + シグナルを可視化"""
-        # 既存キャンバス破棄
-        if self.canvas:
-            self.canvas.get_tk_widget().destroy()
-            self.canvas = None
-        if self.fig:
-            plt.close(self.fig)
-
-        mpf_df = df.copy()
-        mpf_df.index.name = "Date"
-
-        # シグナル抽出
-        buy_signal = mpf_df[mpf_df['Synergy_Buy'] == 1]
-        sell_signal = mpf_df[mpf_df['Synergy_Sell'] == 1]
-
-        # MA
-        mpf_df['MA_5']  = mpf_df['Close'].rolling(5).mean()
-        mpf_df['MA_25'] = mpf_df['Close'].rolling(25).mean()
-        # すでに df['MA_75'] は計算済み
-
-        # addplot
-        apds = [
-            mpf.make_addplot(mpf_df['MA_5'],  color='green', width=0.7),
-            mpf.make_addplot(mpf_df['MA_25'], color='blue',  width=0.7),
-            mpf.make_addplot(mpf_df['MA_75'], color='red',   width=0.7),
-        ]
-        if not buy_signal.empty:
-            apds.append(
-                mpf.make_addplot(buy_signal['Close'], type='scatter', marker='^', color='lime', markersize=100)
-            )
-        if not sell_signal.empty:
-            apds.append(
-                mpf.make_addplot(sell_signal['Close'], type='scatter', marker='v', color='fuchsia', markersize=100)
-            )
-
-        self.fig, _ = mpf.plot(
-            mpf_df,
-            type='candle',
-            style='yahoo',
-            addplot=apds,
-            volume=True,
-            returnfig=True,
-            figsize=(10,6),
-            title='Candlestick with 5/25/75MA & Buy/Sell Signals'
-        )
-
-        # Tkinterキャンバスへ
-        self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().grid(row=6, column=0, columnspan=2, padx=5, pady=5, sticky="nsew")
+            post("error", str(e))
+
+
+    # ----------------------
+    # GUI スレッド側
+    # ----------------------
+    def poll_events(self):
+        """ワーカーからの通知を取り出して画面に反映する (root.after で定期実行)"""
+        try:
+            while True:
+                job_id, kind, payload = self.events.get_nowait()
+                if job_id != self.job_id:
+                    # 中止された処理の通知は捨てる
+                    continue
+                if kind == "progress":
+                    self.show_progress(*payload)
+                elif kind == "empty":
+                    ticker, start, end, interval = payload
+                    self.finish_run("データなし")
+                    self.result_text.delete("1.0", tk.END)
+                    self.result_text.insert("end", f"データが取得できませんでした。\n" \
+                                                   f"銘柄:{ticker}, 期間:{start}～{end}, interval:{interval}\n")
+                elif kind == "error":
+                    self.finish_run("エラー")
+                    messagebox.showerror("エラー", f"処理中にエラーが発生しました。\n{payload}")
+                elif kind == "result":
+                    self.show_result(payload)
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_MS, self.poll_events)
+
+
+    def finish_run(self, message):
+        self.cancel_event = None
+        self.cancel_button.config(state="disabled")
+        self.show_progress(100, message)
+
+
+    def show_result(self, result):
+        df = result['df']
+
+        # 3) 出力
+        self.result_text.delete("1.0", tk.END)
+        self.result_text.insert("end", f"銘柄: {result['ticker']}\n")
+        self.result_text.insert("end", f"取得データ: {len(df)} 行\n")
+        self.result_text.insert("end", f"期間: {result['start']} ～ {result['end']}\n\n")
+
+        show_cols = ['Close']
+        for name in result['names']:
+            show_cols += [STRATEGIES[name].buy_column, STRATEGIES[name].sell_column]
+        show_cols += ['Synergy_Buy','Synergy_Sell']
+        tail_data = df[show_cols].tail(10)
+        self.result_text.insert("end", "直近10行のシグナル状況:\n")
+        self.result_text.insert("end", str(tail_data))
+        self.result_text.insert("end", "\n")
+
+        self.result_text.insert("end", "\nSynergy シグナルの検証結果 (手数料+スリッページ 0.1%):\n")
+        self.result_text.insert("end", format_stats(result['stats']) + "\n")
+
+        # 4) グラフの描画
+        self.show_progress(90, "描画中...")
+        self.show_chart(df, result['lines'])
+        self.finish_run("完了")
+
+
+    def chart_lines(self, df, indicators):
+        """チャートに重ねる MA(5/25/75) (ワーカースレッドで実行)"""
+        # MAクロス戦略・75日線で計算済みの SMA は indicators から再利用される
+        ma_5, ma_25, ma_75 = indicators.sma_many('Close', [5, 25, 75])
+        return {
+            'MA_5':  (ma_5,  'green'),
+            'MA_25': (ma_25, 'blue'),
+            'MA_75': (ma_75, 'red'),
+        }
+
+
+    def show_chart(self, df, lines):
+        """
+        ローソク足 + MA + シグナルを表示する (GUI スレッドで実行)
+        本数がキャンバス幅より多いときは間引いて描き、拡大するたびに表示範囲を描き直す
+        """
+        self.chart.set_data(df, lines=lines, buy=df['Synergy_Buy'], sell=df['Synergy_Sell'],
+                            title='Candlestick with 5/25/75MA & Buy/Sell Signals')
+        self.chart.refresh()
 
 
 def main():
     root = tk.Tk()
     ttk.Style().theme_use('clam')
     app = StrategyGUI(root)
+
+    def on_close():
+        # 実行中の処理を中止してから閉じる
+        app.cancel_run()
+        app.executor.shutdown(wait=False, cancel_futures=True)
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
     root.mainloop()
 
 if __name__ == "__main__":